@@ -2,7 +2,11 @@ from __future__ import annotations
 
 import sys
 from pathlib import Path
+import time
 import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional
 import streamlit as st
 
 # ---- CSS hook (keeps UI, no JS) ----
@@ -30,6 +34,22 @@ try:
     import modules.legal_modes as legal_modes  # type: ignore
 except Exception:
     legal_modes = None
+try:
+    import modules.ingest as ingest  # type: ignore
+except Exception:
+    ingest = None
+try:
+    import modules.doc_index as doc_index  # type: ignore
+except Exception:
+    doc_index = None
+try:
+    import modules.answer_stream as answer_stream  # type: ignore
+except Exception:
+    answer_stream = None
+try:
+    import modules.session_store as session_store  # type: ignore
+except Exception:
+    session_store = None
 
 # ================= CSS module hook (fallback no-ops) =================
 try:
@@ -54,9 +74,65 @@ def css_hook(answering: bool) -> None:
         pass  # CSS 실패해도 로직 진행
 
 # ================= State helpers ===================
+HISTORY_WINDOW = 20  # 한 번에 그리는 최근 메시지 수("이전 대화 더 보기"마다 이만큼 추가)
+
+def get_session_store():
+    """Process-wide write-behind history store, or None (history then lives only in session_state)."""
+    if session_store is None:
+        return None
+    try:
+        return session_store.default_session_store()
+    except Exception:
+        traceback.print_exc()
+        return None
+
+def _session_id() -> str:
+    """Stable conversation id kept in the URL (?sid=), so a reload or server restart finds the same history."""
+    qp = getattr(st, "query_params", None)
+    sid = qp.get("sid") if qp is not None else None
+    if not sid:
+        sid = uuid.uuid4().hex
+        if qp is not None:
+            qp["sid"] = sid
+    return sid
+
+def _restore_history() -> None:
+    """Load only the latest page of a persisted conversation; older pages load from the 'earlier' button."""
+    ss = st.session_state
+    store = get_session_store()
+    if store is None:
+        return
+    try:
+        page = store.load_recent(ss["session_id"], HISTORY_WINDOW)
+    except Exception:
+        traceback.print_exc()
+        return
+    if page:
+        ss["messages"] = [m for _, m in page]
+        ss["history_base"] = page[0][0]  # seq of messages[0]
+        ss["chat_started"] = True
+
+def _append_message(role: str, content: str) -> None:
+    """Append a turn to the session and queue it for persistence (non-blocking)."""
+    ss = st.session_state
+    seq = ss.get("history_base", 0) + len(ss["messages"])
+    msg = {"role": role, "content": content}
+    ss["messages"].append(msg)
+    store = get_session_store()
+    if store is not None and ss.get("session_id"):
+        try:
+            store.record(ss["session_id"], seq, msg)
+        except Exception:
+            traceback.print_exc()
+
 def _init_state():
     ss = st.session_state
     ss.setdefault("messages", [])
+    ss.setdefault("history_base", 0)  # seq of messages[0]; > 0 while older turns are still in the store
+    if "session_id" not in ss:
+        ss["session_id"] = _session_id()
+        _restore_history()
+    ss.setdefault("history_shown", HISTORY_WINDOW)
     ss.setdefault("chat_started", False)
     ss.setdefault("_pending_user_q", False)
     ss.setdefault("_pending_text", "")
@@ -70,8 +146,9 @@ def _push_user_from_pending() -> str:
     ss["_pending_user_q"] = False
     ss["_pending_text"] = ""
     if text:
-        ss["messages"].append({"role": "user", "content": text})
+        _append_message("user", text)
         ss["chat_started"] = True
+        ss["history_shown"] = HISTORY_WINDOW  # 새 질문이면 다시 최근 창만
     return text
 
 # ================= Render helpers ==================
@@ -87,8 +164,35 @@ def render_pre_chat_center() -> None:
             st.session_state["_pending_text"] = text.strip()
             st.rerun()
 
+# st.fragment(1.37+) / experimental_fragment(1.33+): 안쪽 위젯 상호작용 시 이 함수만 다시 실행
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+def _show_earlier() -> None:
+    ss = st.session_state
+    ss["history_shown"] = ss.get("history_shown", HISTORY_WINDOW) + HISTORY_WINDOW
+    missing = ss["history_shown"] - len(ss["messages"])
+    base = ss.get("history_base", 0)
+    store = get_session_store()
+    if missing > 0 and base > 0 and store is not None:
+        try:
+            page = store.load_before(ss["session_id"], base, max(missing, HISTORY_WINDOW))
+        except Exception:
+            traceback.print_exc()
+            return
+        if page:
+            ss["messages"][:0] = [m for _, m in page]
+            ss["history_base"] = page[0][0]
+
+@_fragment
 def render_messages() -> None:
-    for m in st.session_state.get("messages", []):
+    """Render only the most recent `history_shown` turns; older ones load on demand without a full rerun."""
+    msgs = st.session_state.get("messages", [])
+    shown = min(len(msgs), max(HISTORY_WINDOW, int(st.session_state.get("history_shown", HISTORY_WINDOW))))
+    hidden = st.session_state.get("history_base", 0) + len(msgs) - shown  # incl. pages not loaded yet
+    if hidden:
+        st.button(f"⬆ 이전 대화 {min(hidden, HISTORY_WINDOW)}개 더 보기 (숨김 {hidden}개)",
+                  key="history_more", on_click=_show_earlier)
+    for m in msgs[len(msgs) - shown:]:
         role = m.get("role")
         content = m.get("content", "")
         if role == "user":
@@ -107,31 +211,168 @@ def render_bottom_uploader() -> None:
     st.file_uploader("첨부 파일", key="bottom_files", accept_multiple_files=True)
 
 # ================= Domain actions ==================
-def generate_answer(user_q: str) -> str:
-    """Use user's advice_engine if available; otherwise echo back safely."""
-    if advice_engine and hasattr(advice_engine, "answer"):
-        try:
-            return str(advice_engine.answer(user_q))  # type: ignore[attr-defined]
-        except Exception:
-            traceback.print_exc()
-            return "처리 중 오류가 발생했어요. 입력만 에코합니다:\n\n" + user_q
-    return f"**요청하신 내용**\n\n> {user_q}\n\n(임시 응답: advice_engine.answer()가 없어 에코로 대체)"
+STREAM_REFRESH = 0.08  # 답변 영역을 다시 그리는 최소 간격(초) — delta 를 모아서 한 번에
+
+@st.cache_resource(show_spinner=False)
+def _background_pool() -> ThreadPoolExecutor:
+    """Process-wide pool for work that runs beside the answer (search results)."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="law2-bg")
+
+def get_engine() -> Any:
+    """Process-wide AdviceEngine, or None when the module can't be loaded."""
+    if advice_engine is None or not hasattr(advice_engine, "default_engine"):
+        return None
+    try:
+        return advice_engine.default_engine()
+    except Exception:
+        traceback.print_exc()
+        return None
+
+def _echo_answer(user_q: str) -> str:
+    return f"**요청하신 내용**\n\n> {user_q}\n\n(임시 응답: 답변 엔진을 불러오지 못해 에코로 대체)"
+
+def answer_events(user_q: str, index: Any = None) -> Callable[[], Iterator[Any]]:
+    """Event factory for this turn: AdviceEngine.generate() when available, else a single echoed 'final'."""
+    engine = get_engine()
+    if engine is None:
+        attached = index.context(user_q) if index is not None else ""
+        text = _echo_answer(f"{user_q}\n\n{attached}" if attached else user_q)
+        return lambda: iter([("final", text, [])])
+    engine.prime(user_q)  # law-context primer runs in the background while intent/system prompt are built
+    mode = "lawfinder"
+    system_prompt = "당신은 대한민국 변호사다. 모든 답변은 한국어로, 과장 없이 간결하게 작성한다."
+    if legal_modes is not None:
+        intent, conf = legal_modes.classify_intent(user_q)
+        picked = legal_modes.pick_mode(intent, conf)
+        mode, system_prompt = picked.value, legal_modes.build_sys_for_mode(picked)
+    # session_state is only readable on the script thread; the factory runs on AnswerJob's worker thread
+    sid = st.session_state.get("session_id", "")
+    return lambda: engine.generate(
+        user_q, system_prompt=system_prompt, allow_tools=True, stream=True, mode=mode, doc_index=index,
+        user=sid,  # per-user token bucket in the LLM scheduler
+    )
+
+INGEST_WAIT = 1.5  # seconds to wait for the first chunks of a new upload before answering anyway
 
-def render_search_results(user_q: str) -> None:
+@st.cache_resource(show_spinner=False)
+def _ingest_pool() -> ThreadPoolExecutor:
+    """Process-wide pool for reading uploads (kept apart so long PDFs don't hold up search)."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="law2-ingest")
+
+def session_doc_index() -> Any:
+    """
+    This session's BM25 index over uploaded files; None when nothing is indexed or being read.
+    New files are read on a worker thread (IngestJob) and their chunks land in the index as they are
+    extracted, so the answer starts right away with whatever has been indexed so far.
+    """
+    files = list(st.session_state.get("first_files") or []) + list(st.session_state.get("bottom_files") or [])
+    if ingest is None or doc_index is None:
+        return None
+    ss = st.session_state
+    index = ss.setdefault("doc_index", doc_index.DocIndex())
+    seen = ss.setdefault("_ingested_files", set())
+    jobs = ss.setdefault("_ingest_jobs", [])
+    new = [f for f in files if (getattr(f, "file_id", None) or (f.name, f.size)) not in seen]
+    if new:
+        seen.update(getattr(f, "file_id", None) or (f.name, f.size) for f in new)
+        job = ingest.IngestJob(ingest.default_ingestor(), index, [(f.name, f.getvalue()) for f in new])
+        jobs.append(job.start(_ingest_pool()))
+        if not len(index):
+            job.wait_first(INGEST_WAIT)  # brief wait so the first question on an upload sees its opening pages
+    for job in [j for j in jobs if j.done]:
+        jobs.remove(job)
+        for note in job.notes:
+            st.caption(note)
+    if jobs:
+        name, done, total = jobs[-1].progress
+        where = f" ({name} {done}/{total}쪽)" if total else ""
+        st.caption(f"첨부 문서를 읽는 중입니다{where} — 지금까지 읽은 부분으로 답변합니다.")
+        return index  # still filling: the engine reads it when the turn starts
+    return index if len(index) else None
+
+def build_attachment_context(user_q: str) -> str:
+    """Return only the uploaded chunks relevant to user_q (for callers that don't go through the engine)."""
+    index = session_doc_index()
+    return index.context(user_q) if index is not None else ""
+
+def start_search(user_q: str) -> Optional[Future]:
+    """Kick off the integrated search in the background so it overlaps the answer."""
+    if linking and hasattr(linking, "search"):
+        return _background_pool().submit(linking.search, user_q)  # type: ignore[attr-defined]
+    return None
+
+def render_search_results(search: Optional[Future]) -> None:
     st.markdown("### 📚 통합 검색 결과")
+    if search is None:
+        st.caption("검색 모듈(linking.py)이 없어 샘플 메시지만 표시합니다.")
+        return
     try:
-        if linking and hasattr(linking, "search"):
-            results = linking.search(user_q)  # type: ignore[attr-defined]
-            if results:
-                for i, r in enumerate(results, 1):
-                    st.write(i, r)
-            else:
-                st.caption("검색 결과 없음")
+        results = search.result()
+        if results:
+            for i, r in enumerate(results, 1):
+                st.write(i, r)
         else:
-            st.caption("검색 모듈(linking.py)이 없어 샘플 메시지만 표시합니다.")
+            st.caption("검색 결과 없음")
     except Exception:
         st.caption("검색 중 오류가 발생했습니다.")
 
+def stream_answer(user_q: str, index: Any = None) -> str:
+    """
+    Run this turn's answer on a worker thread and repaint the answer area as deltas arrive,
+    with search results rendered as soon as they are ready. If a new question interrupts the
+    script (Streamlit rerun), the job is cancelled and the partial answer is kept in history.
+    """
+    ss = st.session_state
+    prev = ss.get("_answer_job")
+    if prev is not None:
+        prev.cancel()  # 이전 턴 작업이 아직 돌고 있으면 정리
+    events = answer_events(user_q, index)
+    if answer_stream is None:
+        text = ""
+        for kind, payload, _links in events():
+            text = payload if kind == "final" else text + (payload if kind == "delta" else "")
+        st.markdown(text)
+        render_search_results(start_search(user_q))
+        return text
+
+    job = answer_stream.AnswerJob(events).start()
+    ss["_answer_job"] = job
+    box = st.empty()
+    search = start_search(user_q)
+    search_box = st.empty()
+    searched = False
+    shown, last_paint = None, 0.0
+    try:
+        box.markdown("_답변을 준비하고 있어요…_")
+        while not job.done:
+            job.drain(STREAM_REFRESH)
+            now = time.monotonic()
+            if job.text and job.text != shown:
+                box.markdown(job.text + " ▌")
+                shown, last_paint = job.text, now
+            elif not job.text and now - last_paint >= 1.0:
+                # 첫 delta 전에도 주기적으로 그려서 새 질문(rerun 요청)이 바로 반영되게 함
+                box.markdown(f"_답변을 준비하고 있어요… ({now - job.started:.0f}초)_")
+                last_paint = now
+            if not searched and (search is None or search.done()):
+                with search_box.container():
+                    render_search_results(search)
+                searched = True
+    finally:
+        ss["_answer_job"] = None
+        if not job.done:
+            job.cancel()
+            if job.text:
+                _append_message("assistant", job.text + "\n\n_(새 질문으로 중단된 답변)_")
+    text = job.text or "답변을 만들지 못했습니다. 잠시 뒤 다시 시도해 주세요."
+    box.markdown(text)
+    if job.error is not None:
+        st.caption("답변 생성 중 오류가 발생해 받은 부분까지만 표시합니다.")
+    if not searched:
+        with search_box.container():
+            render_search_results(search)
+    return text
+
 # ========================== APP ====================
 def main():
     st.set_page_config(page_title="법제처 법무 상담사", layout="wide")
@@ -154,11 +395,11 @@ def main():
     # 4) Messages
     render_messages()
 
-    # 5) Answer this turn
+    # 5) Answer this turn (streamed from a worker thread; the chatbar stays live so a new question cancels it)
     if ANSWERING:
-        answer = generate_answer(user_q)
-        st.session_state["messages"].append({"role": "assistant", "content": answer})
-        render_search_results(user_q)
+        open_div("chatbar");   render_bottom_chatbar();  close_div()
+        answer = stream_answer(user_q, session_doc_index())
+        _append_message("assistant", answer)
 
     # 6) Bottom chatbar & uploader (only when not answering)
     if not ANSWERING:
@@ -0,0 +1,71 @@
+# benchmarks/bench_citations.py — 조문 인용 추출: 기존 ARTICLE_PAT 정규식 vs 사전 기반 매처
+#   python benchmarks/bench_citations.py [--kb 120] [--repeat 5]
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from modules.citations import LEGACY_ARTICLE_PAT, default_matcher  # noqa: E402
+
+_PROSE = (
+    "임대인은 임대차가 종료한 때에 보증금을 반환할 의무가 있고 임차인은 목적물을 반환할 의무가 있으며 "
+    "두 의무는 동시이행 관계에 있다고 보는 것이 판례의 확고한 입장이므로 따라서 이 사건에서도 "
+)
+_CITES = (
+    "민법 제750조", "민법 제839조의2", "주택임대차보호법 제3조의2", "「근로기준법」 제23조",
+    "같은 법 제26조", "형소법 제200조의3", "민사소송법 제163조", "산업안전보건법 시행령 제5조",
+)
+
+
+def make_text(kb: int, seed: int = 7) -> str:
+    """실제 메모 답변과 비슷하게 긴 산문 사이사이에 인용을 섞은 텍스트."""
+    rnd = random.Random(seed)
+    parts, size = [], 0
+    while size < kb * 1024:
+        p = _PROSE * rnd.randint(1, 4) + rnd.choice(_CITES) + rnd.choice([". ", ", ", " 참조.\n- "])
+        parts.append(p)
+        size += len(p.encode("utf-8"))
+    return "".join(parts)
+
+
+def make_worst_text(kb: int) -> str:
+    """구두점 없이 공백·한글만 이어지다 가끔 '제N조'가 나오는 입력(기존 정규식의 역추적 최악 경우)."""
+    return ("가나다라 마바사 아자차 " * 9 + "제12조 ") * (kb * 1024 // 3 // 80)
+
+
+def bench(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kb", type=int, default=120)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    matcher = default_matcher()
+    legacy = lambda t: [m.group(0) for m in LEGACY_ARTICLE_PAT.finditer(t)]  # noqa: E731
+    new = lambda t: list(matcher.finditer(t))  # noqa: E731
+
+    for label, text in (("memo-like", make_text(args.kb)), ("no-punct", make_worst_text(args.kb))):
+        kb = len(text.encode("utf-8")) / 1024
+        t_old = bench(legacy, text, args.repeat)
+        t_new = bench(new, text, args.repeat)
+        print(f"{label:10s} {kb:7.1f} KB  legacy {t_old:8.2f} ms  matcher {t_new:8.2f} ms  x{t_old / max(t_new, 1e-9):.1f}")
+        print(f"{'':10s} citations: legacy {len(legacy(text))}  matcher {len(new(text))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_extract.py — 외부 페이지 본문 추출: BeautifulSoup(html.parser) vs lxml 경로
+#   python benchmarks/bench_extract.py [--dir 저장한_페이지_폴더 ...] [--repeat 10]
+# 각 페이지에서 두 경로의 (제목, 정리된 본문)이 같은지 확인하고 속도를 비교합니다. 하나라도 다르면 exit 1.
+# 기본 코퍼스는 benchmarks/fixtures/*.html. 브라우저에서 "페이지 저장"한 실제 기사 폴더를 --dir 로 더 넣을 수 있음
+# (파일은 UTF-8 로 읽고, 안 되면 cp949 로 읽음).
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import external_content as ec  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def load_corpus(dirs: List[Path]) -> List[Tuple[str, str]]:
+    pages = []
+    for d in dirs:
+        for p in sorted(d.glob("*.htm*")):
+            raw = p.read_bytes()
+            try:
+                html = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                html = raw.decode("cp949", errors="replace")
+            pages.append((p.name, html))
+    return pages
+
+
+def bench(fn: Callable[[str], object], html: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def cleaned(out: Tuple[str, str]) -> Tuple[str, str]:
+    title, text = out
+    return title, ec._clean_text(text)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dir", type=Path, action="append", help="추가 코퍼스 폴더(여러 번 가능)")
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    if ec._etree is None:
+        print("lxml 이 설치되어 있지 않습니다.", file=sys.stderr)
+        return 2
+    pages = load_corpus([FIXTURES] + (args.dir or []))
+
+    mismatched = []
+    t_bs = t_lx = 0.0
+    for name, html in pages:
+        same = cleaned(ec._extract_soup(html)) == cleaned(ec.extract_article(html))
+        if not same:
+            mismatched.append(name)
+        a = bench(ec._extract_soup, html, args.repeat)
+        b = bench(ec.extract_article, html, args.repeat)
+        t_bs += a
+        t_lx += b
+        kb = len(html.encode("utf-8")) / 1024
+        print(f"{name[:40]:40s} {kb:7.1f} KB  soup {a:8.2f} ms  lxml {b:7.2f} ms  x{a / max(b, 1e-9):5.1f}  "
+              f"{'same' if same else 'DIFF'}")
+    print(f"{'total':40s} {len(pages):4d} pages  soup {t_bs:8.2f} ms  lxml {t_lx:7.2f} ms  x{t_bs / max(t_lx, 1e-9):5.1f}")
+
+    if mismatched:
+        print("\n추출 결과가 다른 페이지: " + ", ".join(mismatched), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# benchmarks/bench_history.py — app.py 재실행(rerun) 시간 vs 대화 기록 길이
+#   python benchmarks/bench_history.py [--sizes 10 50 100 200] [--reruns 7] [--answer-kb 3]
+# streamlit.testing 의 AppTest 로 app.py 를 서버 없이 돌리며, 기록을 채운 세션에서 (질문 없이) 다시 실행하는
+# 시간을 잽니다. 키 입력·업로드마다 일어나는 rerun 과 같은 경로입니다.
+from __future__ import annotations
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_ANSWER = (
+    "## 결론\n임대차 종료 시 임대인은 보증금을 반환할 의무가 있습니다.\n\n"
+    "## 근거\n- 민법 제536조(동시이행의 항변권)\n- 주택임대차보호법 제3조의2\n\n"
+    "| 구분 | 내용 |\n|---|---|\n| 기간 | 2년 |\n| 절차 | 내용증명 → 지급명령 → 소송 |\n\n"
+)
+
+
+def make_history(n: int, answer_kb: int) -> List[Dict[str, Any]]:
+    body = (_ANSWER * (answer_kb * 1024 // len(_ANSWER.encode("utf-8")) + 1))
+    msgs = []
+    for i in range(n // 2):
+        msgs.append({"role": "user", "content": f"{i}번째 질문: 전세보증금을 못 받고 있는데 어떻게 하나요?"})
+        msgs.append({"role": "assistant", "content": f"### 답변 {i}\n" + body})
+    return msgs
+
+
+def rerun_ms(n: int, reruns: int, answer_kb: int) -> float:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+    at.session_state["messages"] = make_history(n, answer_kb)
+    at.session_state["chat_started"] = True
+    at.run()  # 첫 실행(모듈 import·CSS 로드) 제외
+    times = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - t0) * 1000.0)
+    if at.exception:
+        raise RuntimeError(at.exception)
+    return statistics.median(times)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 200])
+    ap.add_argument("--reruns", type=int, default=7)
+    ap.add_argument("--answer-kb", type=int, default=3)
+    args = ap.parse_args()
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    base = None
+    for n in args.sizes:
+        ms = rerun_ms(n, args.reruns, args.answer_kb)
+        base = base or ms
+        print(f"messages {n:5d}  rerun p50 {ms:8.1f} ms  x{ms / base:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
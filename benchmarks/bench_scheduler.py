@@ -0,0 +1,102 @@
+# benchmarks/bench_scheduler.py — 429 폭주 시 직접 호출(각자 재시도) vs LLMScheduler(전역 백오프) 비교(가짜 공급자, 네트워크 없음)
+#   python benchmarks/bench_scheduler.py [--users 24] [--turns 5] [--provider-concurrency 4] [--latency 0.05]
+# 가짜 공급자는 동시 요청이 provider-concurrency 를 넘으면 retry-after-ms 헤더와 함께 429 를 냅니다.
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from modules.llm_client import safe_chat_completion  # noqa: E402
+from modules.llm_scheduler import LLMScheduler  # noqa: E402
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, reset: float):
+        super().__init__("429 Too Many Requests")
+        self.response = type("Resp", (), {"status_code": 429, "headers": {"retry-after-ms": str(int(reset * 1000))}})()
+
+
+class FakeProvider:
+    """client.chat.completions.create 대역: 동시 요청 상한을 넘으면 429."""
+
+    def __init__(self, concurrency: int, latency: float):
+        self.concurrency = concurrency
+        self.latency = latency
+        self.current = 0
+        self.calls = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self.chat = type("Chat", (), {"completions": self})()
+
+    def create(self, **kw: Any) -> Any:
+        with self._lock:
+            self.calls += 1
+            if self.current >= self.concurrency:
+                self.rejected += 1
+                raise RateLimited(self.latency)
+            self.current += 1
+        try:
+            time.sleep(self.latency)
+            return type("Resp", (), {"choices": []})()
+        finally:
+            with self._lock:
+                self.current -= 1
+
+
+def run(scc: Callable[..., Dict[str, Any]], args: argparse.Namespace) -> Dict[str, Any]:
+    provider = FakeProvider(args.provider_concurrency, args.latency)
+    ok = [0]
+    lock = threading.Lock()
+
+    def session(u: int) -> None:
+        for _ in range(args.turns):
+            r = scc(provider, messages=[{"role": "user", "content": "전세보증금 반환 " * 20}],
+                    model="fake", max_tokens=200, user=f"user{u}")
+            if "resp" in r:
+                with lock:
+                    ok[0] += 1
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(u,)) for u in range(args.users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = args.users * args.turns
+    return {
+        "ok": f"{ok[0]}/{total}",
+        "provider_calls": provider.calls,
+        "provider_429": provider.rejected,
+        "secs": round(time.perf_counter() - t0, 2),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=24)
+    ap.add_argument("--turns", type=int, default=5)
+    ap.add_argument("--provider-concurrency", type=int, default=4)
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--max-concurrency", type=int, default=8)
+    args = ap.parse_args()
+
+    print("direct   ", run(safe_chat_completion, args))
+    sch = LLMScheduler(max_concurrency=args.max_concurrency)
+    print("scheduled", run(sch.wrap(safe_chat_completion), args))
+    s = sch.stats.as_dict()
+    print(f"          rate_limited {s['rate_limited']}  limit {s['limit']:.0f}  max_queue_depth {s['max_queue_depth']}"
+          f"  wait p50 {s['wait_p50'] * 1000:.0f} ms  p95 {s['wait_p95'] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
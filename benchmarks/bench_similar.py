@@ -0,0 +1,64 @@
+# benchmarks/bench_similar.py — 유사 질문 캐시: 100k 항목에서 조회 지연(p50/p99)
+#   python benchmarks/bench_similar.py [--n 100000]
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from modules.legal_modes import Intent  # noqa: E402
+from modules.similar_cache import SimilarQuestionCache  # noqa: E402
+
+_SUBJ = ["전세보증금", "월세", "해고예고수당", "퇴직금", "임금체불", "교통사고 합의금", "상속포기", "이혼 재산분할",
+         "명예훼손", "개인정보 유출", "층간소음", "계약 해지", "손해배상", "보증채무", "부당해고", "산재 보상"]
+_ASK = ["반환 절차가 궁금합니다", "받을 수 있나요", "청구하려면 어떻게 하나요", "기간은 얼마나 되나요",
+        "소송 비용은 누가 내나요", "내용증명은 어떻게 보내나요", "책임이 있나요", "위험은 무엇인가요"]
+_CTX = ["집주인이", "회사가", "상대방이", "가해자가", "임대인이", "사장님이", "보험사가", "형제들이"]
+
+
+def make_question(rnd: random.Random) -> str:
+    return (f"{rnd.choice(_CTX)} {rnd.randint(1, 999)}만원 {rnd.choice(_SUBJ)} 관련해서 "
+            f"{rnd.randint(1, 36)}개월째 {rnd.choice(_ASK)} 사례{rnd.randint(1, 10**6)}")
+
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=2000)
+    args = ap.parse_args()
+
+    rnd = random.Random(11)
+    cache = SimilarQuestionCache(capacity=args.n)
+    qs = [make_question(rnd) for _ in range(args.n)]
+    t0 = time.perf_counter()
+    for i, q in enumerate(qs):
+        cache.insert(q, {"i": i}, intent=Intent.MEMO)
+    print(f"insert {args.n}: {time.perf_counter() - t0:.1f} s")
+
+    for label, make in (
+        ("near-dup", lambda: rnd.choice(qs).replace("관련해서", "관련하여") + "?"),
+        ("novel", lambda: make_question(rnd)),
+    ):
+        lat, hits = [], 0
+        for _ in range(args.queries):
+            q = make()
+            t = time.perf_counter()
+            grade, _, _ = cache.lookup(q, intent=Intent.MEMO)
+            lat.append((time.perf_counter() - t) * 1000.0)
+            hits += grade is not None
+        print(f"{label:9s} p50 {pct(lat, .5):.3f} ms  p99 {pct(lat, .99):.3f} ms  hit {hits / args.queries:.0%}")
+
+
+if __name__ == "__main__":
+    main()
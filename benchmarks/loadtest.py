@@ -0,0 +1,371 @@
+# benchmarks/loadtest.py — AdviceEngine 동시 세션 부하 시험(가짜 스트리밍 LLM + 툴/프라이머 스텁, 네트워크 없음)
+#   python benchmarks/loadtest.py --sessions 1,20,100 --turns 5
+#   python benchmarks/loadtest.py --sessions 200 --api async --tool-pattern multi --filter-rate 0.05
+#   python benchmarks/loadtest.py --sessions 50 --primer-budget 0.3 --json out.json
+#
+# 세션 하나 = 스레드 하나(Streamlit 스크립트 실행 스레드와 같은 모양)가 turns 번 generate() 를 끝까지 소비.
+# --api async 는 세션을 이벤트 루프의 태스크로 돌림(agenerate + async LLM/툴/프라이머 대역).
+#   --sync-backends 를 같이 주면 동기 대역을 asyncio.to_thread 로 돌리는 구성(기본 실행기 스레드 수가 병목)이 재현됨.
+# 보고: TTFT(첫 delta) / 전체 지연 p50·p95·p99, 처리량(턴/초, 글자/초), 최대 RSS, 결과 유형별 건수.
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace as NS
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from modules.advice_engine import AdviceEngine  # noqa: E402
+
+_ANSWER = (
+    "## 결론\n임대인은 임대차 종료 시 보증금을 반환할 의무가 있습니다. 주택임대차보호법 제3조의2 에 따라 "
+    "대항요건과 확정일자를 갖춘 임차인은 우선변제권을 가집니다. 반환이 지연되면 민법 제750조 에 따른 "
+    "손해배상이나 지연이자를 청구할 수 있습니다.\n## 절차\n1. 내용증명 발송\n2. 임차권등기명령 신청\n"
+    "3. 지급명령 또는 보증금반환청구 소송\n"
+)
+BLOCKED_MSG = "콘텐츠 필터로 답변이 차단되었습니다."
+_QUESTIONS = [
+    "전세 계약이 끝났는데 집주인이 보증금을 안 돌려줍니다 어떻게 하나요",
+    "부당해고를 당한 것 같은데 관련 법령과 구제 절차를 알려주세요",
+    "교통사고 합의금이 적정한지 판단해 주세요",
+    "임대차 계약 해지 통지서 양식을 만들어 주세요",
+    "층간소음 분쟁에서 손해배상 책임이 생길 가능성이 있나요",
+]
+
+
+# ================= 가짜 백엔드 =================
+def _jitter(base: float, ratio: float, rnd: random.Random) -> float:
+    return max(0.0, base * (1.0 + rnd.uniform(-ratio, ratio)))
+
+
+@dataclass
+class FakeLLMConfig:
+    first_latency: float = 0.6      # 1차(비스트림) 호출 응답 시간(초)
+    ttft: float = 0.4               # 최종 호출: 요청 → 첫 청크
+    chunk_interval: float = 0.02    # 청크 간격
+    chunk_chars: int = 12           # 청크당 글자 수
+    answer_chars: int = 900         # 답변 길이
+    tool_pattern: str = "mixed"     # none | one | multi | mixed
+    filter_rate: float = 0.0        # 콘텐츠 필터 차단 응답 비율
+    jitter: float = 0.3
+
+
+class FakeLLM:
+    """safe_chat_completion(client, **kwargs) 과 같은 반환 모양을 내는 로컬 대역."""
+
+    def __init__(self, cfg: FakeLLMConfig, seed: int = 1):
+        self.cfg = cfg
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._n = 0
+        self.answer = (_ANSWER * (cfg.answer_chars // len(_ANSWER) + 1))[:cfg.answer_chars]
+
+    def _draw(self) -> Dict[str, float]:
+        with self._lock:
+            self._n += 1
+            r = self._rnd
+            return {
+                "first": _jitter(self.cfg.first_latency, self.cfg.jitter, r),
+                "ttft": _jitter(self.cfg.ttft, self.cfg.jitter, r),
+                "blocked": r.random() < self.cfg.filter_rate,
+                "pattern": self.cfg.tool_pattern if self.cfg.tool_pattern != "mixed"
+                else r.choice(["none", "one", "one", "multi"]),
+                "id": self._n,
+            }
+
+    def _tool_calls(self, pattern: str, n: int) -> Optional[List[Any]]:
+        if pattern == "none":
+            return None
+        mk = lambda i, name, args: NS(id=f"call_{n}_{i}", type="function",  # noqa: E731
+                                      function=NS(name=name, arguments=json.dumps(args, ensure_ascii=False)))
+        if pattern == "one":
+            return [mk(0, "search_one", {"query": "주택임대차보호법"})]
+        return [mk(0, "search_multi", {"queries": ["민법", "주택임대차보호법"]}),
+                mk(1, "search_one", {"query": "민사집행법"})]
+
+    def _blocked(self) -> Dict[str, Any]:
+        return {"type": "blocked_by_content_filter", "message": BLOCKED_MSG}
+
+    def _chunks(self, interval: float) -> Iterator[Any]:
+        step = self.cfg.chunk_chars
+        for i in range(0, len(self.answer), step):
+            if interval:
+                time.sleep(interval)
+            yield NS(choices=[NS(delta=NS(content=self.answer[i:i + step]), finish_reason=None)])
+        yield NS(choices=[NS(delta=NS(content=None), finish_reason="stop")])
+
+    async def _achunks(self, interval: float) -> AsyncIterator[Any]:
+        for ch in self._chunks(0.0):
+            if interval:
+                await asyncio.sleep(interval)
+            yield ch
+
+    def _first(self, d: Dict[str, Any], messages: List[Any], tools: Any) -> Dict[str, Any]:
+        if d["blocked"]:
+            return self._blocked()
+        calls = self._tool_calls(d["pattern"], d["id"]) if tools else None
+        if calls and not any(m.get("role") == "tool" for m in messages if isinstance(m, dict)):
+            msg = NS(content=None, tool_calls=calls)
+        else:
+            msg = NS(content=self.answer, tool_calls=None)
+        usage = NS(prompt_tokens=400, completion_tokens=60, total_tokens=460)
+        return {"type": "ok", "resp": NS(choices=[NS(message=msg)], usage=usage)}
+
+    def __call__(self, client: Any, *, messages: List[Any], stream: bool = False, tools: Any = None, **kw: Any) -> Dict[str, Any]:
+        d = self._draw()
+        if not stream:
+            time.sleep(d["first"])
+            return self._first(d, messages, tools)
+        time.sleep(d["ttft"])
+        if d["blocked"]:
+            return self._blocked()
+        return {"type": "ok", "stream": self._chunks(self.cfg.chunk_interval)}
+
+    async def acall(self, client: Any, *, messages: List[Any], stream: bool = False, tools: Any = None, **kw: Any) -> Dict[str, Any]:
+        """async 클라이언트 대역(지연은 asyncio.sleep)."""
+        d = self._draw()
+        if not stream:
+            await asyncio.sleep(d["first"])
+            return self._first(d, messages, tools)
+        await asyncio.sleep(d["ttft"])
+        if d["blocked"]:
+            return self._blocked()
+        return {"type": "ok", "stream": self._achunks(self.cfg.chunk_interval)}
+
+
+@dataclass
+class StubBackends:
+    tool_latency: float = 0.3
+    primer_latency: float = 0.5
+    items: int = 8
+    jitter: float = 0.3
+    _rnd: random.Random = field(default_factory=lambda: random.Random(2))
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def _delay(self, base: float) -> float:
+        with self._lock:
+            return _jitter(base, self.jitter, self._rnd)
+
+    def _sleep(self, base: float) -> None:
+        time.sleep(self._delay(base))
+
+    def _items(self, law: str) -> List[Dict[str, Any]]:
+        return [{"법령명한글": law, "조문번호": str(i + 1), "조문내용": "가" * 300,
+                 "법령상세링크": f"/법령/{law}/제{i + 1}조"} for i in range(self.items)]
+
+    def search_one(self, query: str = "", **kw: Any) -> Dict[str, Any]:
+        self._sleep(self.tool_latency)
+        return {"query": query, "items": self._items(query or "민법")}
+
+    def search_multi(self, queries: Optional[List[str]] = None, **kw: Any) -> List[Dict[str, Any]]:
+        self._sleep(self.tool_latency)
+        return [{"query": q, "items": self._items(q)} for q in (queries or ["민법"])]
+
+    def prefetch(self, q: str, num_rows_per_law: int = 3) -> List[Dict[str, Any]]:
+        self._sleep(self.primer_latency)
+        return self._items("민법")[:num_rows_per_law]
+
+    async def asearch_one(self, query: str = "", **kw: Any) -> Dict[str, Any]:
+        await asyncio.sleep(self._delay(self.tool_latency))
+        return {"query": query, "items": self._items(query or "민법")}
+
+    async def asearch_multi(self, queries: Optional[List[str]] = None, **kw: Any) -> List[Dict[str, Any]]:
+        await asyncio.sleep(self._delay(self.tool_latency))
+        return [{"query": q, "items": self._items(q)} for q in (queries or ["민법"])]
+
+    async def aprefetch(self, q: str, num_rows_per_law: int = 3) -> List[Dict[str, Any]]:
+        await asyncio.sleep(self._delay(self.primer_latency))
+        return self._items("민법")[:num_rows_per_law]
+
+    @staticmethod
+    def summarize(pre: Any, max_items: int = 6) -> str:
+        return "관련 법령 요약: " + ", ".join(f"{x['법령명한글']} 제{x['조문번호']}조" for x in (pre or [])[:max_items])
+
+
+# ================= 측정 =================
+@dataclass
+class TurnResult:
+    ttft: Optional[float]
+    total: float
+    chars: int
+    outcome: str            # answered | blocked | error
+
+
+def _pct(xs: List[float], q: float) -> float:
+    if not xs:
+        return float("nan")
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def _peak_rss_mb() -> float:
+    # Linux: KB, macOS: bytes
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / 1024.0 / (1024.0 if sys.platform == "darwin" else 1.0)
+
+
+def _classify(final_text: str, saw_delta: bool) -> str:
+    if final_text == BLOCKED_MSG:
+        return "blocked"
+    return "answered" if saw_delta or final_text else "error"
+
+
+def _turn_sync(engine: AdviceEngine, q: str, kw: Dict[str, Any]) -> TurnResult:
+    t0 = time.perf_counter()
+    ttft, chars, final = None, 0, ""
+    try:
+        for kind, text, _links in engine.generate(q, **kw):
+            if kind == "delta":
+                if ttft is None:
+                    ttft = time.perf_counter() - t0
+                chars += len(text)
+            elif kind == "final":
+                final = text
+    except Exception:
+        return TurnResult(ttft, time.perf_counter() - t0, chars, "error")
+    return TurnResult(ttft, time.perf_counter() - t0, chars, _classify(final, ttft is not None))
+
+
+async def _turn_async(engine: AdviceEngine, q: str, kw: Dict[str, Any]) -> TurnResult:
+    t0 = time.perf_counter()
+    ttft, chars, final = None, 0, ""
+    try:
+        async for kind, text, _links in engine.agenerate(q, **kw):
+            if kind == "delta":
+                if ttft is None:
+                    ttft = time.perf_counter() - t0
+                chars += len(text)
+            elif kind == "final":
+                final = text
+    except Exception:
+        return TurnResult(ttft, time.perf_counter() - t0, chars, "error")
+    return TurnResult(ttft, time.perf_counter() - t0, chars, _classify(final, ttft is not None))
+
+
+def make_engine(llm: FakeLLM, stubs: StubBackends, args: argparse.Namespace) -> AdviceEngine:
+    use_async = args.api == "async" and not args.sync_backends
+    return AdviceEngine(
+        client=NS(), model="fake-model", tools=[{"type": "function"}],
+        safe_chat_completion=llm,
+        tool_search_one=stubs.asearch_one if use_async else stubs.search_one,
+        tool_search_multi=stubs.asearch_multi if use_async else stubs.search_multi,
+        prefetch_law_context=(stubs.aprefetch if use_async else stubs.prefetch) if args.primer else None,
+        summarize_laws_for_primer=stubs.summarize if args.primer else None,
+        primer_budget=args.primer_budget,
+        async_client=NS() if use_async else None,
+        async_safe_chat_completion=llm.acall if use_async else None,
+    )
+
+
+def run_level(sessions: int, args: argparse.Namespace) -> Dict[str, Any]:
+    cfg = FakeLLMConfig(
+        first_latency=args.first_latency, ttft=args.ttft, chunk_interval=args.chunk_interval,
+        chunk_chars=args.chunk_chars, answer_chars=args.answer_chars, tool_pattern=args.tool_pattern,
+        filter_rate=args.filter_rate, jitter=args.jitter,
+    )
+    llm = FakeLLM(cfg, seed=args.seed)
+    stubs = StubBackends(tool_latency=args.tool_latency, primer_latency=args.primer_latency, jitter=args.jitter)
+    kw = dict(system_prompt="너는 한국 법률 상담 보조자다.", allow_tools=True, stream=True, use_cache=False)
+    results: List[TurnResult] = []
+    lock = threading.Lock()
+
+    t_start = time.perf_counter()
+    if args.api == "sync":
+        def session(i: int) -> None:
+            engine = make_engine(llm, stubs, args)  # 세션마다 엔진 1개(앱의 session_state 와 같은 구성)
+            try:
+                for t in range(args.turns):
+                    r = _turn_sync(engine, _QUESTIONS[(i + t) % len(_QUESTIONS)], kw)
+                    with lock:
+                        results.append(r)
+            finally:
+                engine.tool_runner.shutdown()
+
+        threads = [threading.Thread(target=session, args=(i,), daemon=True) for i in range(sessions)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+    else:
+        async def main() -> None:
+            async def session(i: int) -> None:
+                engine = make_engine(llm, stubs, args)
+                for t in range(args.turns):
+                    results.append(await _turn_async(engine, _QUESTIONS[(i + t) % len(_QUESTIONS)], kw))
+                engine.tool_runner.shutdown()
+
+            await asyncio.gather(*(session(i) for i in range(sessions)))
+
+        asyncio.run(main())
+    wall = time.perf_counter() - t_start
+
+    ttfts = [r.ttft for r in results if r.ttft is not None]
+    totals = [r.total for r in results]
+    outcomes: Dict[str, int] = {}
+    for r in results:
+        outcomes[r.outcome] = outcomes.get(r.outcome, 0) + 1
+    return {
+        "sessions": sessions,
+        "turns": len(results),
+        "wall_s": wall,
+        "ttft_p50": _pct(ttfts, 0.50), "ttft_p95": _pct(ttfts, 0.95), "ttft_p99": _pct(ttfts, 0.99),
+        "total_p50": _pct(totals, 0.50), "total_p95": _pct(totals, 0.95), "total_p99": _pct(totals, 0.99),
+        "turns_per_s": len(results) / wall if wall else 0.0,
+        "chars_per_s": sum(r.chars for r in results) / wall if wall else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "threads_peak": threading.active_count(),
+        "outcomes": outcomes,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="AdviceEngine 동시 세션 부하 시험(오프라인)")
+    ap.add_argument("--sessions", default="1,10,50", help="동시 세션 수(쉼표로 여러 단계)")
+    ap.add_argument("--turns", type=int, default=3, help="세션당 턴 수")
+    ap.add_argument("--api", choices=["sync", "async"], default="sync")
+    ap.add_argument("--sync-backends", action="store_true", help="--api async 에서도 동기 대역 사용(to_thread 경유)")
+    ap.add_argument("--first-latency", type=float, default=0.6)
+    ap.add_argument("--ttft", type=float, default=0.4)
+    ap.add_argument("--chunk-interval", type=float, default=0.02)
+    ap.add_argument("--chunk-chars", type=int, default=12)
+    ap.add_argument("--answer-chars", type=int, default=900)
+    ap.add_argument("--tool-pattern", choices=["none", "one", "multi", "mixed"], default="mixed")
+    ap.add_argument("--filter-rate", type=float, default=0.0)
+    ap.add_argument("--tool-latency", type=float, default=0.3)
+    ap.add_argument("--primer", action=argparse.BooleanOptionalAction, default=True)
+    ap.add_argument("--primer-latency", type=float, default=0.5)
+    ap.add_argument("--primer-budget", type=float, default=None, help="주면 백그라운드 프라이머(예산 초)")
+    ap.add_argument("--jitter", type=float, default=0.3, help="지연값 ±비율 무작위화")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", type=Path, help="단계별 결과를 JSON 으로 저장")
+    args = ap.parse_args(argv)
+
+    levels = [int(x) for x in str(args.sessions).split(",") if x.strip()]
+    rows = []
+    print(f"{'sess':>5s} {'turns':>6s} {'ttft p50/p95/p99 (s)':>24s} {'total p50/p95/p99 (s)':>24s} "
+          f"{'turn/s':>7s} {'char/s':>9s} {'RSS MB':>7s}  outcomes")
+    for n in levels:
+        r = run_level(n, args)
+        rows.append(r)
+        print(f"{n:5d} {r['turns']:6d} {r['ttft_p50']:7.3f}/{r['ttft_p95']:7.3f}/{r['ttft_p99']:7.3f} "
+              f"{r['total_p50']:7.3f}/{r['total_p95']:7.3f}/{r['total_p99']:7.3f} "
+              f"{r['turns_per_s']:7.1f} {r['chars_per_s']:9.0f} {r['peak_rss_mb']:7.1f}  {r['outcomes']}")
+    if args.json:
+        args.json.write_text(json.dumps({"args": vars(args) | {"json": str(args.json)}, "levels": rows},
+                                        ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
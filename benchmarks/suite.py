@@ -0,0 +1,248 @@
+# benchmarks/suite.py — 오프라인 마이크로벤치마크 모음 + 기준선 비교(회귀 시 실패)
+#   python benchmarks/suite.py                    # 측정 후 baseline.json 과 비교 (회귀면 exit 1)
+#   python benchmarks/suite.py --update-baseline  # 현재 측정값을 기준선으로 저장
+#   python benchmarks/suite.py -k citations --threshold 1.3 --json out.json
+#
+# 측정 방식: 케이스마다 warmup 후, 한 샘플이 ~min_sample_ms 가 되도록 반복 횟수(number)를 자동 보정하고
+# 샘플의 호출당 시간으로 p50/p90/p99/min 을 냅니다. 비교는 p50 기준.
+# 샘플은 한 케이스에서 몰아 뽑지 않고 전체 케이스를 rounds 번 돌며 나눠 뽑습니다(공유 vCPU 처럼 머신 속도가
+# 시간에 따라 출렁여도 특정 케이스만 느린 구간에 걸리지 않도록).
+# 기준선은 측정한 머신/파이썬 버전에 묶이므로, 다른 환경에서는 먼저 --update-baseline 으로 만드세요.
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+HERE = Path(__file__).resolve().parent
+FIXTURES = HERE / "fixtures"
+DEFAULT_BASELINE = HERE / "baseline.json"
+
+Case = Tuple[str, Callable[[], Any]]
+
+
+# ================= 케이스 =================
+def _citation_cases() -> List[Case]:
+    from benchmarks.bench_citations import make_text
+    from modules.linking import extract_article_citations, merge_article_links_block
+
+    short = make_text(4)        # 보통 답변 길이
+    long = make_text(120)       # 긴 메모/판례 요약
+    return [
+        ("citations.extract_4kb", lambda: extract_article_citations(short)),
+        ("citations.extract_120kb", lambda: extract_article_citations(long)),
+        ("citations.merge_links_4kb", lambda: merge_article_links_block(short)),
+        ("citations.merge_links_120kb", lambda: merge_article_links_block(long)),
+    ]
+
+
+def _mode_cases() -> List[Case]:
+    from modules.legal_modes import build_sys_for_mode, classify_intent, pick_mode
+
+    qs = [
+        "전세보증금을 못 받고 있는데 간단히 절차만 알려줘",
+        "부당해고 관련 법령과 조문 근거를 찾아줘",
+        "이 계약을 해지하면 손해배상 책임이 생길 가능성이 있나요?",
+        "임대차 계약 해지 통지서 양식 좀 만들어줘",
+        "층간소음으로 이웃과 다툼이 있습니다 " * 6,
+    ]
+
+    def run() -> None:
+        for q in qs:
+            intent, conf = classify_intent(q)
+            build_sys_for_mode(pick_mode(intent, conf), brief=conf < 0.7)
+
+    return [("legal_modes.classify_and_build_x5", run)]
+
+
+def _external_cases() -> List[Case]:
+    from bs4 import BeautifulSoup
+    import external_content as ec
+
+    cases: List[Case] = []
+    for path in sorted(FIXTURES.glob("*.html")):
+        html = path.read_text(encoding="utf-8")
+
+        def extract(html: str = html) -> str:
+            # _extract_generic 은 soup 을 변경(decompose)하므로 매번 새로 파싱
+            return ec._clean_text(ec._extract_generic(BeautifulSoup(html, "html.parser")))
+
+        text = ec._extract_generic(BeautifulSoup(html, "html.parser"))
+        cases.append((f"external.extract_generic.{path.stem}", extract))
+        cases.append((f"external.extract_article.{path.stem}", lambda html=html: ec.extract_article(html)))
+        cases.append((f"external.clean_text.{path.stem}", lambda text=text: ec._clean_text(text)))
+    return cases
+
+
+def _stylekit_cases() -> List[Case]:
+    import stylekit
+
+    paths = [str(p) for p in sorted((ROOT / "styles").rglob("*.css"))] + [str(ROOT / "styles" / "missing.css")]
+    logging.disable(logging.WARNING)
+    try:
+        stylekit.load(paths)  # 첫 호출에서 streamlit 로거들이 만들어짐
+    finally:
+        logging.disable(logging.NOTSET)
+    # bare 모드(서버 없음)의 ScriptRunContext 경고 억제 — streamlit 은 하위 로거마다 레벨을 따로 지정함
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    return [
+        ("stylekit.load", lambda: stylekit.load(paths)),
+        ("stylekit.bundle", lambda: stylekit.bundle(paths)),  # 재실행마다: stat 만 하고 캐시된 번들 반환
+    ]
+
+
+GROUPS: Dict[str, Callable[[], List[Case]]] = {
+    "citations": _citation_cases,
+    "legal_modes": _mode_cases,
+    "external": _external_cases,
+    "stylekit": _stylekit_cases,
+}
+
+
+# ================= 측정 =================
+def _pct(xs: List[float], q: float) -> float:
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def calibrate(fn: Callable[[], Any], warmup: int, min_sample_ms: float) -> int:
+    """warmup 후, 샘플 하나가 min_sample_ms 이상이 되는 반복 횟수(타이머 해상도·잡음 완화)."""
+    for _ in range(warmup):
+        fn()
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        dt = (time.perf_counter() - t0) * 1000.0
+        if dt >= min_sample_ms or number >= 1 << 16:
+            return number
+        number *= 2 if dt <= 0 else max(2, min(10, int(min_sample_ms / dt) + 1))
+
+
+def sample(fn: Callable[[], Any], number: int, k: int) -> List[float]:
+    """호출당 µs 샘플 k 개. GC 는 샘플 사이에만 돌림(수거 정지로 인한 튐 제거)."""
+    out: List[float] = []
+    gc_was = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(k):
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn()
+            out.append((time.perf_counter() - t0) * 1e6 / number)
+            gc.collect()
+    finally:
+        if gc_was:
+            gc.enable()
+    return out
+
+
+def summarize(samples: List[float], number: int) -> Dict[str, Any]:
+    return {
+        "number": number,
+        "samples": len(samples),
+        "min_us": min(samples),
+        "p50_us": statistics.median(samples),
+        "p90_us": _pct(samples, 0.90),
+        "p99_us": _pct(samples, 0.99),
+        "stdev_us": statistics.pstdev(samples),
+    }
+
+
+def collect(groups: List[str], pattern: Optional[str]) -> List[Case]:
+    cases: List[Case] = []
+    for g in groups:
+        try:
+            cases.extend(GROUPS[g]())
+        except ImportError as e:
+            print(f"[skip] {g}: {e}", file=sys.stderr)
+    return [c for c in cases if not pattern or pattern in c[0]]
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """p50 이 기준선의 threshold 배를 넘은 케이스 이름 목록."""
+    base = baseline.get("results", {})
+    regressed = []
+    for name, r in results.items():
+        b = base.get(name)
+        if not b:
+            r["status"] = "new"
+            continue
+        ratio = r["p50_us"] / max(b["p50_us"], 1e-9)
+        r["ratio"] = ratio
+        r["status"] = "REGRESSED" if ratio > threshold else ("faster" if ratio < 1 / threshold else "ok")
+        if ratio > threshold:
+            regressed.append(name)
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("-k", dest="pattern", help="이름에 이 문자열이 들어간 케이스만")
+    ap.add_argument("--group", action="append", choices=sorted(GROUPS), help="그룹 선택(여러 번 가능)")
+    ap.add_argument("--warmup", type=int, default=3)
+    ap.add_argument("--rounds", type=int, default=3, help="전체 케이스를 몇 바퀴 돌며 샘플을 나눠 뽑을지")
+    ap.add_argument("--repeat", type=int, default=5, help="바퀴당 케이스별 샘플 수")
+    ap.add_argument("--min-sample-ms", type=float, default=20.0)
+    ap.add_argument("--threshold", type=float, default=1.25, help="p50 이 기준선의 몇 배를 넘으면 회귀로 볼지")
+    ap.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--json", type=Path, help="결과를 JSON 으로도 저장")
+    args = ap.parse_args(argv)
+
+    cases = collect(args.group or list(GROUPS), args.pattern)
+    numbers = {name: calibrate(fn, args.warmup, args.min_sample_ms) for name, fn in cases}
+    pooled: Dict[str, List[float]] = {name: [] for name, _ in cases}
+    for _ in range(max(1, args.rounds)):
+        for name, fn in cases:
+            pooled[name].extend(sample(fn, numbers[name], args.repeat))
+    results = {name: summarize(pooled[name], numbers[name]) for name, _ in cases}
+
+    baseline: Dict[str, Any] = {}
+    if args.baseline.exists() and not args.update_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressed = compare(results, baseline, args.threshold) if baseline else []
+
+    print(f"{'case':48s} {'p50 µs':>11s} {'p90 µs':>11s} {'p99 µs':>11s} {'min µs':>11s}  vs base")
+    for name, r in results.items():
+        vs = f"x{r['ratio']:.2f} {r['status']}" if "ratio" in r else r.get("status", "-")
+        print(f"{name:48s} {r['p50_us']:11.1f} {r['p90_us']:11.1f} {r['p99_us']:11.1f} {r['min_us']:11.1f}  {vs}")
+
+    meta = {"python": platform.python_version(), "machine": platform.machine(), "platform": platform.platform()}
+    if args.json:
+        args.json.write_text(json.dumps({"meta": meta, "results": results}, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.update_baseline:
+        keep = {n: {k: round(v, 4) if isinstance(v, float) else v for k, v in r.items() if k not in ("ratio", "status")}
+                for n, r in results.items()}
+        if args.baseline.exists() and (args.pattern or args.group):
+            # 일부만 다시 잰 경우 나머지 기준선은 유지
+            old = json.loads(args.baseline.read_text(encoding="utf-8")).get("results", {})
+            keep = {**old, **keep}
+        args.baseline.write_text(json.dumps({"meta": meta, "results": keep}, ensure_ascii=False, indent=2) + "\n",
+                                 encoding="utf-8")
+        print(f"baseline saved: {args.baseline}")
+        return 0
+
+    if regressed:
+        print(f"\nREGRESSION (> x{args.threshold:.2f} p50): " + ", ".join(regressed), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,18 +8,37 @@ except Exception:
     def load_css(_): pass
     def open_div(_): pass
     def close_div(): pass
+try:
+    from stylekit import inject_once, set_state  # type: ignore
+except Exception:
+    inject_once = None
+    set_state = None
+
+def _style_paths(root: Path) -> list[str]:
+    # one bundle for every state: state rules are scoped by .answering/.idle, switched by class toggling
+    styles = root / "styles"
+    return (
+        [str(styles / "base.css")]
+        + [str(p) for p in sorted((styles / "components").glob("*.css"))]
+        + [str(p) for p in sorted((styles / "states").glob("*.css"))]
+    )
 
 def css_start(answering: bool, root: str | Path | None = None) -> None:
     root = Path(root) if root else Path(__file__).resolve().parent
+    state = "answering" if answering else "idle"
     try:
-        load_css([
-            str(root / "styles/base.css"),
-            str(root / "styles/components/chatbar.css"),
-            str(root / "styles/components/uploader.css"),
-        ])
-        if answering:
-            load_css([str(root / "styles/states/answering.css")])
-        open_div(f'app {"answering" if answering else "idle"}')
+        if inject_once is not None and set_state is not None:
+            inject_once(_style_paths(root))     # CSS bytes only on the session's first run (or after an edit)
+            set_state(["app", state], ["idle" if answering else "answering"])
+        else:
+            load_css([
+                str(root / "styles/base.css"),
+                str(root / "styles/components/chatbar.css"),
+                str(root / "styles/components/uploader.css"),
+            ])
+            if answering:
+                load_css([str(root / "styles/states/answering.css")])
+        open_div(f'app {state}')
     except Exception:
         pass
 
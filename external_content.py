@@ -1,11 +1,32 @@
 # external_content.py
 from __future__ import annotations
 
+import codecs
+import ipaddress
 import re
+import socket
+import threading
+import time
 import requests
-from typing import Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait as _wait_futures
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, List, Sequence, Tuple
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+from dataclasses import dataclass
+from urllib.parse import urljoin, urlparse
+
+try:  # requirements.txt 에 있지만, 없으면 BeautifulSoup(html.parser) 경로로 동작
+    from lxml import etree as _etree
+except ImportError:  # pragma: no cover
+    _etree = None
+
+try:  # 추출 결과 디스크 캐시(없으면 매번 가져옴)
+    from modules.article_cache import default_article_cache
+except Exception:  # pragma: no cover
+    def default_article_cache():
+        return None
 
 # -------------------------------
 # URL 판별/추출 유틸
@@ -28,7 +49,7 @@ def extract_all_urls(text: str, limit: int = 3) -> list[str]:
     return urls[:limit]
 
 # -------------------------------
-# 보안: 로컬/사설망 차단 (간단 SSRF 가드)
+# 보안: 로컬/사설망 차단 (SSRF 가드 — 요청 전, 리다이렉트 hop 마다)
 # -------------------------------
 _PRIVATE_PREFIXES = ("127.", "10.", "192.168.", "169.254.")
 def _is_private_host(host: str) -> bool:
@@ -40,6 +61,36 @@ def _is_private_host(host: str) -> bool:
         or host_l.startswith(_PRIVATE_PREFIXES)
     )
 
+def _is_public_ip(addr: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(addr.split("%", 1)[0])  # IPv6 zone id 제거
+    except ValueError:
+        return False
+    if getattr(ip, "ipv4_mapped", None):
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+def _resolve(host: str, port: int) -> List[str]:
+    """host 의 모든 주소(IP 리터럴이면 그대로). 테스트에서 바꿔 끼울 수 있게 분리."""
+    return [info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)]
+
+def _check_target(url: str, redirected: bool = False) -> None:
+    """
+    요청 전에 대상 확인: http(s) 만, 호스트 이름 규칙(_is_private_host) + DNS 로 얻은 모든 주소가 공인 IP 여야 함.
+    하나라도 사설/루프백/링크로컬/예약 주소면 BlockedTarget. (확인과 연결 사이 DNS 가 바뀌는 경우는 막지 못함)
+    """
+    u = urlparse(url)
+    host = (u.hostname or "").strip("[]")
+    why = "로컬/사설망 주소로 리다이렉트되어 차단했습니다." if redirected else "로컬/사설망 주소는 접근할 수 없습니다."
+    if u.scheme not in ("http", "https") or _is_private_host(host):
+        raise BlockedTarget(why)
+    try:
+        addrs = _resolve(host, u.port or (443 if u.scheme == "https" else 80))
+    except (OSError, UnicodeError):
+        raise FetchError(f"주소를 찾을 수 없습니다: {host}")
+    if not addrs or not all(_is_public_ip(a) for a in addrs):
+        raise BlockedTarget(why)
+
 # -------------------------------
 # 본문 정리/추출
 # -------------------------------
@@ -68,45 +119,406 @@ def _extract_generic(soup: BeautifulSoup) -> str:
             return node.get_text(separator="\n", strip=True)
     return soup.get_text(separator="\n", strip=True)
 
+def _extract_soup(html: str) -> Tuple[str, str]:
+    """BeautifulSoup(html.parser) 경로: (제목, 정리 전 본문). lxml 이 없거나 파싱에 실패하면 사용."""
+    soup = BeautifulSoup(html, "html.parser")
+    title = (soup.title.string or "").strip() if soup.title else ""
+    # 사이트별 전용 → 범용 순으로 폴백
+    return title, (_extract_naver_news(soup) or _extract_generic(soup))
+
+# lxml 경로: 같은 규칙을 C 파서 + 미리 컴파일한 XPath 로 수행.
+#   - 제외 태그는 decompose 대신 clear(keep_tail=True) 로 속만 비움(C 에서 처리, 앞뒤 문자열 경계 유지)
+#   - 텍스트 노드 단위로 모으므로 BeautifulSoup get_text(separator="\n", strip=True) 와 같은 결과
+#     (주석은 텍스트로 치지 않지만 주석 앞뒤 문자열은 따로 끊김, script/style/template 안 문자열은
+#      get_text 가 원래 건너뜀 — BS 와 동일)
+if _etree is not None:
+    _HTML_PARSER = _etree.HTMLParser(no_network=True)
+    _X_TITLE = _etree.XPath("(//title)[1]")
+    _X_NAVER = [_etree.XPath(f"(//*[@id='{i}'])[1]") for i in ("newsct_article", "dic_area")]
+    _X_GENERIC = [_etree.XPath(f"(//{q})[1]") for q in ("article", "*[@id='content']", "main")]
+    _X_TEXT = _etree.XPath(".//text()", smart_strings=False)
+
+def _join_texts(texts: List[str]) -> str:
+    return "\n".join(t for t in (x.strip() for x in texts) if t)
+
+def _clear(root, *tags: str) -> None:
+    for el in root.iter(*tags):
+        el.clear(keep_tail=True)
+
+def _extract_lxml(html: str) -> Tuple[str, str] | None:
+    """lxml 경로: (제목, 정리 전 본문). 파싱할 수 없는 입력이면 None."""
+    try:
+        root = _etree.fromstring(html, _HTML_PARSER)
+    except ValueError:
+        # <?xml encoding=...?> 선언이 붙은 str 은 lxml 이 거부 → 바이트로 넘김
+        try:
+            root = _etree.fromstring(html.encode("utf-8"), _etree.HTMLParser(no_network=True, encoding="utf-8"))
+        except Exception:
+            return None
+    except Exception:
+        return None
+    if root is None:
+        return None
+
+    t = _X_TITLE(root)
+    title = (t[0].text or "").strip() if t and len(t[0]) == 0 else ""
+
+    _clear(root, "script", "style", "template")
+    for xp in _X_NAVER:
+        area = xp(root)
+        if area:
+            text = _join_texts(_X_TEXT(area[0]))   # 네이버 전용은 noscript 도 포함(기존 동작)
+            if text:
+                return title, text
+            break
+    _clear(root, "noscript")
+    for xp in _X_GENERIC:
+        node = xp(root)
+        if node:
+            text = _join_texts(_X_TEXT(node[0]))
+            if text:
+                return title, text
+    return title, _join_texts(_X_TEXT(root))
+
+def extract_article(html: str) -> Tuple[str, str]:
+    """
+    HTML → (제목, 정리 전 본문). 셀렉터 우선순위:
+      #newsct_article → #dic_area(네이버) → article → #content → main → 문서 전체
+    lxml 이 있으면 lxml 로, 없거나 실패하면 BeautifulSoup(html.parser) 로 처리(결과 동일).
+    """
+    if _etree is not None:
+        out = _extract_lxml(html)
+        if out is not None:
+            return out
+    return _extract_soup(html)
+
+# -------------------------------
+# HTTP: 풀링 세션 + 스트리밍 다운로드(바이트 상한/전체 시간 상한)
+# -------------------------------
+MAX_FETCH_BYTES = 1_500_000        # 본문 4,000자 발췌에는 앞부분이면 충분
+MAX_REDIRECTS = 5                  # 리다이렉트는 직접 따라가며 hop 마다 대상 확인
+_CHUNK_BYTES = 32 * 1024
+_SNIFF_BYTES = 4096                # <meta charset> 탐색 범위
+_ALLOWED_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,text/plain;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+}
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?\s*([A-Za-z0-9_\-]+)', re.I)
+
+class FetchError(Exception):
+    """외부 페이지 요청 실패(비허용 형식, 시간 초과 등). str(e)는 사용자 표시용."""
+
+class BlockedTarget(FetchError):
+    """로컬/사설망 대상(리다이렉트 포함)."""
+
+class NotModified(FetchError):
+    """조건부 요청에 304 — 캐시된 추출 결과를 그대로 쓰면 됨."""
+
+@dataclass
+class FetchResult:
+    html: str
+    final_url: str
+    truncated: bool
+    etag: str | None = None
+    last_modified: str | None = None
+    storable: bool = True      # Cache-Control: no-store 면 False
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+def _http() -> requests.Session:
+    """프로세스 공용 keep-alive 세션(같은 호스트 재요청 시 TCP/TLS 핸드셰이크 재사용)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers.update(_HEADERS)
+            _session = s
+        return _session
+
+def _charset_from_header(content_type: str) -> str | None:
+    for part in content_type.split(";")[1:]:
+        k, _, v = part.strip().partition("=")
+        if k.lower() == "charset" and v:
+            return v.strip("\"' ").lower()
+    return None
+
+def _decode(body: bytes, header_charset: str | None) -> str:
+    """헤더 charset → <meta charset> → utf-8 → cp949 순. 전체 재감지(chardet) 없이 잘린 바이트만 디코드."""
+    candidates = [header_charset]
+    m = _META_CHARSET_RE.search(body[:_SNIFF_BYTES])
+    if m:
+        candidates.append(m.group(1).decode("ascii", "ignore").lower())
+    candidates += ["utf-8", "cp949"]
+    for cs in candidates:
+        if not cs:
+            continue
+        try:
+            if codecs.lookup(cs).name == "euc_kr":
+                cs = "cp949"  # EUC-KR 로 표기된 한국 사이트 대부분은 실제로 cp949 확장 문자를 씀
+        except LookupError:
+            continue
+        try:
+            return body.decode(cs)
+        except UnicodeDecodeError:
+            # 상한에서 잘린 다중바이트 문자 때문일 수 있으므로 끝 몇 바이트만 버리고 재시도
+            try:
+                return body[:-4].decode(cs)
+            except UnicodeDecodeError:
+                continue
+    return body.decode("utf-8", errors="replace")
+
+def fetch_html(url: str, timeout: float = 10, max_bytes: int = MAX_FETCH_BYTES) -> Tuple[str, str, bool]:
+    """
+    (디코드된 문서, 최종 URL, 잘림 여부) 반환. 실패 시 FetchError.
+      - 공용 세션(커넥션 풀) + stream=True 로 청크 단위 수신, max_bytes 에서 중단
+      - timeout 은 연결~본문 수신 전체에 대한 상한(청크 사이마다 남은 시간 확인;
+        소켓 읽기 1회는 requests 의 read timeout 으로 따로 묶임)
+      - Content-Type 이 HTML/텍스트가 아니면 본문을 받지 않고 중단
+    """
+    res = _fetch(url, timeout, max_bytes)
+    return res.html, res.final_url, res.truncated
+
+def _get_checked(
+    url: str, deadline: float, timeout: float, validators: Dict[str, str] | None
+) -> requests.Response:
+    """
+    allow_redirects=False 로 한 hop 씩 요청: 매 hop 대상(_check_target)을 요청 전에 확인하고
+    Location 을 따라감(최대 MAX_REDIRECTS). 반환된 응답(리다이렉트 아님)은 호출부가 닫음.
+    """
+    current = url
+    for hop in range(MAX_REDIRECTS + 1):
+        _check_target(current, redirected=hop > 0)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise FetchError(f"시간 초과({timeout:g}s)")
+        r = _http().get(
+            current, stream=True, allow_redirects=False,
+            timeout=(min(remaining, 5.0), remaining), headers=validators or None,
+        )
+        location = r.headers.get("Location") if r.is_redirect else None
+        if not location:
+            return r
+        r.close()
+        current = urljoin(current, location)
+    raise FetchError(f"리다이렉트가 너무 많습니다(>{MAX_REDIRECTS})")
+
+def _fetch(
+    url: str, timeout: float, max_bytes: int, validators: Dict[str, str] | None = None
+) -> FetchResult:
+    """fetch_html 본체. validators(If-None-Match 등)를 주면 조건부 요청, 304 면 NotModified."""
+    deadline = time.monotonic() + timeout
+    r = _get_checked(url, deadline, timeout, validators)
+    try:
+        if r.status_code == 304 and validators:
+            raise NotModified(r.url)
+        r.raise_for_status()
+
+        ctype = r.headers.get("Content-Type", "")
+        mime = ctype.split(";")[0].strip().lower()
+        if mime and not mime.startswith(_ALLOWED_TYPES):
+            raise FetchError(f"지원하지 않는 형식입니다: {mime}")
+
+        buf = bytearray()
+        truncated = False
+        for chunk in r.iter_content(chunk_size=_CHUNK_BYTES):
+            if time.monotonic() > deadline:
+                raise FetchError(f"시간 초과({timeout:g}s)")
+            buf += chunk
+            if len(buf) >= max_bytes:
+                del buf[max_bytes:]
+                truncated = True
+                break
+        return FetchResult(
+            html=_decode(bytes(buf), _charset_from_header(ctype)),
+            final_url=r.url,
+            truncated=truncated,
+            etag=r.headers.get("ETag"),
+            last_modified=r.headers.get("Last-Modified"),
+            storable="no-store" not in r.headers.get("Cache-Control", "").lower(),
+        )
+    finally:
+        r.close()  # 상한에서 끊어도 남은 본문은 받지 않음(해당 연결은 풀에 반환되지 않고 닫힘)
+
 # -------------------------------
 # 외부 기사 가져오기
 # -------------------------------
-def fetch_article_text(url: str, timeout: int = 10, max_chars: int = 4000) -> Tuple[str, str]:
+def fetch_article_text(
+    url: str,
+    timeout: int = 10,
+    max_chars: int = 4000,
+    max_bytes: int = MAX_FETCH_BYTES,
+    use_cache: bool = True,
+) -> Tuple[str, str]:
     """
     외부 페이지에서 (제목, 본문 일부) 반환
     실패 시 (에러표시, 메시지) 반환
+    use_cache 면 추출 결과 디스크 캐시 사용: TTL 안이면 네트워크/파싱 없이 반환,
+    지났으면 ETag/Last-Modified 조건부 요청으로 304 일 때 재사용. 실패 결과는 저장하지 않음.
     """
-    try:
-        host = urlparse(url).hostname or ""
-        if _is_private_host(host):
-            return "[에러: 비허용 대상]", "로컬/사설망 주소는 접근할 수 없습니다."
-
-        r = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
-        r.raise_for_status()
+    cache = default_article_cache() if use_cache else None
+    entry = cache.get(url) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        return entry.title, entry.text[:max_chars]
 
-        soup = BeautifulSoup(r.text, "html.parser")
-        title = (soup.title.string or "").strip() if soup.title else ""
+    try:
+        try:
+            res = _fetch(url, timeout, max_bytes, entry.validators() if entry is not None else None)
+        except NotModified:
+            cache.touch(url)
+            return entry.title, entry.text[:max_chars]
+        except BlockedTarget as e:
+            return "[에러: 비허용 대상]", str(e)
+        except FetchError as e:
+            return "[에러: 기사 요청 실패]", str(e)
 
-        # 사이트별 전용 → 범용 순으로 폴백
-        text = _extract_naver_news(soup) or _extract_generic(soup)
-        text = _clean_text(text)[:max_chars]
+        title, text = extract_article(res.html)
+        title = title or url
+        text = _clean_text(text)
+        if cache is not None and text and res.storable:
+            cache.put(url, title, text, res.etag, res.last_modified)
 
-        return (title or url), (text or "[본문 추출 실패]")
+        return title, (text[:max_chars] or "[본문 추출 실패]")
     except Exception as e:
         return "[에러: 기사 요청 실패]", f"{type(e).__name__}: {e}"
 
 # -------------------------------
-# 프롬프트용 블록 생성
+# 여러 URL 동시 가져오기 (호스트별 동시 요청 상한 + 전체 데드라인)
 # -------------------------------
-def make_url_context(url: str) -> str:
+PER_HOST_LIMIT = 2          # 같은 사이트에 한꺼번에 몰리지 않도록
+BATCH_DEADLINE = 12.0       # 링크 여러 개라도 답변 전 대기는 이 시간까지
+_BATCH_WORKERS = 8
+
+_MAX_HOST_SLOTS = 256      # 호스트별 세마포어 보관 상한(넘으면 아무도 쓰지 않는 오래된 것부터 정리)
+
+class _HostSlot:
+    __slots__ = ("sem", "users")
+
+    def __init__(self, limit: int):
+        self.sem = threading.BoundedSemaphore(max(1, limit))
+        self.users = 0         # 이 슬롯을 기다리거나 쥐고 있는 요청 수(0 이면 지워도 안전)
+
+_fetch_pool: ThreadPoolExecutor | None = None
+_host_sems: "OrderedDict[Tuple[str, int], _HostSlot]" = OrderedDict()
+_batch_lock = threading.Lock()
+
+def _fetcher() -> ThreadPoolExecutor:
+    """프로세스 공용 워커 풀(세션마다 스레드를 새로 만들지 않음)."""
+    global _fetch_pool
+    with _batch_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(max_workers=_BATCH_WORKERS, thread_name_prefix="url-fetch")
+        return _fetch_pool
+
+@contextmanager
+def _host_slot(host: str, limit: int) -> Iterator[threading.BoundedSemaphore]:
     """
-    모델 프롬프트에 바로 넣기 좋은 컨텍스트 블록 생성
+    호스트별 세마포어를 빌려줌(LRU). 보관 수가 _MAX_HOST_SLOTS 를 넘으면 users 가 0 인 오래된 항목부터 지움 —
+    쓰는 중인 슬롯은 남기므로 같은 호스트의 동시 요청 상한은 그대로 지켜짐.
     """
-    title, text = fetch_article_text(url)
-    return f"""[외부 링크 원문]
+    key = (host, limit)
+    with _batch_lock:
+        slot = _host_sems.get(key)
+        if slot is None:
+            slot = _host_sems[key] = _HostSlot(limit)
+        _host_sems.move_to_end(key)
+        slot.users += 1
+    try:
+        yield slot.sem
+    finally:
+        with _batch_lock:
+            slot.users -= 1
+            if len(_host_sems) > _MAX_HOST_SLOTS:
+                for k in [k for k, v in _host_sems.items() if v.users == 0][:len(_host_sems) - _MAX_HOST_SLOTS]:
+                    del _host_sems[k]
+
+def _timeout_placeholder(deadline: float) -> Tuple[str, str]:
+    return "[에러: 시간 초과]", f"{deadline:g}초 안에 가져오지 못해 건너뛰었습니다."
+
+def _fetch_until(url: str, end: float, deadline: float, per_host: int, max_chars: int) -> Tuple[str, str]:
+    """호스트 슬롯을 얻은 뒤, 남은 시간을 요청 timeout 으로 넘겨 가져옴."""
+    with _host_slot((urlparse(url).hostname or "").lower(), per_host) as sem:
+        remaining = end - time.monotonic()
+        if remaining <= 0 or not sem.acquire(timeout=remaining):
+            return _timeout_placeholder(deadline)
+        try:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return _timeout_placeholder(deadline)
+            return fetch_article_text(url, timeout=remaining, max_chars=max_chars)
+        finally:
+            sem.release()
+
+def fetch_articles(
+    urls: Sequence[str],
+    deadline: float = BATCH_DEADLINE,
+    per_host: int = PER_HOST_LIMIT,
+    max_chars: int = 4000,
+) -> List[Tuple[str, str]]:
+    """
+    여러 URL 을 동시에 가져와 입력 순서대로 [(제목, 본문 일부), ...] 반환
+      - 같은 호스트는 per_host 개까지만 동시에 요청
+      - deadline(초) 안에 끝나지 않은 URL 은 기다리지 않고 자리표시로 대체
+      - 중복 URL 은 한 번만 가져옴
+    """
+    if not urls:
+        return []
+    end = time.monotonic() + deadline
+    pool = _fetcher()
+    futures = {
+        u: pool.submit(_fetch_until, u, end, deadline, per_host, max_chars)
+        for u in dict.fromkeys(urls)
+    }
+    _wait_futures(list(futures.values()), timeout=max(0.0, end - time.monotonic()))
+
+    out: List[Tuple[str, str]] = []
+    for u in urls:
+        fut = futures[u]
+        if not fut.done():
+            fut.cancel()  # 아직 대기열에 있으면 실행 취소, 진행 중이면 남은 timeout 뒤 스스로 끝남
+            out.append(_timeout_placeholder(deadline))
+            continue
+        try:
+            out.append(fut.result())
+        except Exception as e:
+            out.append(("[에러: 기사 요청 실패]", f"{type(e).__name__}: {e}"))
+    return out
+
+# -------------------------------
+# 프롬프트용 블록 생성
+# -------------------------------
+def _url_block(title: str, url: str, text: str, label: str = "[외부 링크 원문]") -> str:
+    return f"""{label}
 제목: {title}
 URL: {url}
 
 본문(발췌):
 {text}
 """
+
+def make_url_context(url: str) -> str:
+    """
+    모델 프롬프트에 바로 넣기 좋은 컨텍스트 블록 생성
+    """
+    title, text = fetch_article_text(url)
+    return _url_block(title, url, text)
+
+def make_urls_context(urls: Sequence[str], deadline: float = BATCH_DEADLINE, max_chars: int = 4000) -> str:
+    """
+    메시지 속 여러 URL(extract_all_urls 결과)을 동시에 가져와 하나의 컨텍스트 블록으로 합침.
+    순서는 입력 순서 그대로, 실패/시간 초과 URL 은 에러 표시 블록으로 남김.
+    """
+    urls = list(urls)
+    if not urls:
+        return ""
+    results = fetch_articles(urls, deadline=deadline, max_chars=max_chars)
+    n = len(urls)
+    return "\n".join(
+        _url_block(title, url, text, label=f"[외부 링크 원문 {i}/{n}]" if n > 1 else "[외부 링크 원문]")
+        for i, (url, (title, text)) in enumerate(zip(urls, results), 1)
+    )
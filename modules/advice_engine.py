@@ -1,6 +1,27 @@
 # modules/advice_engine.py  (통합버전: 스트리밍 + 조문 직링크 후처리 포함)
 from __future__ import annotations
-from typing import Callable, Dict, List, Optional, Tuple, Generator, Any
+import asyncio
+import hashlib
+import inspect
+import os
+import threading
+import time
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Tuple, Generator, Any
+
+from .aio_bridge import iterate_async
+from .doc_index import DocIndex
+from .ingest import chunks_to_context
+from .law_api import default_law_api
+from .llm_client import LAW_TOOLS, make_client, safe_chat_completion
+from .llm_scheduler import PRIORITY_INTERACTIVE, PRIORITY_STREAM, default_scheduler
+from .primer import PrimerPrefetcher, PrimerStats, prefetch_via_search, summarize_laws_for_primer
+from .response_cache import ResponseCache, make_key, replay_events
+from .similar_cache import SimilarQuestionCache
+from .statute_index import LocalFirstSearch, default_statute_index
+from .token_budget import TokenBudget
+from .telemetry import NULL_TRACE, Trace, TraceHook, default_registry, emit as _emit_trace
+from .tool_cache import ToolResultCache, shared_tool_cache
+from .tool_runner import ToolRunner
 
 # =========================
 # 조문 직링크 생성 유틸 (내장)
@@ -8,22 +29,8 @@ from typing import Callable, Dict, List, Optional, Tuple, Generator, Any
 import re
 from urllib.parse import quote
 
-# 자주 쓰는 약칭 보정(필요 시 추가)
-ALIAS_MAP: Dict[str, str] = {
-    "형소법": "형사소송법",
-    "민소법": "민사소송법",
-    "민집법": "민사집행법",
-    # "형법": "형법",
-}
-
-# "민법 제839조의2" / "민사소송법 제163조" 등 패턴
-ARTICLE_PAT = re.compile(
-    r'(?P<law>[가-힣A-Za-z0-9·()\s]{2,40})\s*제(?P<num>\d{1,4})조(?P<ui>(의\d{1,3}){0,2})'
-)
-
-def _normalize_law_name(name: str) -> str:
-    name = (name or "").strip()
-    return ALIAS_MAP.get(name, name)
+# 조문 인용 추출은 linking.py 와 공용 엔진(사전 기반 매처, 약칭 보정 포함) 사용
+from .citations import CitationScanner, extract_citations
 
 def _make_deep_article_url(law_name: str, article_label: str) -> str:
     """
@@ -35,39 +42,39 @@ def _make_deep_article_url(law_name: str, article_label: str) -> str:
     return f"https://law.go.kr/법령/{quote(law_name)}/{quote(article_label)}"
 
 def _extract_article_citations(text: str) -> List[Tuple[str, str]]:
-    found: List[Tuple[str, str]] = []
-    for m in ARTICLE_PAT.finditer(text or ""):
-        law = _normalize_law_name(m.group("law"))
-        art = f"제{m.group('num')}조{m.group('ui') or ''}"
-        found.append((law, art))
-    # 유니크 보장
-    return list({(l, a) for (l, a) in found})
+    # 유니크 보장(발견 순서 유지)
+    return extract_citations(text or "")
+
+def _render_link_line(law: str, art: str) -> str:
+    return f"- [{law} {art}]({_make_deep_article_url(law, art)})"
 
 def _render_article_links_block(citations: List[Tuple[str, str]]) -> str:
     if not citations:
         return ""
     lines = ["", "### 참고 링크(조문)"]
     for law, art in sorted(citations):
-        url = _make_deep_article_url(law, art)
-        lines.append(f"- [{law} {art}]({url})")
+        lines.append(_render_link_line(law, art))
     return "\n".join(lines)
 
-def merge_article_links_block(text: str) -> str:
-    """
-    본문 내 '법령명 제N조(의M)' 패턴을 수집하여
-    문서 끝에 '### 참고 링크(조문)' 블록을 추가/갱신.
-    """
-    citations = _extract_article_citations(text)
+_LINK_BLOCK_PAT = re.compile(r'\n### 참고 링크\(조문\)[\s\S]*$', re.M)
+
+def _apply_links_block(text: str, citations: List[Tuple[str, str]]) -> str:
     block = _render_article_links_block(citations)
     if not block:
         return text
 
     # 기존 블록이 있으면 교체, 없으면 추가
-    pat_block = re.compile(r'\n### 참고 링크\(조문\)[\s\S]*$', re.M)
-    if pat_block.search(text or ""):
-        return pat_block.sub(block, text or "")
+    if _LINK_BLOCK_PAT.search(text or ""):
+        return _LINK_BLOCK_PAT.sub(block, text or "")
     return (text or "").rstrip() + "\n" + block + "\n"
 
+def merge_article_links_block(text: str) -> str:
+    """
+    본문 내 '법령명 제N조(의M)' 패턴을 수집하여
+    문서 끝에 '### 참고 링크(조문)' 블록을 추가/갱신.
+    """
+    return _apply_links_block(text, _extract_article_citations(text))
+
 
 # =========================
 # 본 엔진
@@ -76,6 +83,12 @@ ToolFn = Callable[..., Dict[str, Any]]
 PrefetchFn = Callable[..., Any]
 SummarizeFn = Callable[..., str]
 
+Event = Tuple[str, str, List[Dict[str, Any]]]
+
+MSG_NOT_CONFIGURED = "엔진이 설정되지 않았습니다."
+MSG_BLOCKED = "안전정책으로 답변을 생성할 수 없습니다."
+MSG_UNAVAILABLE = "모델이 일시적으로 응답하지 않습니다. 잠시 뒤 다시 시도해 주세요."
+
 def _safe_json_dumps(obj: Any) -> str:
     try:
         import json
@@ -83,6 +96,48 @@ def _safe_json_dumps(obj: Any) -> str:
     except Exception:
         return "{}"
 
+async def _acall(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """async 함수는 그대로 await, 동기 함수는 스레드로 넘겨 루프를 막지 않음."""
+    if inspect.iscoroutinefunction(fn):
+        return await fn(*args, **kwargs)
+    result = await asyncio.to_thread(fn, *args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+def _chunk_text(ch: Any) -> Tuple[Optional[str], bool]:
+    """스트림 청크 → (텍스트조각, 종료여부)."""
+    c = ch.choices[0]
+    if getattr(c, "finish_reason", None):
+        return None, True
+    d = getattr(c, "delta", None)
+    return (getattr(d, "content", None) if d else None), False
+
+def _collect_law_items(result: Any, law_for_links: List[Dict[str, Any]]) -> None:
+    # 링크용 결과 축적
+    if isinstance(result, dict) and result.get("items"):
+        law_for_links.extend(result["items"])
+    elif isinstance(result, list):
+        for r in result:
+            if isinstance(r, dict) and r.get("items"):
+                law_for_links.extend(r["items"])
+
+def _tool_msgs_for_cache(msgs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """assistant(tool_calls)+tool 메시지를 SDK 객체 없이 재사용 가능한 dict 로 변환."""
+    out: List[Dict[str, Any]] = []
+    for m in msgs:
+        if m.get("role") == "assistant" and m.get("tool_calls"):
+            calls = [
+                {"id": c.id, "type": "function",
+                 "function": {"name": c.function.name, "arguments": c.function.arguments}}
+                if not isinstance(c, dict) else c
+                for c in m["tool_calls"]
+            ]
+            out.append({"role": "assistant", "tool_calls": calls})
+        else:
+            out.append(dict(m))
+    return out
+
 class AdviceEngine:
     """
     LLM 호출 + (선택)툴콜 + 스트리밍 처리 + '조문 직링크' 후처리 엔진.
@@ -93,6 +148,22 @@ class AdviceEngine:
            ("final", 최종전체텍스트, law_links) ... 1번
       - stream=False -> 제너레이터:
            ("final", 최종전체텍스트, law_links) ... 1번
+      - link_events=True 이면 스트리밍 중 새 조문 인용을 찾을 때마다
+           ("link", "- [법령명 제N조](URL)", law_links) 를 delta 사이에 추가로 냄
+
+    agenerate()는 같은 이벤트를 내는 async 제너레이터입니다(async 클라이언트/툴/프라이머 지원).
+    agenerate_sync()는 agenerate()를 공용 이벤트 루프에서 돌려 동기 제너레이터로 노출합니다.
+
+    response_cache 를 주면 (질문, mode, 시스템프롬프트, 모델, 온도) 가 같은 요청은 캐시에서
+    같은 이벤트 순서로 재생합니다. use_cache=False 로 우회, invalidate_cached() 로 무효화.
+    similar_cache 를 주면 표현만 조금 다른 질문도 (Intent·mode·시스템 프롬프트·툴 허용별) 유사도로 찾아, 충분히 가까우면 답변을 재생하고
+    그보다 덜 가까우면 지난 툴 결과를 재사용해 1차 호출·툴 실행을 건너뜁니다(언급 법령·조문 인용·숫자가 같은 질문만).
+    token_budget 을 주면 툴 결과를 압축해 최종 프롬프트를 예산 안에 맞추고, 절약한 토큰은 budget_stats 로 집계합니다.
+    trace_hooks 를 주면 턴마다 Trace(primer, first_call, tool별, tools, final_call, first_delta, stream, link_merge
+    구간과 usage 토큰)를 넘깁니다. 훅이 없으면 추적 비용은 없습니다.
+    generate(doc_index=...) 로 세션의 첨부 문서 색인을 넘기면 질문과 관련된 청크만 doc_tokens 예산 안에서
+    골라 시스템 메시지로 붙입니다(첨부 문서가 붙은 턴은 답변 캐시를 쓰지 않음).
+    generate(user=...) 는 LLM 호출 kwargs 의 user 로 전달됩니다(API 의 최종 사용자 식별자, 스케줄러의 사용자별 버킷 키).
     """
 
     def __init__(
@@ -106,6 +177,18 @@ class AdviceEngine:
         prefetch_law_context: Optional[PrefetchFn] = None,
         summarize_laws_for_primer: Optional[SummarizeFn] = None,
         temperature: float = 0.2,
+        tool_workers: int = 4,
+        tool_timeout: float = 8.0,
+        tool_deadline: float = 15.0,
+        primer_budget: Optional[float] = None,
+        async_client: Any = None,
+        async_safe_chat_completion: Optional[Callable[..., Awaitable[Dict[str, Any]]]] = None,
+        response_cache: Optional[ResponseCache] = None,
+        tool_cache: Optional[ToolResultCache] = None,
+        similar_cache: Optional[SimilarQuestionCache] = None,
+        token_budget: Optional[TokenBudget] = None,
+        trace_hooks: Optional[List[TraceHook]] = None,
+        doc_tokens: int = 1800,
         # 라우팅/프롬프트는 외부(app.py 또는 다른 모듈)에서 처리해 messages로 넣어주는 설계도 가능하지만,
         # 여기서는 messages를 이 클래스에서 구성하는 형태(일반적 사용)를 가정합니다.
     ):
@@ -113,11 +196,245 @@ class AdviceEngine:
         self.model = model
         self.tools = tools
         self.scc = safe_chat_completion
+        # tool_cache(보통 shared_tool_cache())를 주면 툴 결과를 프로세스 단위로 캐시/합치기
+        if tool_cache is not None:
+            # 합류한 호출은 tool_timeout 안에서만 선행 요청을 기다림(멈춘 선행 요청에 모두 묶이지 않도록)
+            tool_search_one = (tool_cache.wrap("search_one", tool_search_one, tool_timeout)
+                               if tool_search_one else tool_search_one)
+            tool_search_multi = (tool_cache.wrap("search_multi", tool_search_multi, tool_timeout)
+                                 if tool_search_multi else tool_search_multi)
         self.tool_search_one = tool_search_one
         self.tool_search_multi = tool_search_multi
         self.prefetch_law_context = prefetch_law_context
         self.summarize_laws_for_primer = summarize_laws_for_primer
         self.temperature = temperature
+        # agenerate() 전용: 없으면 client / safe_chat_completion 을 그대로 사용(동기면 스레드로 실행)
+        self.async_client = async_client
+        self.ascc = async_safe_chat_completion
+        self.response_cache = response_cache
+        self.similar_cache = similar_cache
+        # token_budget 을 주면 최종 호출 전에 툴 결과를 필요한 필드만 남기고 예산 안으로 줄임
+        self.token_budget = token_budget
+        # trace_hooks(예: default_registry().as_hook(), JsonlTraceSink(path))가 있으면 턴마다 단계별 추적을 넘김
+        self.trace_hooks: List[TraceHook] = list(trace_hooks or [])
+        # generate(doc_index=...) 로 넘긴 첨부 문서에서 턴마다 가져올 발췌 토큰 상한
+        self.doc_tokens = doc_tokens
+        # 한 턴의 tool_calls는 풀에서 동시에 실행(결과 순서는 tool_call_id 순서 유지)
+        self.tool_runner = ToolRunner(
+            {"search_one": self._call_search_one, "search_multi": self._call_search_multi},
+            max_workers=tool_workers,
+            call_timeout=tool_timeout,
+            turn_deadline=tool_deadline,
+        )
+        # primer_budget(초)을 주면 프라이머를 백그라운드로 선행 조회하고, 예산 초과 시 없이 진행
+        self.primer_budget = primer_budget
+        self.primer: Optional[PrimerPrefetcher] = None
+        if primer_budget is not None and prefetch_law_context and summarize_laws_for_primer:
+            self.primer = PrimerPrefetcher(
+                prefetch_law_context, summarize_laws_for_primer, budget=primer_budget,
+            )
+
+    def prime(self, user_q: str) -> None:
+        """
+        프라이머 선행 조회 시작(백그라운드 모드에서만 동작).
+        호출부가 의도 분류/시스템 프롬프트 구성 전에 불러 두면 그 시간만큼 겹쳐서 진행됩니다.
+        generate()도 진입 즉시 같은 질문으로 호출하므로 생략해도 됩니다.
+        """
+        if self.primer is not None:
+            self.primer.start(user_q)
+
+    @property
+    def primer_stats(self) -> Optional[PrimerStats]:
+        return self.primer.stats if self.primer is not None else None
+
+    # 생성 후 tool_search_* 를 바꿔 끼워도 반영되도록 속성을 통해 호출
+    def _call_search_one(self, **kw: Any) -> Any:
+        return self.tool_search_one(**kw)
+
+    def _call_search_multi(self, **kw: Any) -> Any:
+        return self.tool_search_multi(**kw)
+
+    # ---- 답변 캐시 ----
+    def _cache_key(self, user_q: str, mode: str, system_prompt: str, allow_tools: bool) -> str:
+        return make_key(user_q, f"{mode}|{'tools' if allow_tools else 'plain'}",
+                        system_prompt, self.model, self.temperature)
+
+    def _cache_lookup(
+        self, use_cache: bool, user_q: str, mode: str, system_prompt: str, allow_tools: bool
+    ) -> Tuple[Optional[str], Optional[Tuple[str, List[Dict[str, Any]]]]]:
+        """(키, 적중값). 캐시가 없거나 우회면 (None, None)."""
+        cache = self.response_cache
+        if cache is None:
+            return None, None
+        if not use_cache:
+            cache.stats.bypass += 1
+            return None, None
+        key = self._cache_key(user_q, mode, system_prompt, allow_tools)
+        return key, cache.get(key)
+
+    # ---- 추적 ----
+    def _new_trace(self, **attrs: Any) -> Trace:
+        return Trace("advice", model=self.model, **attrs) if self.trace_hooks else NULL_TRACE
+
+    def _end_trace(self, trace: Trace, **attrs: Any) -> None:
+        if trace.enabled:
+            trace.finish(**attrs)
+            _emit_trace(trace, self.trace_hooks)
+
+    @staticmethod
+    def _tool_observer(trace: Trace) -> Optional[Callable[[str, float, float, str], None]]:
+        if not trace.enabled:
+            return None
+        return lambda name, t0, t1, status: trace.add("tool", t0, t1, tool=name, status=status)
+
+    @property
+    def budget_stats(self) -> Optional[Dict[str, Any]]:
+        """툴 결과 압축 집계(턴 수, 절약 토큰, 제외 항목, 최근 턴별 리포트) — token_budget 미사용 시 None."""
+        return self.token_budget.stats_dict() if self.token_budget is not None else None
+
+    @staticmethod
+    def _similar_scope(mode: str, system_prompt: str, allow_tools: bool) -> str:
+        # 유사 질문 캐시의 색인 구분: 같은 모드·시스템 프롬프트·툴 허용 여부로 만든 답만 재생/재사용
+        digest = hashlib.sha256((system_prompt or "").encode("utf-8")).hexdigest()[:16]
+        return f"{mode}|{digest}|{'tools' if allow_tools else 'plain'}"
+
+    def _similar_lookup(
+        self, use_cache: bool, user_q: str, mode: str, system_prompt: str, allow_tools: bool
+    ) -> Tuple[Optional[str], Any]:
+        """("answer"|"tools"|None, payload). 툴 재사용은 도구 모드이고 저장된 툴 메시지가 있을 때만."""
+        if self.similar_cache is None or not use_cache:
+            return None, None
+        scope = self._similar_scope(mode, system_prompt, allow_tools)
+        grade, _score, payload = self.similar_cache.lookup(user_q, scope=scope)
+        if grade == "tools" and not (allow_tools and payload.get("tool_msgs")):
+            return None, None
+        return grade, payload
+
+    def _similar_store(
+        self, user_q: str, text: str, links: List[Dict[str, Any]], state: Dict[str, Any],
+        mode: str, system_prompt: str, allow_tools: bool,
+    ) -> None:
+        if self.similar_cache is not None:
+            self.similar_cache.insert(
+                user_q, {"text": text, "links": links, "tool_msgs": state.get("tool_msgs")},
+                scope=self._similar_scope(mode, system_prompt, allow_tools),
+            )
+
+    def invalidate_cached(self, user_q: str, *, system_prompt: str, allow_tools: bool, mode: str = "") -> None:
+        if self.response_cache is not None:
+            self.response_cache.invalidate(self._cache_key(user_q, mode, system_prompt, allow_tools))
+
+    # ---- generate()/agenerate() 공용 단계 ----
+    def _use_primer(self, allow_tools: bool, primer_enable: bool) -> bool:
+        return bool(allow_tools and primer_enable and self.prefetch_law_context and self.summarize_laws_for_primer)
+
+    @staticmethod
+    def _base_messages(
+        system_prompt: str, primer: Optional[str], user_q: str, docs: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        msgs: List[Dict[str, Any]] = [{"role": "system", "content": system_prompt}]
+        if primer:
+            msgs.append({"role": "system", "content": primer})
+        if docs:
+            msgs.append({"role": "system", "content": "사용자가 첨부한 문서 중 질문과 관련된 부분입니다.\n\n" + docs})
+        msgs.append({"role": "user", "content": user_q})
+        return msgs
+
+    def _doc_context(self, user_q: str, doc_index: Optional[DocIndex], trace: Trace) -> str:
+        """첨부 문서 색인에서 질문 관련 청크를 예산 안에서 골라 블록으로(없으면 빈 문자열)."""
+        if doc_index is None or not len(doc_index):
+            return ""
+        with trace.span("doc_retrieval") as sp:
+            picked = doc_index.select(user_q, max_tokens=self.doc_tokens)
+            sp["chunks"] = len(picked)
+            return chunks_to_context(picked, max_chars=10 ** 9) if picked else ""
+
+    def _first_call_kwargs(self, msgs: List[Dict[str, Any]], allow_tools: bool, user: str = "") -> Dict[str, Any]:
+        # 1차 호출 (툴콜 허용/차단)
+        return dict(
+            **({"user": user} if user else {}),
+            messages=msgs,
+            model=self.model,
+            stream=False,
+            allow_retry=True,
+            priority=PRIORITY_INTERACTIVE,  # 사용자가 기다리는 호출(툴 없는 plain 모드도)
+            tools=self.tools if allow_tools else [],
+            tool_choice="auto" if allow_tools else "none",
+            temperature=self.temperature,
+            max_tokens=800,
+        )
+
+    def _final_call_kwargs(self, msgs: List[Dict[str, Any]], stream: bool, user: str = "") -> Dict[str, Any]:
+        return dict(
+            **({"user": user} if user else {}),
+            # 스트리밍은 usage 가 기본으로 오지 않음: include_usage 면 마지막 청크(choices 비어 있음)에 실림
+            **({"stream_options": {"include_usage": True}} if stream else {}),
+            messages=msgs, model=self.model,
+            stream=stream, allow_retry=True, temperature=self.temperature, max_tokens=1400,
+            priority=PRIORITY_STREAM,  # 스트리밍 여부와 관계없이 사용자가 기다리는 최종 답
+        )
+
+    @staticmethod
+    def _first_call_error(resp1: Dict[str, Any]) -> Optional[str]:
+        if resp1.get("type") == "blocked_by_content_filter":
+            return resp1.get("message") or MSG_BLOCKED
+        if "resp" not in resp1:
+            return MSG_UNAVAILABLE
+        return None
+
+    @staticmethod
+    def _final_call_error(resp2: Dict[str, Any], stream: bool) -> Optional[str]:
+        if resp2.get("type") == "blocked_by_content_filter":
+            return resp2.get("message") or MSG_BLOCKED
+        if ("stream" if stream else "resp") not in resp2:
+            return MSG_UNAVAILABLE
+        return None
+
+    def _append_tool_results(
+        self,
+        msgs: List[Dict[str, Any]],
+        tool_calls: Any,
+        results: List[Tuple[Any, Any]],
+        law_for_links: List[Dict[str, Any]],
+        user_q: str,
+        state: Dict[str, Any],
+    ) -> None:
+        # 링크용은 원본 전체 항목, 모델에는 (token_budget 이 있으면) 예산에 맞춰 압축한 결과
+        payloads = [result for _, result in results]
+        for result in payloads:
+            _collect_law_items(result, law_for_links)
+        if self.token_budget is not None:
+            payloads, report = self.token_budget.fit(user_q, payloads, self.token_budget.message_tokens(msgs))
+            state["budget"] = report.as_dict()
+        msgs.append({"role": "assistant", "tool_calls": tool_calls})
+        for (call, _), payload in zip(results, payloads):
+            msgs.append({
+                "role": "tool",
+                "tool_call_id": call.id,
+                "content": _safe_json_dumps(payload),
+            })
+
+    @staticmethod
+    def _link_events(
+        found: List[Tuple[str, str]], law_for_links: List[Dict[str, Any]], link_events: bool
+    ) -> List[Event]:
+        if not link_events:
+            return []
+        return [("link", _render_link_line(law, art), law_for_links) for law, art in found]
+
+    def _stream_tail_events(
+        self, scanner: CitationScanner, law_for_links: List[Dict[str, Any]], link_events: bool, trace: Trace
+    ) -> Generator[Event, None, None]:
+        # 스트림 종료: 이미 모은 인용으로 링크 블록만 붙임(전체 재스캔 없음)
+        with trace.span("link_merge"):
+            found = scanner.finish()
+            out = scanner.text
+            out2 = _apply_links_block(out, scanner.citations)
+        yield from self._link_events(found, law_for_links, link_events)
+        addon = out2[len(out):]  # 추가된 꼬리만 delta로 전송
+        if addon.strip():
+            yield ("delta", addon, law_for_links)
+        yield ("final", out2, law_for_links)
 
     def generate(
         self,
@@ -128,130 +445,443 @@ class AdviceEngine:
         num_rows: int = 5,
         stream: bool = True,
         primer_enable: bool = True,
-    ) -> Generator[Tuple[str, str, List[Dict[str, Any]]], None, None]:
+        link_events: bool = False,
+        mode: str = "",
+        use_cache: bool = True,
+        doc_index: Optional[DocIndex] = None,
+        user: str = "",
+    ) -> Generator[Event, None, None]:
+        trace = self._new_trace(mode=mode, tools=allow_tools, stream=stream)
+        outcome = "aborted"  # 소비 측이 중간에 닫거나 예외로 끝난 경우
+        try:
+            docs = self._doc_context(user_q, doc_index, trace)
+            if docs:
+                use_cache = False  # 같은 질문이라도 첨부 문서에 따라 답이 달라짐
+            key, hit = self._cache_lookup(use_cache, user_q, mode, system_prompt, allow_tools)
+            if hit is not None:
+                trace.attrs["path"] = "cache"
+                yield from replay_events(hit[0], hit[1], stream=stream)
+                outcome = "ok"
+                return
+            grade, similar = self._similar_lookup(use_cache, user_q, mode, system_prompt, allow_tools)
+            trace.attrs["path"] = f"similar_{grade}" if grade else "llm"
+            if grade == "answer":
+                yield from replay_events(similar["text"], similar["links"], stream=stream)
+                outcome = "ok"
+                return
+
+            state: Dict[str, Any] = {"ok": False, "trace": trace, "docs": docs, "user": user}
+            for ev in self._generate(
+                user_q, system_prompt=system_prompt, allow_tools=allow_tools, stream=stream,
+                primer_enable=primer_enable, link_events=link_events, state=state,
+                reuse=similar if grade == "tools" else None,
+            ):
+                if ev[0] == "final" and state["ok"]:
+                    if key:
+                        self.response_cache.put(key, ev[1], ev[2])  # type: ignore[union-attr]
+                    if not docs:
+                        self._similar_store(user_q, ev[1], ev[2], state, mode, system_prompt, allow_tools)
+                yield ev
+            outcome = "ok" if state["ok"] else "fallback"
+        finally:
+            self._end_trace(trace, outcome=outcome)
+
+    def _generate(
+        self,
+        user_q: str,
+        *,
+        system_prompt: str,
+        allow_tools: bool,
+        stream: bool,
+        primer_enable: bool,
+        link_events: bool,
+        state: Dict[str, Any],
+        reuse: Optional[Dict[str, Any]] = None,
+    ) -> Generator[Event, None, None]:
 
         if not self.client or not self.model:
-            yield ("final", "엔진이 설정되지 않았습니다.", [])
+            yield ("final", MSG_NOT_CONFIGURED, [])
             return
 
-        # 1) 메시지 구성
-        msgs: List[Dict[str, Any]] = [{"role": "system", "content": system_prompt}]
-
-        # (선택) 사전 법령 컨텍스트 프라이머 — 도구 모드에서만
-        if allow_tools and primer_enable and self.prefetch_law_context and self.summarize_laws_for_primer:
-            try:
-                pre = self.prefetch_law_context(user_q, num_rows_per_law=3)
-                primer = self.summarize_laws_for_primer(pre, max_items=6)
-                if primer:
-                    msgs.append({"role": "system", "content": primer})
-            except Exception:
-                # 프라이머 실패는 무시하고 계속
-                pass
-
-        msgs.append({"role": "user", "content": user_q})
+        tr: Trace = state.get("trace") or NULL_TRACE
+        if reuse is not None:
+            # 유사 질문의 툴 결과 재사용: 프라이머·1차 호출·툴 실행 생략
+            msgs = self._base_messages(system_prompt, None, user_q, state.get("docs")) + list(reuse["tool_msgs"])
+            law_for_links: List[Dict[str, Any]] = list(reuse.get("links") or [])
+            state["tool_msgs"] = reuse["tool_msgs"]
+        else:
+            use_primer = self._use_primer(allow_tools, primer_enable)
+            if use_primer and self.primer is not None:
+                self.primer.start(user_q)  # 호출부가 prime() 으로 이미 시작했으면 그 작업을 이어받음
+
+            # 1) 메시지 구성 — (선택) 사전 법령 컨텍스트 프라이머는 도구 모드에서만
+            primer: Optional[str] = None
+            if use_primer and self.primer is not None:
+                with tr.span("primer", mode="background") as sp:
+                    primer = self.primer.take(user_q)  # 예산 초과 시 None
+                    sp["hit"] = bool(primer)
+            elif use_primer:
+                with tr.span("primer", mode="inline") as sp:
+                    try:
+                        pre = self.prefetch_law_context(user_q, num_rows_per_law=3)
+                        primer = self.summarize_laws_for_primer(pre, max_items=6)
+                    except Exception:
+                        # 프라이머 실패는 무시하고 계속
+                        primer = None
+                    sp["hit"] = bool(primer)
+            msgs = self._base_messages(system_prompt, primer, user_q, state.get("docs"))
+
+            # 2) 1차 호출
+            with tr.span("first_call"):
+                resp1 = self.scc(self.client, **self._first_call_kwargs(msgs, allow_tools, state.get("user", "")))
+            tr.usage(getattr(resp1.get("resp"), "usage", None))
+            err = self._first_call_error(resp1)
+            if err:
+                yield ("final", err, [])
+                return
 
-        # 2) 1차 호출 (툴콜 허용/차단)
-        tools = self.tools if allow_tools else []
-        tool_choice = "auto" if allow_tools else "none"
+            msg1 = resp1["resp"].choices[0].message
+            law_for_links = []
 
-        resp1 = self.scc(
-            self.client,
-            messages=msgs,
-            model=self.model,
-            stream=False,
-            allow_retry=True,
-            tools=tools,
-            tool_choice=tool_choice,
-            temperature=self.temperature,
-            max_tokens=800,
-        )
+            # 3) 툴 실행 — 동시 실행: 실패/타임아웃 건은 error 페이로드로 대체되어 턴 전체가 죽지 않음
+            if getattr(msg1, "tool_calls", None):
+                n_base = len(msgs)
+                with tr.span("tools", calls=len(msg1.tool_calls)):
+                    results = self.tool_runner.run(list(msg1.tool_calls), observe=self._tool_observer(tr))
+                self._append_tool_results(msgs, msg1.tool_calls, results, law_for_links, user_q, state)
+                state["tool_msgs"] = _tool_msgs_for_cache(msgs[n_base:])
 
-        if resp1.get("type") == "blocked_by_content_filter":
-            yield ("final", resp1.get("message") or "안전정책으로 답변을 생성할 수 없습니다.", [])
+        # 4) 최종 호출
+        with tr.span("final_call"):
+            resp2 = self.scc(self.client, **self._final_call_kwargs(msgs, stream, state.get("user", "")))
+        err = self._final_call_error(resp2, stream)
+        if err:
+            yield ("final", err, law_for_links)
             return
-        if "resp" not in resp1:
-            yield ("final", "모델이 일시적으로 응답하지 않습니다. 잠시 뒤 다시 시도해 주세요.", [])
+
+        if stream:
+            # 스트리밍: delta를 그대로 전달하면서 조문 인용을 점진 수집,
+            # 종료 시 '조문 직링크' 블록만 추가로 한 번 더 흘려보냄
+            scanner = CitationScanner()
+            t_stream, first = time.monotonic(), True
+            try:
+                for ch in resp2["stream"]:
+                    tr.usage(getattr(ch, "usage", None))  # stream_options.include_usage: 마지막 청크
+                    try:
+                        txt, done = _chunk_text(ch)
+                    except Exception:
+                        continue
+                    if done:
+                        continue  # finish_reason 뒤에 usage 청크가 따라오므로 스트림 끝까지 읽음
+                    if txt:
+                        if first:
+                            tr.mark("first_delta")
+                            first = False
+                        found = scanner.feed(txt)
+                        yield ("delta", txt, law_for_links)
+                        yield from self._link_events(found, law_for_links, link_events)
+            finally:
+                # 소비 측이 중간에 닫으면(답변 취소) HTTP 스트림도 닫아 연결을 반환
+                close = getattr(resp2["stream"], "close", None)
+                if close is not None:
+                    try:
+                        close()
+                    except Exception:
+                        pass
+            tr.add("stream", t_stream, time.monotonic(), chars=len(scanner.text))
+
+            state["ok"] = True
+            yield from self._stream_tail_events(scanner, law_for_links, link_events, tr)
             return
 
-        msg1 = resp1["resp"].choices[0].message
-        law_for_links: List[Dict[str, Any]] = []
+        else:
+            # 논-스트리밍: 최종 텍스트에 블록 머지 후 한 번만 반환
+            tr.usage(getattr(resp2.get("resp"), "usage", None))
+            final_text = resp2["resp"].choices[0].message.content or ""
+            with tr.span("link_merge"):
+                final_text = merge_article_links_block(final_text)
+            state["ok"] = True
+            yield ("final", final_text, law_for_links)
+            return
 
-        # 3) 툴 실행
-        if getattr(msg1, "tool_calls", None):
-            msgs.append({"role": "assistant", "tool_calls": msg1.tool_calls})
-            for call in msg1.tool_calls:
-                args = {}
-                try:
-                    import json
-                    args = json.loads(call.function.arguments or "{}")
-                except Exception:
-                    pass
-
-                if call.function.name == "search_one":
-                    result = self.tool_search_one(**args)
-                elif call.function.name == "search_multi":
-                    result = self.tool_search_multi(**args)
-                else:
-                    result = {"error": f"unknown tool: {call.function.name}"}
-
-                # 링크용 결과 축적
-                if isinstance(result, dict) and result.get("items"):
-                    law_for_links.extend(result["items"])
-                elif isinstance(result, list):
-                    for r in result:
-                        if isinstance(r, dict) and r.get("items"):
-                            law_for_links.extend(r["items"])
-
-                msgs.append({
-                    "role": "tool",
-                    "tool_call_id": call.id,
-                    "content": _safe_json_dumps(result),
-                })
+    # ---- asyncio 버전 ----
+    async def _aprimer(self, user_q: str) -> Optional[str]:
+        pre = await _acall(self.prefetch_law_context, user_q, num_rows_per_law=3)
+        return await _acall(self.summarize_laws_for_primer, pre, max_items=6)
+
+    async def _await_primer(self, task: "asyncio.Task[Optional[str]]", started: float) -> Optional[str]:
+        """primer_budget 이 있으면 시작 시점부터 그 안에서만 기다리고, 넘기면 작업을 취소(버림)."""
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        stats = self.primer.stats if self.primer is not None else None
+        try:
+            if self.primer_budget is None:
+                primer = await task
+            else:
+                wait = max(0.0, started + self.primer_budget - t0)
+                primer = await asyncio.wait_for(task, timeout=wait)
+        except asyncio.TimeoutError:
+            if stats is not None:
+                stats.miss += 1
+                stats.wait_ms.append((loop.time() - t0) * 1000.0)
+            return None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            primer = None
+        if stats is not None:
+            stats.wait_ms.append((loop.time() - t0) * 1000.0)
+            stats.fetch_ms.append((loop.time() - started) * 1000.0)
+            if primer:
+                stats.hit += 1
+            else:
+                stats.error += 1
+        return primer or None
+
+    async def _ascc(self, **kwargs: Any) -> Dict[str, Any]:
+        client = self.async_client or self.client
+        return await _acall(self.ascc or self.scc, client, **kwargs)
+
+    async def agenerate(
+        self,
+        user_q: str,
+        *,
+        system_prompt: str,
+        allow_tools: bool,
+        num_rows: int = 5,
+        stream: bool = True,
+        primer_enable: bool = True,
+        link_events: bool = False,
+        mode: str = "",
+        use_cache: bool = True,
+        doc_index: Optional[DocIndex] = None,
+        user: str = "",
+    ) -> AsyncGenerator[Event, None]:
+        """
+        generate()와 같은 이벤트를 내는 async 제너레이터.
+        - 클라이언트/safe_chat_completion/툴/프라이머는 async·동기 모두 허용(동기는 스레드로 실행)
+        - 소비 측 태스크가 취소되거나 aclose()되면 프라이머·툴 태스크와 LLM 스트림을 정리
+        """
+        trace = self._new_trace(mode=mode, tools=allow_tools, stream=stream, api="async")
+        outcome = "aborted"
+        inner: Optional[AsyncGenerator[Event, None]] = None
+        try:
+            docs = self._doc_context(user_q, doc_index, trace)
+            if docs:
+                use_cache = False  # 같은 질문이라도 첨부 문서에 따라 답이 달라짐
+            key, hit = self._cache_lookup(use_cache, user_q, mode, system_prompt, allow_tools)
+            if hit is not None:
+                trace.attrs["path"] = "cache"
+                for ev in replay_events(hit[0], hit[1], stream=stream):
+                    yield ev
+                outcome = "ok"
+                return
+            grade, similar = self._similar_lookup(use_cache, user_q, mode, system_prompt, allow_tools)
+            trace.attrs["path"] = f"similar_{grade}" if grade else "llm"
+            if grade == "answer":
+                for ev in replay_events(similar["text"], similar["links"], stream=stream):
+                    yield ev
+                outcome = "ok"
+                return
 
-        # 4) 최종 호출
-        if stream:
-            resp2 = self.scc(
-                self.client, messages=msgs, model=self.model,
-                stream=True, allow_retry=True, temperature=self.temperature, max_tokens=1400,
+            state: Dict[str, Any] = {"ok": False, "trace": trace, "docs": docs, "user": user}
+            inner = self._agenerate(
+                user_q, system_prompt=system_prompt, allow_tools=allow_tools, stream=stream,
+                primer_enable=primer_enable, link_events=link_events, state=state,
+                reuse=similar if grade == "tools" else None,
             )
-            if resp2.get("type") == "blocked_by_content_filter":
-                yield ("final", resp2.get("message") or "안전정책으로 답변을 생성할 수 없습니다.", law_for_links)
+            async for ev in inner:
+                if ev[0] == "final" and state["ok"]:
+                    if key:
+                        self.response_cache.put(key, ev[1], ev[2])  # type: ignore[union-attr]
+                    if not docs:
+                        self._similar_store(user_q, ev[1], ev[2], state, mode, system_prompt, allow_tools)
+                yield ev
+            outcome = "ok" if state["ok"] else "fallback"
+        finally:
+            if inner is not None:
+                await inner.aclose()
+            self._end_trace(trace, outcome=outcome)
+
+    async def _agenerate(
+        self,
+        user_q: str,
+        *,
+        system_prompt: str,
+        allow_tools: bool,
+        stream: bool,
+        primer_enable: bool,
+        link_events: bool,
+        state: Dict[str, Any],
+        reuse: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[Event, None]:
+        if not (self.async_client or self.client) or not self.model:
+            yield ("final", MSG_NOT_CONFIGURED, [])
+            return
+
+        loop = asyncio.get_running_loop()
+        tr: Trace = state.get("trace") or NULL_TRACE
+        primer_task: "Optional[asyncio.Task[Optional[str]]]" = None
+        stream_it: Any = None
+        try:
+            if reuse is not None:
+                # 유사 질문의 툴 결과 재사용: 프라이머·1차 호출·툴 실행 생략
+                msgs = self._base_messages(system_prompt, None, user_q, state.get("docs")) + list(reuse["tool_msgs"])
+                law_for_links: List[Dict[str, Any]] = list(reuse.get("links") or [])
+                state["tool_msgs"] = reuse["tool_msgs"]
+            else:
+                # 프라이머는 진입 즉시 태스크로 시작해 메시지 구성과 겹쳐 진행
+                if self._use_primer(allow_tools, primer_enable):
+                    primer_started = loop.time()
+                    primer_task = asyncio.ensure_future(self._aprimer(user_q))
+
+                primer = None
+                if primer_task is not None:
+                    with tr.span("primer", mode="task") as sp:
+                        primer = await self._await_primer(primer_task, primer_started)
+                        sp["hit"] = bool(primer)
+                msgs = self._base_messages(system_prompt, primer, user_q, state.get("docs"))
+
+                with tr.span("first_call"):
+                    resp1 = await self._ascc(**self._first_call_kwargs(msgs, allow_tools, state.get("user", "")))
+                tr.usage(getattr(resp1.get("resp"), "usage", None))
+                err = self._first_call_error(resp1)
+                if err:
+                    yield ("final", err, [])
+                    return
+
+                msg1 = resp1["resp"].choices[0].message
+                law_for_links = []
+
+                if getattr(msg1, "tool_calls", None):
+                    n_base = len(msgs)
+                    with tr.span("tools", calls=len(msg1.tool_calls)):
+                        results = await self.tool_runner.arun(
+                            list(msg1.tool_calls),
+                            dispatch={"search_one": self.tool_search_one, "search_multi": self.tool_search_multi},
+                            observe=self._tool_observer(tr),
+                        )
+                    self._append_tool_results(msgs, msg1.tool_calls, results, law_for_links, user_q, state)
+                    state["tool_msgs"] = _tool_msgs_for_cache(msgs[n_base:])
+
+            with tr.span("final_call"):
+                resp2 = await self._ascc(**self._final_call_kwargs(msgs, stream, state.get("user", "")))
+            err = self._final_call_error(resp2, stream)
+            if err:
+                yield ("final", err, law_for_links)
+                return
+
+            if not stream:
+                tr.usage(getattr(resp2.get("resp"), "usage", None))
+                final_text = resp2["resp"].choices[0].message.content or ""
+                with tr.span("link_merge"):
+                    final_text = merge_article_links_block(final_text)
+                state["ok"] = True
+                yield ("final", final_text, law_for_links)
                 return
 
-            # 스트리밍: delta를 그대로 전달, 종료 시 '조문 직링크' 블록만 추가로 한 번 더 흘려보냄
-            out = ""
-            for ch in resp2["stream"]:
+            stream_it = resp2["stream"]
+            scanner = CitationScanner()
+            t_stream, first = time.monotonic(), True
+            async for ch in _aiter_chunks(stream_it):
+                tr.usage(getattr(ch, "usage", None))
                 try:
-                    c = ch.choices[0]
-                    if getattr(c, "finish_reason", None):
-                        break
-                    d = getattr(c, "delta", None)
-                    txt = getattr(d, "content", None) if d else None
-                    if txt:
-                        out += txt
-                        yield ("delta", txt, law_for_links)
+                    txt, done = _chunk_text(ch)
                 except Exception:
                     continue
+                if done:
+                    continue  # finish_reason 뒤의 usage 청크까지 읽음
+                if txt:
+                    if first:
+                        tr.mark("first_delta")
+                        first = False
+                    found = scanner.feed(txt)
+                    yield ("delta", txt, law_for_links)
+                    for ev in self._link_events(found, law_for_links, link_events):
+                        yield ev
+            tr.add("stream", t_stream, time.monotonic(), chars=len(scanner.text))
+
+            state["ok"] = True
+            for ev in self._stream_tail_events(scanner, law_for_links, link_events, tr):
+                yield ev
+        finally:
+            if primer_task is not None and not primer_task.done():
+                primer_task.cancel()
+            if stream_it is not None:
+                await _close_stream(stream_it)
+
+    def agenerate_sync(self, user_q: str, **kwargs: Any) -> Generator[Event, None, None]:
+        """
+        agenerate()를 공용 이벤트 루프에서 실행하는 동기 어댑터(app.py 등 기존 동기 호출부용).
+        소비를 중단하면 루프 쪽 agenerate()도 닫혀 진행 중인 호출이 정리됩니다.
+        """
+        yield from iterate_async(self.agenerate(user_q, **kwargs))
+
+
+async def _aiter_chunks(stream: Any) -> AsyncGenerator[Any, None]:
+    """async 스트림은 그대로, 동기 스트림은 청크마다 스레드에서 next() 호출."""
+    if hasattr(stream, "__aiter__"):
+        async for ch in stream:
+            yield ch
+        return
+    it = iter(stream)
+    sentinel = object()
+    while True:
+        ch = await asyncio.to_thread(next, it, sentinel)
+        if ch is sentinel:
+            return
+        yield ch
 
-            # 스트림 종료: 본문에 조문 링크 블록 머지
-            out2 = merge_article_links_block(out)
-            addon = out2[len(out):]  # 추가된 꼬리만 delta로 전송
-            if addon.strip():
-                yield ("delta", addon, law_for_links)
-            yield ("final", out2, law_for_links)
+async def _close_stream(stream: Any) -> None:
+    """중도 이탈 시 HTTP 스트림을 닫아 연결을 반환."""
+    try:
+        aclose = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+        if aclose is None:
             return
+        r = aclose()
+        if inspect.isawaitable(r):
+            await r
+    except Exception:
+        pass
 
-        else:
-            # 논-스트리밍: 최종 텍스트에 블록 머지 후 한 번만 반환
-            resp2 = self.scc(
-                self.client, messages=msgs, model=self.model,
-                stream=False, allow_retry=True, temperature=self.temperature, max_tokens=1400,
-            )
-            if resp2.get("type") == "blocked_by_content_filter":
-                yield ("final", resp2.get("message") or "안전정책으로 답변을 생성할 수 없습니다.", law_for_links)
-                return
 
-            final_text = resp2["resp"].choices[0].message.content or ""
-            final_text = merge_article_links_block(final_text)
-            yield ("final", final_text, law_for_links)
-            return
+_engine: Optional[AdviceEngine] = None
+_engine_lock = threading.Lock()
+
+
+def default_engine() -> AdviceEngine:
+    """
+    프로세스 공용 엔진(app.py 가 세션마다 공유). 클라이언트는 llm_client.make_client() 설정,
+    LLM 호출은 공용 스케줄러(llm_scheduler.default_scheduler)를 거치고,
+    툴은 로컬 조문 색인 우선 검색(STATUTE_INDEX_PATH) + 없는 조문은 law.go.kr Open API(LAW_API_OC),
+    프라이머는 같은 검색을 PRIMER_BUDGET 초 안에서 선행 조회, 툴 결과는 MAX_PROMPT_TOKENS 예산으로 압축,
+    답변·툴 캐시와 메트릭 레지스트리는 프로세스 공용.
+    클라이언트 설정이 없으면 generate() 가 '엔진이 설정되지 않았습니다.' 를 냅니다.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            client, model = make_client()
+            remote = default_law_api()  # LAW_API_OC 가 없으면 None(로컬 색인만)
+            search = LocalFirstSearch(
+                default_statute_index(),
+                remote_one=remote.search_one if remote else None,
+                remote_multi=remote.search_multi if remote else None,
+            )
+            _engine = AdviceEngine(
+                client, model or "", LAW_TOOLS, default_scheduler().wrap(safe_chat_completion),
+                search.search_one, search.search_multi,
+                # 프라이머: 같은 검색으로 질문 관련 조문을 미리 조회(app.py 가 prime() 으로 의도 분류와 겹쳐 시작)
+                prefetch_law_context=prefetch_via_search(search.search_one),
+                summarize_laws_for_primer=summarize_laws_for_primer,
+                primer_budget=float(os.environ.get("PRIMER_BUDGET", "1.2")),
+                # 툴 풀은 모든 세션이 공유하므로 동시 세션 수에 맞춰 크게(TOOL_WORKERS)
+                tool_workers=int(os.environ.get("TOOL_WORKERS", "32")),
+                # 최종 프롬프트의 툴 결과를 MAX_PROMPT_TOKENS 안으로 압축(모든 세션 공용)
+                token_budget=TokenBudget(max_prompt_tokens=int(os.environ.get("MAX_PROMPT_TOKENS", "6000")),
+                                         model=model or None),
+                response_cache=ResponseCache(),
+                tool_cache=shared_tool_cache(),
+                trace_hooks=[default_registry().as_hook()],
+            )
+        return _engine
@@ -0,0 +1,49 @@
+# modules/aio_bridge.py  (async 제너레이터 → 동기 제너레이터 어댑터)
+from __future__ import annotations
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Iterator, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """프로세스 공용 이벤트 루프(데몬 스레드 1개). 최초 호출 시 시작."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            t = threading.Thread(target=loop.run_forever, name="advice-aio", daemon=True)
+            t.start()
+            _loop = loop
+        return _loop
+
+
+def iterate_async(agen: AsyncIterator[Any], timeout: Optional[float] = None) -> Iterator[Any]:
+    """
+    async 제너레이터를 공용 루프에서 돌리고 항목을 동기적으로 하나씩 돌려줌.
+    (Streamlit 스크립트 스레드처럼 루프가 없는 곳에서 agenerate()를 쓰기 위한 어댑터)
+
+    소비 측이 중간에 멈추면(break / close / GC) 루프 쪽 제너레이터를 aclose()하여
+    진행 중인 LLM 스트림·툴 호출이 정리되도록 합니다.
+    """
+    loop = background_loop()
+    try:
+        while True:
+            fut = asyncio.run_coroutine_threadsafe(agen.__anext__(), loop)
+            try:
+                item = fut.result(timeout=timeout)
+            except StopAsyncIteration:
+                return
+            except BaseException:
+                fut.cancel()
+                raise
+            yield item
+    finally:
+        aclose = getattr(agen, "aclose", None)
+        if aclose is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(aclose(), loop).result(timeout=5)
+            except Exception:
+                pass
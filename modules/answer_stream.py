@@ -0,0 +1,112 @@
+# modules/answer_stream.py  (답변 이벤트를 백그라운드 스레드에서 돌리고 화면 쪽은 큐만 비우기 + 취소)
+from __future__ import annotations
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+Event = Tuple[str, str, List[Dict[str, Any]]]
+
+_DONE = object()
+
+
+class AnswerJob:
+    """
+    AdviceEngine.generate() 같은 이벤트 제너레이터를 데몬 스레드에서 소비하고,
+    Streamlit 스크립트 스레드는 drain() 으로 쌓인 이벤트만 가져가 화면을 갱신합니다.
+
+    - text: delta 를 이어 붙인 현재 본문("final" 이 오면 최종 전체 텍스트로 교체)
+    - links: 마지막 이벤트의 law_links
+    - cancel(): 다음 이벤트 경계에서 제너레이터를 닫음(엔진이 LLM 스트림을 닫고 트레이스를 'aborted' 로 마감)
+    - error: 제너레이터가 예외로 끝났으면 그 예외(본문은 그때까지 받은 만큼)
+    제너레이터는 만든 스레드에서 닫아야 하므로 close() 도 작업 스레드에서 호출합니다.
+    """
+
+    def __init__(self, events: Callable[[], Iterator[Event]], name: str = "answer"):
+        self._events = events
+        self._q: "queue.Queue[Any]" = queue.Queue()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.text = ""
+        self.links: List[Dict[str, Any]] = []
+        self.final = False
+        self.error: Optional[BaseException] = None
+        self.started = time.monotonic()
+        self.first_delta: Optional[float] = None   # 시작부터 첫 delta 까지(초)
+
+    def start(self) -> "AnswerJob":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        gen = None
+        try:
+            gen = self._events()
+            for ev in gen:
+                if self._cancel.is_set():
+                    break
+                self._q.put(ev)
+        except BaseException as e:  # noqa: BLE001 — 화면 쪽에서 보여 주도록 넘김
+            traceback.print_exc()
+            self._q.put(e)
+        finally:
+            close = getattr(gen, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+            self._q.put(_DONE)
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def drain(self, timeout: float = 0.05) -> List[Event]:
+        """최대 timeout 초 동안 첫 이벤트를 기다린 뒤 쌓인 이벤트를 모두 가져와 text/links 에 반영."""
+        out: List[Event] = []
+        if self._done.is_set():
+            return out
+        try:
+            item = self._q.get(timeout=timeout)
+        except queue.Empty:
+            return out
+        while True:
+            if item is _DONE:
+                self._done.set()
+                break
+            if isinstance(item, BaseException):
+                self.error = item
+            else:
+                self._apply(item)
+                out.append(item)
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                break
+        return out
+
+    def _apply(self, ev: Event) -> None:
+        kind, payload, links = ev
+        if kind == "delta":
+            if self.first_delta is None:
+                self.first_delta = time.monotonic() - self.started
+            self.text += payload
+        elif kind == "final":
+            self.text = payload
+            self.final = True
+        self.links = links or self.links
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """작업 스레드가 끝날 때까지 대기(이벤트는 drain 으로 따로 소비)."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
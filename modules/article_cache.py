@@ -0,0 +1,212 @@
+# modules/article_cache.py  (외부 기사 추출 결과 디스크 캐시: URL 정규화 + TTL + ETag/Last-Modified 재검증)
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 같은 기사인데 공유 경로마다 달라지는 추적용 파라미터
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "igshid", "ref_src", "mc_cid", "mc_eid")
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """스킴/호스트 소문자, 기본 포트·프래그먼트·추적 파라미터 제거, 쿼리 정렬."""
+    parts = urlsplit((url or "").strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def url_key(url: str) -> str:
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedArticle:
+    url: str
+    title: str
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched: float          # 마지막으로 원문을 받았거나 304 로 재검증한 시각(time.time())
+
+    def validators(self) -> Dict[str, str]:
+        """조건부 요청 헤더(If-None-Match / If-Modified-Since)."""
+        h: Dict[str, str] = {}
+        if self.etag:
+            h["If-None-Match"] = self.etag
+        if self.last_modified:
+            h["If-Modified-Since"] = self.last_modified
+        return h
+
+
+@dataclass
+class ArticleCacheStats:
+    hits: int = 0           # 신선(TTL 이내) → 네트워크/파싱 없음
+    revalidated: int = 0    # 304 로 재사용
+    misses: int = 0
+    stores: int = 0
+    evicted: int = 0
+    errors: int = 0         # 디스크 오류(잠김 등) — 캐시 없이 진행
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class ArticleCache:
+    """
+    URL → (제목, 정리된 본문) 디스크 캐시.
+
+    - 저장소: SQLite(WAL). Streamlit 워커 프로세스 여러 개가 같은 파일을 열어도 안전
+      (프로세스마다 연결 하나, 쓰기 잠김은 busy timeout 으로 대기)
+    - ttl 초 안의 항목은 그대로 사용, 지나면 ETag/Last-Modified 로 조건부 요청 → 304 면 재사용
+    - max_age 가 지난 항목은 재검증 없이 버림
+    - 본문 크기 합이 max_bytes 를 넘으면 오래 안 쓴 항목부터 제거(max_bytes 의 90% 까지)
+    - 디스크 오류는 삼키고 stats.errors 에 셉니다(캐시가 기사 가져오기를 막지 않도록)
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl: float = 3600.0,
+        max_age: float = 7 * 86400.0,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.stats = ArticleCacheStats()
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " key TEXT PRIMARY KEY, url TEXT NOT NULL, title TEXT NOT NULL, text TEXT NOT NULL,"
+            " etag TEXT, last_modified TEXT, fetched REAL NOT NULL, accessed REAL NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS articles_accessed ON articles(accessed)")
+        self._db.commit()
+
+    def is_fresh(self, entry: CachedArticle) -> bool:
+        return time.time() - entry.fetched < self.ttl
+
+    def get(self, url: str) -> Optional[CachedArticle]:
+        """신선하든 아니든 저장된 항목(재검증용). 없거나 max_age 초과면 None."""
+        key = url_key(url)
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT url, title, text, etag, last_modified, fetched FROM articles WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or now - row[5] >= self.max_age:
+                    self.stats.misses += 1
+                    return None
+                entry = CachedArticle(*row)
+                if self.is_fresh(entry):
+                    self.stats.hits += 1
+                    self._db.execute("UPDATE articles SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                return entry
+            except sqlite3.Error:
+                self.stats.errors += 1
+                return None
+
+    def put(
+        self, url: str, title: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None
+    ) -> None:
+        now = time.time()
+        size = len(title.encode("utf-8")) + len(text.encode("utf-8"))
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO articles"
+                    "(key, url, title, text, etag, last_modified, fetched, accessed, size)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url_key(url), normalize_url(url), title, text, etag, last_modified, now, now, size),
+                )
+                self.stats.stores += 1
+                self._evict(now)
+                self._db.commit()
+            except sqlite3.Error:
+                self.stats.errors += 1
+
+    def touch(self, url: str) -> None:
+        """304 Not Modified 를 받은 뒤: 받은 시각만 갱신(TTL 다시 시작)."""
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute(
+                    "UPDATE articles SET fetched = ?, accessed = ? WHERE key = ?", (now, now, url_key(url))
+                )
+                self._db.commit()
+                self.stats.revalidated += 1
+            except sqlite3.Error:
+                self.stats.errors += 1
+
+    def _evict(self, now: float) -> None:
+        # self._lock 안, 같은 트랜잭션에서 호출
+        cur = self._db.execute("DELETE FROM articles WHERE fetched < ?", (now - self.max_age,))
+        self.stats.evicted += max(0, cur.rowcount)
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        drop = []
+        for key, size in self._db.execute("SELECT key, size FROM articles ORDER BY accessed ASC"):
+            if total <= target:
+                break
+            drop.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM articles WHERE key = ?", drop)
+        self.stats.evicted += len(drop)
+
+    def invalidate(self, url: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM articles WHERE key = ?", (url_key(url),))
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM articles")
+            self._db.commit()
+
+
+_cache: Optional[ArticleCache] = None
+_cache_lock = threading.Lock()
+
+
+def default_article_cache() -> Optional[ArticleCache]:
+    """
+    프로세스 공용 캐시. 경로는 ARTICLE_CACHE_PATH(빈 문자열이면 끔),
+    없으면 임시 폴더의 law2_articles.sqlite3(같은 머신의 워커 프로세스들이 공유).
+    파일을 열 수 없으면 None(캐시 없이 동작).
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            path = os.environ.get("ARTICLE_CACHE_PATH")
+            if path == "":
+                return None
+            try:
+                _cache = ArticleCache(path or Path(tempfile.gettempdir()) / "law2_articles.sqlite3")
+            except (sqlite3.Error, OSError):
+                return None
+        return _cache
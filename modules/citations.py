@@ -0,0 +1,274 @@
+# modules/citations.py  (조문 인용 추출 엔진 — linking.py / advice_engine.py 공용)
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .law_catalog import get_catalog, squash
+
+# "같은 법 제3조" / "동법 제3조" → 직전에 인용된 법령
+SAME_LAW_TOKENS: Tuple[str, ...] = ("같은 법", "같은법", "동법")
+
+# 사전에 없는 이름의 폴백: 조문 바로 앞 한 덩어리가 이런 꼬리로 끝나면 법령명으로 인정
+_FALLBACK_SUFFIXES: Tuple[str, ...] = ("법률", "법", "령", "규칙", "규정", "조례")
+
+# 조문 앵커: 제N조(의M){0,2}. 고정 길이 반복뿐이라 역추적이 없음
+ANCHOR_PAT = re.compile(r'제(?P<num>\d{1,4})조(?P<ui>(?:의\d{1,3}){0,2})')
+
+# 기존 정규식(벤치마크 비교용으로만 보존)
+LEGACY_ARTICLE_PAT = re.compile(
+    r'(?P<law>[가-힣A-Za-z0-9·()\s]{2,40})\s*제(?P<num>\d{1,4})조(?P<ui>(의\d{1,3}){0,2})'
+)
+
+_FALLBACK_MAX = 30
+_DECREE_SUFFIXES: Tuple[str, ...] = ("시행령", "시행규칙")
+_GAP_CHARS = frozenset(" \t\u00a0」』\"'”’")  # 법령명과 '제' 사이에 허용되는 문자
+_GAP_STRIP = "".join(_GAP_CHARS)
+_MAX_GAP = 3
+_SAME = object()  # 역방향 트라이 값: '같은 법'
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "·"
+
+
+@dataclass(frozen=True)
+class Citation:
+    law: str        # 정규화된 법령명
+    article: str    # "제839조의2"
+    start: int      # 법령명 시작 위치
+    end: int        # 조문 표기 끝 위치(배타)
+    raw_law: str    # 본문에 적힌 그대로의 법령명
+
+
+class CitationMatcher:
+    """
+    사전 기반 조문 인용 매처.
+
+    1) ANCHOR_PAT 로 '제N조(의M)' 앵커를 찾고(선형, 역추적 없음)
+    2) 앵커 앞쪽을 역방향 트라이(법령명·약칭을 공백 없이 뒤집어 넣은 트라이)로 한 글자씩 거슬러 올라가
+       가장 긴 등록 법령명을 찾음. 본문의 공백은 건너뛰므로 '민사 소송법'도 '민사소송법'으로 잡힘.
+       앞 글자가 한글/영숫자면(예: '난민법'의 '민법') 채택하지 않음
+    3) 사전에 없으면 바로 앞 한 덩어리가 '법/령/규칙…'으로 끝날 때만 법령명으로 인정(폴백)하고
+       normalize(카탈로그의 공백 무시·유사도 색인)로 정식명칭을 찾음
+
+    앵커마다 역방향 탐색 길이는 최장 법령명 + 간격으로 상한이 있으므로 전체는 입력 길이에 선형.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[Tuple[str, str]],
+        normalize: Optional[Callable[[str], str]] = None,
+        same_law_tokens: Iterable[str] = SAME_LAW_TOKENS,
+    ):
+        self._rtrie: Dict[str, dict] = {}
+        self._normalize = normalize or (lambda name: (name or "").strip())
+        self.max_name_len = 0
+        for surface, canonical in entries:
+            self._add(surface, canonical)
+        for tok in same_law_tokens:
+            self._add(tok, _SAME)
+        # 스트리밍 스캐너가 남겨야 할 앞쪽 문맥 길이(본문 공백 포함 여유 + 경계 검사용 1자)
+        self.max_back = 2 * max(self.max_name_len, _FALLBACK_MAX) + _MAX_GAP + 10
+
+    def _add(self, key: str, value: object) -> None:
+        key = squash(key)
+        if not key:
+            return
+        node = self._rtrie
+        for ch in reversed(key):
+            node = node.setdefault(ch, {})
+        node["\0"] = value
+        self.max_name_len = max(self.max_name_len, len(key))
+
+    def normalize(self, name: str) -> str:
+        return self._normalize(name)
+
+    def _law_before(self, text: str, anchor: int) -> Optional[Tuple[int, object]]:
+        """앵커 앞에서 법령명을 찾아 (시작위치, 정규화값|_SAME) 반환."""
+        end = anchor
+        gap = 0
+        while end > 0 and text[end - 1] in _GAP_CHARS and gap < _MAX_GAP:
+            end -= 1
+            gap += 1
+
+        # "근로기준법 시행령 제5조" → 모법을 찾아 "근로기준법 시행령"
+        for suffix in _DECREE_SUFFIXES:
+            if text.endswith(suffix, 0, end) and (end == len(suffix) or not _is_word_char(text[end - len(suffix) - 1])):
+                b = end - len(suffix)
+                while b > 0 and text[b - 1] in " \t" and end - len(suffix) - b < 2:
+                    b -= 1
+                base = self._name_ending_at(text, b)
+                if base is not None and isinstance(base[1], str):
+                    return base[0], f"{base[1]} {suffix}"
+        return self._name_ending_at(text, end)
+
+    def _known_name_ending_at(self, text: str, end: int) -> Optional[Tuple[int, object]]:
+        """사전(트라이)에 있는 가장 긴 법령명·약칭 중 end 에서 끝나는 것."""
+        best: Optional[Tuple[int, object]] = None
+        node = self._rtrie
+        i = end
+        while i > 0:
+            ch = text[i - 1]
+            if ch == " " and i < end and i > 1 and text[i - 2] != " ":
+                i -= 1  # 법령명 안의 공백 1칸은 건너뜀(트라이 키는 공백 없음)
+                continue
+            node = node.get(ch)
+            if node is None:
+                break
+            i -= 1
+            if "\0" in node and (i == 0 or not _is_word_char(text[i - 1])):
+                best = (i, node["\0"])
+        return best
+
+    def _name_ending_at(self, text: str, end: int) -> Optional[Tuple[int, object]]:
+        best = self._known_name_ending_at(text, end)
+        if best is not None:
+            return best
+
+        # 폴백: 공백 없이 붙은 한 덩어리(최대 _FALLBACK_MAX 자)
+        i = end
+        while i > 0 and end - i < _FALLBACK_MAX and _is_word_char(text[i - 1]):
+            i -= 1
+        word = text[i:end]
+        if len(word) >= 3 and word.endswith(_FALLBACK_SUFFIXES) and word not in _DECREE_SUFFIXES:
+            return (i, self._normalize(word))
+        return None
+
+    def finditer(self, text: str, prev_law: Optional[str] = None) -> Iterator[Citation]:
+        text = text or ""
+        for m in ANCHOR_PAT.finditer(text):
+            cit = self._resolve(text, m, prev_law)
+            if cit is not None:
+                prev_law = cit.law
+                yield cit
+
+    def _resolve(self, text: str, m: "re.Match[str]", prev_law: Optional[str]) -> Optional[Citation]:
+        hit = self._law_before(text, m.start())
+        if hit is None:
+            return None
+        start, value = hit
+        if value is _SAME:
+            if not prev_law:
+                return None
+            value = prev_law
+        article = f"제{m.group('num')}조{m.group('ui') or ''}"
+        raw = text[start:m.start()].rstrip(_GAP_STRIP)
+        return Citation(str(value), article, start, m.end(), raw)
+
+    def laws(self, text: str) -> List[str]:
+        """
+        조문 번호와 상관없이 본문에 언급된 사전 법령명(정규화, 발견 순서 유니크).
+        '민법상', '형법에서'처럼 조사가 붙어도 잡고, '난민법' 안의 '민법'은 잡지 않음. 폴백(꼬리 추정)은 쓰지 않음.
+        """
+        text = text or ""
+        ends = self._rtrie.keys()
+        found: Dict[str, None] = {}
+        i = len(text)
+        while i > 0:
+            hit = self._known_name_ending_at(text, i) if text[i - 1] in ends else None
+            if hit is not None and isinstance(hit[1], str):
+                found.setdefault(hit[1], None)
+                i = hit[0]
+            else:
+                i -= 1
+        return list(reversed(found))
+
+    def extract(self, text: str) -> List[Tuple[str, str]]:
+        """유니크 (법령, 조문) 목록(발견 순서)."""
+        seen: Dict[Tuple[str, str], None] = {}
+        for c in self.finditer(text):
+            seen.setdefault((c.law, c.article), None)
+        return list(seen)
+
+
+_default: Optional[CitationMatcher] = None
+
+
+def default_matcher() -> CitationMatcher:
+    """법령명 카탈로그로 만든 공용 매처(최초 호출 시 1회 생성, 모든 세션이 공유)."""
+    global _default
+    if _default is None:
+        cat = get_catalog()
+        _default = CitationMatcher(cat.surface_forms(), normalize=cat.normalize)
+    return _default
+
+
+def extract_citations(text: str) -> List[Tuple[str, str]]:
+    return default_matcher().extract(text)
+
+
+def iter_citations(text: str) -> Iterator[Citation]:
+    return default_matcher().finditer(text)
+
+
+class CitationScanner:
+    """
+    스트리밍 delta를 받아 조문 인용을 점진적으로 수집하는 스캐너.
+
+    앵커 뒤로 guard 자 이상 더 들어와야(=의M 꼬리가 더 붙을 수 없을 때) 확정하고,
+    앵커 앞쪽은 matcher.max_back 자만 남겨 둡니다. 청크 경계에 걸친 인용도
+    전체 텍스트를 한 번에 훑은 결과와 같습니다.
+
+      feed(delta) -> 이번에 새로 발견된 (법령, 조문) 목록
+      finish()    -> 남은 꼬리까지 확정, 새로 발견된 목록
+      text        -> 지금까지 받은 전체 텍스트(한 번만 join)
+      citations   -> 발견 순서대로의 유니크 (법령, 조문) 목록
+    """
+
+    _GUARD = 8  # "의123" 등 앵커 연장 가능 길이 + 여유
+
+    def __init__(self, matcher: Optional[CitationMatcher] = None):
+        self.matcher = matcher or default_matcher()
+        self._parts: List[str] = []
+        self._buf = ""
+        self._pos = 0               # _buf 안에서 다음 앵커 탐색 시작점
+        self._prev_law: Optional[str] = None
+        self._seen: Dict[Tuple[str, str], None] = {}
+
+    def _drain(self, final: bool) -> List[Tuple[str, str]]:
+        buf = self._buf
+        new: List[Tuple[str, str]] = []
+        pos = self._pos
+        for m in ANCHOR_PAT.finditer(buf, pos):
+            if not final and m.end() + self._GUARD > len(buf):
+                pos = m.start()
+                break
+            cit = self.matcher._resolve(buf, m, self._prev_law)
+            pos = m.end()
+            if cit is None:
+                continue
+            self._prev_law = cit.law
+            key = (cit.law, cit.article)
+            if key not in self._seen:
+                self._seen[key] = None
+                new.append(key)
+        else:
+            # 미완성 앵커("제16", "제163조의")가 끝에 걸려 있을 수 있으니 그만큼은 다시 훑음
+            pos = max(pos, len(buf) - 20)
+
+        # 앵커 앞 문맥(max_back)만 남기고 앞부분 폐기
+        drop = max(0, pos - self.matcher.max_back)
+        self._buf = buf[drop:]
+        self._pos = pos - drop
+        return new
+
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        if not delta:
+            return []
+        self._parts.append(delta)
+        self._buf += delta
+        return self._drain(final=False)
+
+    def finish(self) -> List[Tuple[str, str]]:
+        return self._drain(final=True)
+
+    @property
+    def text(self) -> str:
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    @property
+    def citations(self) -> List[Tuple[str, str]]:
+        return list(self._seen)
@@ -0,0 +1,165 @@
+# modules/doc_index.py  (세션별 첨부 문서 검색: 글자 2-gram 역색인 + BM25 → 예산 안의 상위 청크만 프롬프트로)
+from __future__ import annotations
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .ingest import chunks_to_context
+from .token_budget import estimate_tokens
+
+# 한글(및 기타 문자) 연속 구간은 글자 2-gram, 영문/숫자는 단어 그대로
+_RUN_RE = re.compile(r"[a-z0-9]+|[^\W\d_a-z]+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    '임대인은 보증금을' → ['임대', '대인', '인은', '보증', '증금', '금을'].
+    조사/어미가 붙어도 어간 2-gram 이 겹쳐 형태소 분석 없이 매칭됩니다. 한 글자 구간은 그대로 한 토큰.
+    """
+    out: List[str] = []
+    for m in _RUN_RE.finditer((text or "").lower()):
+        w = m.group(0)
+        if w.isascii() or len(w) == 1:
+            out.append(w)
+        else:
+            out.extend(w[i:i + 2] for i in range(len(w) - 1))
+    return out
+
+
+class DocIndex:
+    """
+    업로드 문서 청크에 대한 메모리 역색인(BM25).
+
+    - add(chunks): 청크(ingest.Chunk 처럼 .text/.doc_id/.index 를 가진 객체) 추가. 같은 (doc_id, index) 는 한 번만 색인
+      — 한 문서를 추출되는 대로 여러 번 나눠 넣어도 되고, 같은 파일을 다시 넣으면 아무것도 추가되지 않음
+    - 게시 목록은 (용어, 청크, tf) 를 배열에 쌓아 두었다가 첫 검색 때 용어순 CSR 로 정리(numpy)
+    - search(q, k): BM25 상위 k 개 (청크, 점수)
+    - select(q, ...): 상위 청크를 토큰 예산 안에서 골라 문서 순서로 반환, context(q) 는 프롬프트 블록
+    세션마다 하나(st.session_state)를 두는 것을 가정합니다.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunks: List[Any] = []
+        self.doc_ids: set = set()
+        self._keys: set = set()      # 색인한 (doc_id, index)
+        self._vocab: Dict[str, int] = {}
+        self._p_term = array("i")
+        self._p_chunk = array("i")
+        self._p_tf = array("f")
+        self._lengths = array("f")
+        self._lock = threading.Lock()
+        self._dirty = False
+        # 정리된 CSR(검색용)
+        self._offsets: Optional[np.ndarray] = None
+        self._docs: Optional[np.ndarray] = None
+        self._tfs: Optional[np.ndarray] = None
+        self._norm: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add(self, chunks: Iterable[Any]) -> int:
+        """새로 색인한 청크 수. 이미 색인한 (doc_id, index) 청크는 건너뜀."""
+        added = 0
+        with self._lock:
+            for ch in chunks:
+                doc_id = getattr(ch, "doc_id", None)
+                if doc_id is not None:
+                    key = (doc_id, getattr(ch, "index", ch.text))  # index 가 없으면 본문으로 구분
+                    if key in self._keys:
+                        continue
+                    self._keys.add(key)
+                    self.doc_ids.add(doc_id)
+                cid = len(self.chunks)
+                self.chunks.append(ch)
+                tf = Counter(tokenize(ch.text))
+                self._lengths.append(float(sum(tf.values())))
+                vocab = self._vocab
+                for term, n in tf.items():
+                    tid = vocab.get(term)
+                    if tid is None:
+                        tid = vocab[term] = len(vocab)
+                    self._p_term.append(tid)
+                    self._p_chunk.append(cid)
+                    self._p_tf.append(float(n))
+                added += 1
+            if added:
+                self._dirty = True
+        return added
+
+    def _finalize(self) -> None:
+        # self._lock 안에서 호출
+        # frombuffer 뷰를 남기면 array 에 더 추가할 수 없으므로 복사본으로 정리
+        terms = np.array(self._p_term, dtype=np.int32)
+        order = np.argsort(terms, kind="stable")
+        self._docs = np.array(self._p_chunk, dtype=np.int32)[order]
+        self._tfs = np.array(self._p_tf, dtype=np.float32)[order]
+        counts = np.bincount(terms, minlength=len(self._vocab))
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        lengths = np.array(self._lengths, dtype=np.float32)
+        avgdl = float(lengths.mean()) if len(lengths) else 1.0
+        self._norm = self.k1 * (1.0 - self.b + self.b * lengths / max(avgdl, 1e-9))
+        self._dirty = False
+
+    def search(self, query: str, k: int = 8) -> List[Tuple[Any, float]]:
+        """BM25 점수 상위 k 개 (청크, 점수). 겹치는 용어가 없으면 빈 목록."""
+        return [(self.chunks[i], score) for i, score in self._top(query, k)]
+
+    def _top(self, query: str, k: int) -> List[Tuple[int, float]]:
+        with self._lock:
+            if not self.chunks:
+                return []
+            if self._dirty or self._offsets is None:
+                self._finalize()
+            n = len(self.chunks)
+            scores = np.zeros(n, dtype=np.float32)
+            for term in set(tokenize(query)):
+                tid = self._vocab.get(term)
+                if tid is None:
+                    continue
+                s, e = int(self._offsets[tid]), int(self._offsets[tid + 1])
+                df = e - s
+                idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+                docs = self._docs[s:e]
+                tf = self._tfs[s:e]
+                # 한 용어의 게시 목록 안에서 청크는 중복되지 않으므로 팬시 인덱싱 += 가 안전
+                scores[docs] += idf * tf * (self.k1 + 1.0) / (tf + self._norm[docs])
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    def select(
+        self, query: str, k: int = 8, max_tokens: int = 1800, min_ratio: float = 0.25
+    ) -> List[Any]:
+        """
+        점수순으로 max_tokens 안에 들어가는 청크를 고르고(최고점의 min_ratio 미만은 버림),
+        읽기 좋게 원래 문서 순서로 돌려줌.
+        """
+        hits = self._top(query, k)
+        if not hits:
+            return []
+        floor = hits[0][1] * min_ratio
+        picked: List[int] = []
+        used = 0
+        for i, score in hits:
+            if score < floor:
+                break
+            cost = estimate_tokens(self.chunks[i].text)
+            if picked and used + cost > max_tokens:
+                continue   # 더 짧은 다음 청크는 들어갈 수 있음
+            picked.append(i)
+            used += cost
+        return [self.chunks[i] for i in sorted(picked)]
+
+    def context(self, query: str, k: int = 8, max_tokens: int = 1800) -> str:
+        """select() 결과를 '[첨부 문서] 파일 p.N' 블록으로. 관련 청크가 없으면 빈 문자열."""
+        picked = self.select(query, k=k, max_tokens=max_tokens)
+        return chunks_to_context(picked, max_chars=10 ** 9) if picked else ""
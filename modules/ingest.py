@@ -0,0 +1,549 @@
+# modules/ingest.py  (첨부 문서 PDF/DOCX/TXT → 페이지 단위 스트리밍 추출 + 프로세스 풀 + 내용 해시 캐시)
+from __future__ import annotations
+import hashlib
+import multiprocessing as mp
+import os
+import re
+import tempfile
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+SUPPORTED_KINDS = ("pdf", "docx", "txt")
+
+# progress(처리한 페이지 수, 전체 페이지 수) — 제너레이터를 소비하는 스레드에서 호출(IngestJob 이면 워커 스레드)
+Progress = Callable[[int, int], None]
+
+_PAGE_NUM_RE = re.compile(r"^\s*[-–—]?\s*\d{1,4}\s*[-–—]?\s*$|^\s*\d{1,4}\s*/\s*\d{1,4}\s*$")
+_WS_RE = re.compile(r"[ \t 　]+")
+_SENT_END_RE = re.compile(r"(?<=[.!?。])\s+")
+_PSEUDO_PAGE_CHARS = 3000   # DOCX/TXT 는 쪽 구분이 없으므로 이 길이 단위로 끊어 진행률/상한에 씀
+
+
+class IngestError(Exception):
+    """지원하지 않는 형식/손상된 파일. str(e)는 사용자 표시용."""
+
+
+@dataclass(frozen=True)
+class Chunk:
+    doc_id: str              # 파일 내용 해시(앞 16자)
+    source: str              # 파일 이름
+    page: Optional[int]      # PDF 쪽 번호(1부터). DOCX/TXT 는 None
+    index: int               # 문서 안 순번
+    text: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.source} p.{self.page}" if self.page else self.source
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"doc_id": self.doc_id, "source": self.source, "page": self.page, "index": self.index, "text": self.text}
+
+
+@dataclass
+class IngestResult:
+    doc_id: str
+    name: str
+    kind: str
+    chunks: List[Chunk]
+    pages: int               # 실제 처리한 (가상)쪽 수
+    total_pages: int
+    chars: int
+    truncated: bool          # 쪽/글자 상한에서 멈춤
+    cached: bool = False
+    elapsed: float = 0.0
+
+
+# ================= 텍스트 정리/청크 =================
+def compact_text(text: str) -> str:
+    """공백 압축, 빈 줄·쪽번호만 있는 줄 제거, 줄끝 하이픈 연결."""
+    out: List[str] = []
+    for ln in (text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        ln = _WS_RE.sub(" ", ln).strip()
+        if not ln or _PAGE_NUM_RE.match(ln):
+            continue
+        if out and out[-1].endswith("-") and ln[:1].islower():
+            out[-1] = out[-1][:-1] + ln
+            continue
+        out.append(ln)
+    return "\n".join(out)
+
+
+def _pieces(text: str, size: int) -> Iterator[str]:
+    """한 줄이 size 보다 길면 문장 경계 → 글자 수로 나눔."""
+    for para in text.split("\n"):
+        if not para:
+            continue
+        if len(para) <= size:
+            yield para
+            continue
+        buf = ""
+        for sent in _SENT_END_RE.split(para):
+            while len(sent) > size:
+                if buf:
+                    yield buf
+                    buf = ""
+                yield sent[:size]
+                sent = sent[size:]
+            if buf and len(buf) + 1 + len(sent) > size:
+                yield buf
+                buf = sent
+            else:
+                buf = f"{buf} {sent}" if buf else sent
+        if buf:
+            yield buf
+
+
+def chunk_text(text: str, chunk_chars: int = 1200, overlap: int = 150) -> List[str]:
+    """줄 경계 기준으로 chunk_chars 이하로 묶음. 이어지는 청크 앞에 직전 청크 끝 overlap 자를 붙임(겹침 포함 길이 상한)."""
+    chunks: List[str] = []
+    cur: List[str] = []
+    n = 0
+    fresh = False   # cur 에 겹침 꼬리 말고 새 내용이 있는지
+    for piece in _pieces(text, max(1, chunk_chars - max(0, overlap) - 1)):
+        if fresh and n + len(piece) + 1 > chunk_chars:
+            chunks.append("\n".join(cur))
+            tail = chunks[-1][-overlap:] if overlap > 0 else ""
+            cur, n, fresh = ([tail] if tail else []), len(tail), False
+        cur.append(piece)
+        n += len(piece) + 1
+        fresh = True
+    if fresh:
+        chunks.append("\n".join(cur))
+    return chunks
+
+
+# ================= 형식별 추출 (워커 프로세스에서도 실행되므로 모듈 최상위 함수) =================
+def _open_pdf(path: str) -> Any:
+    try:
+        import pymupdf  # type: ignore
+    except ImportError:  # 구버전 PyMuPDF
+        import fitz as pymupdf  # type: ignore
+    return pymupdf.open(path)
+
+
+def _pdf_page_count(path: str) -> int:
+    with _open_pdf(path) as doc:
+        if doc.needs_pass:
+            raise IngestError("암호가 걸린 PDF 는 읽을 수 없습니다.")
+        return doc.page_count
+
+
+def _pdf_pages(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """[start, stop) 쪽의 (쪽번호, 정리된 텍스트)."""
+    out: List[Tuple[int, str]] = []
+    with _open_pdf(path) as doc:
+        for i in range(start, min(stop, doc.page_count)):
+            out.append((i + 1, compact_text(doc.load_page(i).get_text("text"))))
+    return out
+
+
+def _docx_text(path: str) -> str:
+    import docx2txt  # type: ignore
+    return docx2txt.process(path) or ""
+
+
+def _decode_txt(data: bytes) -> str:
+    for cs in ("utf-8-sig", "cp949"):
+        try:
+            return data.decode(cs)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="replace")
+
+
+def _pseudo_pages(text: str) -> List[Tuple[Optional[int], str]]:
+    text = compact_text(text)
+    pages: List[Tuple[Optional[int], str]] = []
+    buf: List[str] = []
+    n = 0
+    for ln in text.split("\n"):
+        buf.append(ln)
+        n += len(ln) + 1
+        if n >= _PSEUDO_PAGE_CHARS:
+            pages.append((None, "\n".join(buf)))
+            buf, n = [], 0
+    if buf and any(buf):
+        pages.append((None, "\n".join(buf)))
+    return pages
+
+
+def _docx_pages(path: str) -> List[Tuple[Optional[int], str]]:
+    return _pseudo_pages(_docx_text(path))
+
+
+def detect_kind(name: str, data: bytes) -> str:
+    """확장자 우선, 없거나 틀리면 매직 바이트로 판별."""
+    ext = Path(name or "").suffix.lower().lstrip(".")
+    if data[:5] == b"%PDF-":
+        return "pdf"
+    if data[:2] == b"PK" and ext in ("docx", ""):
+        return "docx"
+    if ext in SUPPORTED_KINDS and ext != "pdf":
+        return ext
+    raise IngestError(f"지원하지 않는 파일 형식입니다: {name}")
+
+
+# ================= 캐시 =================
+class IngestCache:
+    """내용 해시(+추출 설정) → IngestResult. 프로세스 메모리 LRU(같은 파일 재업로드/재실행 시 즉시 반환)."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, IngestResult]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[IngestResult]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None:
+                self._data.move_to_end(key)
+            return hit
+
+    def put(self, key: str, result: IngestResult) -> None:
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+# ================= 수집기 =================
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """프로세스 공용 풀. Streamlit 은 스레드가 많은 프로세스라 fork 대신 spawn."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=mp.get_context("spawn"))
+            _pool_workers = max_workers
+        return _pool
+
+
+@dataclass
+class _Run:
+    # 한 문서 처리 중 상태(상한 판정용)
+    doc_id: str
+    name: str
+    chunks: List[Chunk] = field(default_factory=list)
+    pages: int = 0
+    chars: int = 0
+    truncated: bool = False
+
+
+class DocumentIngestor:
+    """
+    업로드 파일 → 청크 목록.
+
+    - PDF 는 쪽 묶음(pages_per_task)마다 프로세스 풀 작업으로 추출해 쪽 순서대로 흘려보냄(스트리밍).
+      동시에 띄우는 작업은 max_workers*2 개까지라 상한에 닿으면 남은 쪽은 추출하지 않음
+    - DOCX 는 docx2txt 한 번(풀에서), TXT 는 바로 디코드. 둘 다 약 3,000자 단위를 한 쪽으로 취급
+    - max_pages / max_chars 상한, inline_bytes 이하 작은 파일은 풀 없이 현재 스레드에서 처리
+    - 같은 내용(+설정)은 IngestCache 에서 바로 반환
+    iter_chunks() 는 청크를 나오는 대로, ingest() 는 끝까지 모아 IngestResult 로 돌려줍니다.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pages: int = 300,
+        max_chars: int = 300_000,
+        chunk_chars: int = 1200,
+        overlap: int = 150,
+        pages_per_task: int = 8,
+        inline_bytes: int = 256 * 1024,
+        cache: Optional[IngestCache] = None,
+    ):
+        self.max_workers = max(1, int(max_workers))
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.chunk_chars = chunk_chars
+        self.overlap = overlap
+        self.pages_per_task = max(1, pages_per_task)
+        self.inline_bytes = inline_bytes
+        self.cache = cache if cache is not None else IngestCache()
+
+    def _key(self, digest: str) -> str:
+        return f"{digest}:{self.max_pages}:{self.max_chars}:{self.chunk_chars}:{self.overlap}"
+
+    # ---- 공개 API ----
+    def ingest(self, name: str, data: bytes, progress: Optional[Progress] = None) -> IngestResult:
+        t0 = time.monotonic()
+        digest = hashlib.sha256(data).hexdigest()
+        hit = self.cache.get(self._key(digest))
+        if hit is not None:
+            if progress is not None:
+                progress(hit.total_pages, hit.total_pages)
+            return IngestResult(**{**hit.__dict__, "name": name, "cached": True, "elapsed": time.monotonic() - t0})
+        kind = detect_kind(name, data)
+        run = _Run(doc_id=digest[:16], name=name)
+        total = 0
+        for total, _chunk in self._stream(kind, data, run, progress):
+            pass
+        result = IngestResult(
+            doc_id=run.doc_id, name=name, kind=kind, chunks=run.chunks, pages=run.pages,
+            total_pages=total, chars=run.chars, truncated=run.truncated, elapsed=time.monotonic() - t0,
+        )
+        self.cache.put(self._key(digest), result)
+        return result
+
+    def iter_chunks(
+        self,
+        name: str,
+        data: bytes,
+        progress: Optional[Progress] = None,
+        done: Optional[Callable[[IngestResult], None]] = None,
+    ) -> Iterator[Chunk]:
+        """
+        청크를 추출되는 대로 내보냄. 끝까지 소비하면 캐시에 저장하고, done 이 있으면 ingest() 와 같은
+        IngestResult(잘림 여부·쪽 수 등)로 한 번 호출(캐시를 다시 조회하지 않아도 됨).
+        """
+        t0 = time.monotonic()
+        digest = hashlib.sha256(data).hexdigest()
+        hit = self.cache.get(self._key(digest))
+        if hit is not None:
+            if progress is not None:
+                progress(hit.total_pages, hit.total_pages)
+            yield from hit.chunks
+            if done is not None:
+                done(IngestResult(**{**hit.__dict__, "name": name, "cached": True, "elapsed": time.monotonic() - t0}))
+            return
+        kind = detect_kind(name, data)
+        run = _Run(doc_id=digest[:16], name=name)
+        total = 0
+        for total, chunk in self._stream(kind, data, run, progress):
+            if chunk is not None:
+                yield chunk
+        result = IngestResult(
+            doc_id=run.doc_id, name=name, kind=kind, chunks=run.chunks, pages=run.pages,
+            total_pages=total, chars=run.chars, truncated=run.truncated, elapsed=time.monotonic() - t0,
+        )
+        self.cache.put(self._key(digest), result)
+        if done is not None:
+            done(result)
+
+    # ---- 내부 ----
+    def _add_page(self, run: _Run, page: Optional[int], text: str) -> List[Chunk]:
+        run.pages += 1
+        room = self.max_chars - run.chars
+        if len(text) > room:
+            text = text[:max(0, room)]
+            run.truncated = True
+        out = []
+        for piece in chunk_text(text, self.chunk_chars, self.overlap):
+            ch = Chunk(run.doc_id, run.name, page, len(run.chunks), piece)
+            run.chunks.append(ch)
+            out.append(ch)
+        run.chars += len(text)
+        return out
+
+    def _stream(
+        self, kind: str, data: bytes, run: _Run, progress: Optional[Progress]
+    ) -> Iterator[Tuple[int, Optional[Chunk]]]:
+        """(전체 쪽 수, 청크 또는 None) 를 흘려보냄. None 은 진행률만 갱신된 경우."""
+        if kind == "txt":
+            yield from self._emit_pages(_pseudo_pages(_decode_txt(data)), run, progress)
+            return
+
+        use_pool = len(data) > self.inline_bytes
+        fd, path = tempfile.mkstemp(suffix="." + kind, prefix="ingest-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            if kind == "docx":
+                try:
+                    pages = (_process_pool(self.max_workers).submit(_docx_pages, path).result()
+                             if use_pool else _docx_pages(path))
+                except Exception as e:
+                    raise IngestError(f"DOCX 를 읽을 수 없습니다: {type(e).__name__}") from e
+                yield from self._emit_pages(pages, run, progress)
+            else:
+                yield from self._stream_pdf(path, use_pool, run, progress)
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _emit_pages(
+        self, pages: Sequence[Tuple[Optional[int], str]], run: _Run, progress: Optional[Progress]
+    ) -> Iterator[Tuple[int, Optional[Chunk]]]:
+        total = len(pages)
+        if total > self.max_pages:
+            run.truncated = True
+        limit = min(total, self.max_pages)
+        for i, (page, text) in enumerate(pages[:limit], 1):
+            for ch in self._add_page(run, page, text):
+                yield limit, ch
+            if progress is not None:
+                progress(i, limit)
+            if run.chars >= self.max_chars:
+                run.truncated = run.truncated or i < limit
+                break
+        yield limit, None
+
+    def _stream_pdf(
+        self, path: str, use_pool: bool, run: _Run, progress: Optional[Progress]
+    ) -> Iterator[Tuple[int, Optional[Chunk]]]:
+        try:
+            total = _pdf_page_count(path)
+        except IngestError:
+            raise
+        except Exception as e:
+            raise IngestError(f"PDF 를 읽을 수 없습니다: {type(e).__name__}") from e
+        if total > self.max_pages:
+            run.truncated = True
+        limit = min(total, self.max_pages)
+        step = self.pages_per_task
+        ranges = [(s, min(s + step, limit)) for s in range(0, limit, step)]
+
+        if not use_pool or len(ranges) <= 1:
+            def batches() -> Iterator[List[Tuple[int, str]]]:
+                for s, e in ranges:
+                    yield _pdf_pages(path, s, e)
+        else:
+            pool = _process_pool(self.max_workers)
+            window: Deque[Future] = deque()
+
+            def batches() -> Iterator[List[Tuple[int, str]]]:
+                todo = iter(ranges)
+                try:
+                    for s, e in todo:
+                        window.append(pool.submit(_pdf_pages, path, s, e))
+                        if len(window) >= self.max_workers * 2:
+                            break
+                    while window:
+                        yield window.popleft().result()
+                        nxt = next(todo, None)
+                        if nxt is not None:
+                            window.append(pool.submit(_pdf_pages, path, *nxt))
+                finally:
+                    for f in window:  # 상한/소비 중단 시 남은 작업 취소
+                        f.cancel()
+
+        done = 0
+        for batch in batches():
+            for page, text in batch:
+                done += 1
+                for ch in self._add_page(run, page, text):
+                    yield limit, ch
+                if run.chars >= self.max_chars:
+                    run.truncated = run.truncated or done < limit
+                    break
+            if progress is not None:
+                progress(done, limit)
+            if run.chars >= self.max_chars:
+                break
+        yield limit, None
+
+
+_ingestor: Optional[DocumentIngestor] = None
+_ingestor_lock = threading.Lock()
+
+
+def default_ingestor() -> DocumentIngestor:
+    """프로세스 공용 수집기(캐시를 세션끼리 공유)."""
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            _ingestor = DocumentIngestor()
+        return _ingestor
+
+
+class IngestJob:
+    """
+    업로드 파일들을 워커 스레드에서 읽어 청크가 나오는 대로 index.add(...) 로 넘기는 작업.
+
+    - start(executor) 는 바로 돌아옴: 호출한 쪽(Streamlit 스크립트 스레드)은 기다리지 않고
+      지금까지 색인된 청크로 답변하면 됨(DocIndex 는 add/검색이 스레드 안전)
+    - batch 개씩 모아 add 하므로 긴 PDF 도 앞쪽부터 검색에 잡힘
+    - progress: (파일 이름, 처리한 쪽, 전체 쪽), notes: 잘림/오류 안내(사용자 표시용)
+    """
+
+    def __init__(
+        self,
+        ingestor: DocumentIngestor,
+        index: Any,
+        files: Sequence[Tuple[str, bytes]],
+        batch: int = 16,
+    ):
+        self.ingestor = ingestor
+        self.index = index
+        self.files = list(files)
+        self.batch = max(1, batch)
+        self.progress: Tuple[str, int, int] = ("", 0, 0)
+        self.notes: List[str] = []
+        self.future: Optional[Future] = None
+        self._added = threading.Event()   # 첫 청크가 색인됐거나 작업이 끝남
+
+    def start(self, executor: Any) -> "IngestJob":
+        self.future = executor.submit(self._run)
+        return self
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def wait_first(self, timeout: float) -> bool:
+        """첫 청크가 색인될 때까지(또는 작업이 끝날 때까지) 최대 timeout 초 기다림."""
+        return self._added.wait(timeout)
+
+    def _flush(self, buf: List[Chunk]) -> None:
+        if buf:
+            self.index.add(buf)
+            buf.clear()
+            self._added.set()
+
+    def _run(self) -> None:
+        try:
+            for name, data in self.files:
+                buf: List[Chunk] = []
+                finished: List[IngestResult] = []
+                try:
+                    for ch in self.ingestor.iter_chunks(
+                        name, data,
+                        progress=lambda done, total, name=name: setattr(self, "progress", (name, done, total)),
+                        done=finished.append,
+                    ):
+                        buf.append(ch)
+                        if len(buf) >= self.batch:
+                            self._flush(buf)
+                    self._flush(buf)
+                    if finished and finished[0].truncated:
+                        self.notes.append(f"{name}: 앞 {finished[0].pages}쪽까지만 반영했습니다.")
+                except IngestError as e:
+                    self._flush(buf)
+                    self.notes.append(f"{name}: {e}")
+                except Exception:
+                    self._flush(buf)
+                    traceback.print_exc()
+                    self.notes.append(f"{name}: 문서를 읽는 중 오류가 발생했습니다.")
+        finally:
+            self._added.set()
+
+
+def chunks_to_context(chunks: Sequence[Chunk], max_chars: int = 6000) -> str:
+    """AdviceEngine 질문에 덧붙일 첨부 문서 블록(make_url_context 와 같은 모양, max_chars 까지)."""
+    parts: List[str] = []
+    used = 0
+    for ch in chunks:
+        block = f"[첨부 문서] {ch.label}\n{ch.text}\n"
+        if used + len(block) > max_chars:
+            room = max_chars - used
+            if room > 200:
+                parts.append(block[:room])
+            break
+        parts.append(block)
+        used += len(block)
+    return "\n".join(parts)
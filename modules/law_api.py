@@ -0,0 +1,133 @@
+# modules/law_api.py  (국가법령정보 공동활용 Open API(DRF) 조문 검색 — 로컬 조문 색인에 없는 질의의 원격 폴백)
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .doc_index import tokenize
+from .law_catalog import get_catalog, squash
+from .statute_index import article_label, parse_query, text_of
+
+DRF_BASE = "https://www.law.go.kr/DRF"
+
+
+def _as_list(v: Any) -> List[Any]:
+    # DRF JSON 은 결과가 하나면 목록 대신 객체 하나를 줌
+    if v is None:
+        return []
+    return v if isinstance(v, list) else [v]
+
+
+def _item(law: str, art: Dict[str, Any]) -> Dict[str, Any]:
+    """DRF 조문단위 → 로컬 색인(StatuteIndex)과 같은 모양의 항목."""
+    no = int(str(art.get("조문번호") or 0) or 0)
+    sub_raw = str(art.get("조문가지번호") or "")
+    sub = int(sub_raw) if sub_raw.isdigit() else 0
+    body = text_of(art.get("조문내용"))
+    if art.get("항"):
+        body = (body + "\n" + text_of(_as_list(art["항"]))).strip()
+    return {
+        "법령명한글": law, "조문번호": str(no), "조문가지번호": str(sub) if sub else "",
+        "조문제목": str(art.get("조문제목") or ""), "조문내용": body,
+        "법령상세링크": f"/법령/{law}/{article_label(no, sub)}",
+    }
+
+
+class LawAPI:
+    """
+    law.go.kr DRF 로 search_one / search_multi 와 같은 모양({"query", "items", "source": "remote"})을 돌려줌.
+
+    - 법령명 → lawSearch.do(target=law) 로 현행 법령 일련번호(MST). 법령명이 없으면 본문 검색(search=2) 첫 법령
+    - 조문 번호가 있으면 lawService.do(JO=조4자리+가지2자리) 로 그 조문만,
+      없으면 법령 본문을 받아 질의 2-gram 이 많이 겹치는 조문 상위 num_rows 개
+    - 네트워크/형식 오류는 {"error": ...} 를 담아 돌려줌(툴 캐시는 error 결과를 저장하지 않음)
+    LocalFirstSearch(index, remote_one=api.search_one, remote_multi=api.search_multi) 로 씁니다.
+    """
+
+    def __init__(self, oc: str, base: str = DRF_BASE, timeout: float = 4.0, session: Optional[requests.Session] = None):
+        self.oc = oc
+        self.base = base.rstrip("/")
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def _get(self, path: str, **params: Any) -> Dict[str, Any]:
+        r = self.session.get(f"{self.base}/{path}", params={"OC": self.oc, "type": "JSON", **params}, timeout=self.timeout)
+        r.raise_for_status()
+        data = r.json()
+        if not isinstance(data, dict):
+            raise ValueError("unexpected response")
+        return data
+
+    def _find_law(self, name: str, body_search: bool = False) -> Optional[Tuple[str, str]]:
+        """(MST, 법령명한글). 이름이 정확히 같은 법령을 우선, 없으면 첫 결과."""
+        params: Dict[str, Any] = {"target": "law", "query": name, "display": 10}
+        if body_search:
+            params["search"] = 2
+        laws = _as_list((self._get("lawSearch.do", **params).get("LawSearch") or {}).get("law"))
+        laws = [x for x in laws if isinstance(x, dict) and x.get("법령일련번호") and x.get("법령명한글")]
+        if not laws:
+            return None
+        key = squash(name)
+        best = next((x for x in laws if squash(x["법령명한글"]) == key), laws[0])
+        return str(best["법령일련번호"]), str(best["법령명한글"])
+
+    def _articles(self, mst: str, article: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {"target": "law", "MST": mst}
+        if article:
+            params["JO"] = f"{article[0]:04d}{article[1]:02d}"
+        body = self._get("lawService.do", **params).get("법령") or {}
+        units = _as_list((body.get("조문") or {}).get("조문단위"))
+        # 조문여부 '전문' 은 편·장 제목 줄
+        return [u for u in units if isinstance(u, dict) and u.get("조문여부", "조문") == "조문"]
+
+    def search_one(self, query: str = "", num_rows: int = 5, **_: Any) -> Dict[str, Any]:
+        num_rows = max(1, int(num_rows or 5))
+        pq = parse_query(query, get_catalog().lookup)
+        law, article, rest = pq.law, pq.article, pq.keywords
+        try:
+            found = self._find_law(law) if law else (self._find_law(rest, body_search=True) if rest else None)
+            if found is None:
+                return {"query": query, "items": [], "source": "remote"}
+            mst, name = found
+            if law and article:
+                units = [u for u in self._articles(mst, article)
+                         if (int(str(u.get("조문번호") or 0) or 0), int(str(u.get("조문가지번호") or 0) or 0)) == article]
+            else:
+                units = self._articles(mst)
+                terms = set(pq.terms)
+                if terms:
+                    scored = [(len(terms & set(tokenize(f"{u.get('조문제목') or ''} {text_of(u.get('조문내용'))} "
+                                                       f"{text_of(_as_list(u.get('항')))}"))), i, u)
+                              for i, u in enumerate(units)]
+                    units = [u for n, _, u in sorted(scored, key=lambda x: (-x[0], x[1])) if n > 0]
+            return {"query": query, "items": [_item(name, u) for u in units[:num_rows]], "source": "remote"}
+        except (requests.RequestException, ValueError) as e:
+            return {"query": query, "items": [], "source": "remote", "error": f"law.go.kr: {type(e).__name__}"}
+
+    def search_multi(self, queries: Optional[List[str]] = None, num_rows: int = 3, **kw: Any) -> List[Dict[str, Any]]:
+        return [self.search_one(query=q, num_rows=num_rows, **kw) for q in (queries or [])]
+
+
+_api: Optional[LawAPI] = None
+_api_lock = threading.Lock()
+
+
+def default_law_api() -> Optional[LawAPI]:
+    """LAW_API_OC(공동활용 신청 ID) 로 만든 공용 클라이언트. 설정이 없으면 None(원격 폴백 없음)."""
+    global _api
+    with _api_lock:
+        if _api is None:
+            oc = os.environ.get("LAW_API_OC")
+            if not oc:
+                return None
+            _api = LawAPI(oc, base=os.environ.get("LAW_API_BASE", DRF_BASE),
+                          timeout=float(os.environ.get("LAW_API_TIMEOUT", "4.0")))
+        return _api
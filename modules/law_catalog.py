@@ -0,0 +1,128 @@
+# modules/law_catalog.py  (법령명 카탈로그 + 정규화 색인 — 프로세스 공용)
+from __future__ import annotations
+import os
+import threading
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent / "data" / "law_catalog.tsv"
+
+# 유사도(바이그램 Dice) 하한. 너무 낮으면 '난민법'→'민법' 같은 오매칭이 생김
+FUZZY_THRESHOLD = 0.75
+
+
+def squash(name: str) -> str:
+    """공백 제거 키: '민사 소송법' == '민사소송법'."""
+    return "".join((name or "").split())
+
+
+def _bigrams(s: str) -> List[str]:
+    return [s[i:i + 2] for i in range(len(s) - 1)] if len(s) > 1 else [s]
+
+
+class LawCatalog:
+    """
+    법령명 카탈로그(data/law_catalog.tsv)와 정규화 색인.
+
+    조회 순서: 정확 일치 → 약칭 → 공백 무시 → 글자 바이그램 유사도(FUZZY_THRESHOLD 이상).
+    - 법령명은 튜플 하나에 두고, 색인은 모두 그 번호(int)를 가리킴
+    - 바이그램 역색인의 포스팅은 array('H')로 보관(항목당 2바이트)
+    - normalize()는 결과를 LRU 캐시하므로 반복 조회는 dict 조회 수준
+    """
+
+    def __init__(self, rows: List[Tuple[str, List[str]]]):
+        self.names: Tuple[str, ...] = tuple(name for name, _ in rows)
+        self._exact: Dict[str, int] = {}
+        self._alias: Dict[str, int] = {}
+        self._squashed: Dict[str, int] = {}
+        self._grams: Dict[str, array] = {}
+        self._gram_len: array = array("H")
+
+        for idx, (name, aliases) in enumerate(rows):
+            self._exact[name] = idx
+            self._squashed.setdefault(squash(name), idx)
+            for a in aliases:
+                self._alias.setdefault(a, idx)
+                self._squashed.setdefault(squash(a), idx)
+            grams = set(_bigrams(squash(name)))
+            self._gram_len.append(len(grams))
+            for g in grams:
+                self._grams.setdefault(g, array("H")).append(idx)
+
+        self.normalize = lru_cache(maxsize=4096)(self._normalize)  # type: ignore[method-assign]
+
+    # ---- 로드 ----
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "LawCatalog":
+        rows: List[Tuple[str, List[str]]] = []
+        text = Path(path or DEFAULT_CATALOG_PATH).read_text(encoding="utf-8")
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, _, alias_part = line.partition("\t")
+            aliases = [a.strip() for a in alias_part.split("|") if a.strip()]
+            rows.append((name.strip(), aliases))
+        return cls(rows)
+
+    # ---- 조회 ----
+    def lookup(self, name: str) -> Optional[str]:
+        """정식 법령명 또는 None(어느 색인에도 걸리지 않음)."""
+        key = (name or "").strip()
+        if not key:
+            return None
+        idx = self._exact.get(key)
+        if idx is None:
+            idx = self._alias.get(key)
+        if idx is None:
+            idx = self._squashed.get(squash(key))
+        if idx is None:
+            idx = self._fuzzy(squash(key))
+        return self.names[idx] if idx is not None else None
+
+    def _normalize(self, name: str) -> str:
+        name = (name or "").strip()
+        return self.lookup(name) or name
+
+    def _fuzzy(self, key: str) -> Optional[int]:
+        grams = set(_bigrams(key))
+        if not grams:
+            return None
+        hits: Dict[int, int] = {}
+        for g in grams:
+            for idx in self._grams.get(g, ()):
+                hits[idx] = hits.get(idx, 0) + 1
+        best, best_score = None, 0.0
+        for idx, common in hits.items():
+            score = 2.0 * common / (len(grams) + self._gram_len[idx])
+            if score > best_score:
+                best, best_score = idx, score
+        return best if best_score >= FUZZY_THRESHOLD else None
+
+    def surface_forms(self) -> Iterator[Tuple[str, str]]:
+        """본문 매칭용 (표기, 정식명칭) — 정식명칭과 약칭 모두."""
+        for name, idx in self._exact.items():
+            yield name, self.names[idx]
+        for alias, idx in self._alias.items():
+            yield alias, self.names[idx]
+
+
+_catalog: Optional[LawCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> LawCatalog:
+    """공용 카탈로그(최초 호출 시 1회 로드, 모든 세션이 공유). LAW_CATALOG_PATH 로 경로 교체 가능."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = LawCatalog.load(Path(os.environ["LAW_CATALOG_PATH"]) if os.environ.get("LAW_CATALOG_PATH") else None)
+    return _catalog
+
+
+def normalize_law_name(name: str) -> str:
+    """알려진 법령이면 정식명칭, 아니면 입력 그대로(앞뒤 공백 제거)."""
+    return get_catalog().normalize(name)
@@ -2,24 +2,10 @@
 from __future__ import annotations
 import re
 from urllib.parse import quote
-from typing import Dict, List, Tuple
+from typing import List, Tuple
 
-# 자주 쓰는 약칭 보정(원하는 대로 추가/수정)
-ALIAS_MAP: Dict[str, str] = {
-    "형소법": "형사소송법",
-    "민소법": "민사소송법",
-    "민집법": "민사집행법",
-    # "형법": "형법",  # 동일명은 생략 가능
-}
-
-# "민법 제839조의2" 같은 패턴 추출(중복 허용되므로 나중에 set으로 유니크 처리)
-ARTICLE_PAT = re.compile(
-    r'(?P<law>[가-힣A-Za-z0-9·()\s]{2,40})\s*제(?P<num>\d{1,4})조(?P<ui>(의\d{1,3}){0,2})'
-)
-
-def _normalize_law_name(name: str) -> str:
-    name = name.strip()
-    return ALIAS_MAP.get(name, name)
+# 조문 인용 추출은 advice_engine.py 와 공용 엔진(사전 기반 매처, 약칭 보정 포함) 사용
+from .citations import extract_citations
 
 def make_deep_article_url(law_name: str, article_label: str) -> str:
     """
@@ -29,13 +15,8 @@ def make_deep_article_url(law_name: str, article_label: str) -> str:
     return f"https://law.go.kr/법령/{quote(law_name)}/{quote(article_label)}"
 
 def extract_article_citations(text: str) -> List[Tuple[str, str]]:
-    found: List[Tuple[str, str]] = []
-    for m in ARTICLE_PAT.finditer(text or ""):
-        law = _normalize_law_name(m.group("law"))
-        art = f"제{m.group('num')}조{m.group('ui') or ''}"
-        found.append((law, art))
-    # 유니크 보장(동일 (법령, 조문) 1회만)
-    return list({(l, a) for (l, a) in found})
+    # 유니크 보장(동일 (법령, 조문) 1회만, 발견 순서 유지)
+    return extract_citations(text or "")
 
 def render_article_links(citations: List[Tuple[str, str]]) -> str:
     if not citations:
@@ -0,0 +1,199 @@
+# modules/llm_client.py  (OpenAI / Azure OpenAI 클라이언트 구성 + AdviceEngine 용 safe_chat_completion + 법령 검색 툴 스키마)
+from __future__ import annotations
+import os
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from errors import is_content_filter_error  # 저장소 루트(app.py 가 sys.path 에 넣음)
+except Exception:
+    def is_content_filter_error(e: Exception) -> Optional[Dict[str, Any]]:  # type: ignore[misc]
+        return None
+
+MSG_FILTERED = "안전정책으로 답변을 생성할 수 없습니다."
+
+# 모델이 호출하는 툴: AdviceEngine 의 search_one / search_multi 디스패치 이름과 같아야 함
+LAW_TOOLS: List[Dict[str, Any]] = [
+    {
+        "type": "function",
+        "function": {
+            "name": "search_one",
+            "description": "법령명·조문으로 대한민국 법령 조문을 검색합니다. 예: '민법 제750조', '주택임대차보호법 보증금'.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "검색어(법령명과 조문 번호 또는 핵심어)"},
+                    "num_rows": {"type": "integer", "description": "최대 결과 수", "default": 5},
+                },
+                "required": ["query"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_multi",
+            "description": "여러 검색어를 한 번에 조회합니다(쟁점이 여러 법령에 걸칠 때).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "queries": {"type": "array", "items": {"type": "string"}, "description": "검색어 목록"},
+                    "num_rows": {"type": "integer", "description": "검색어당 최대 결과 수", "default": 3},
+                },
+                "required": ["queries"],
+            },
+        },
+    },
+]
+
+
+def _env(*names: str) -> Optional[str]:
+    for n in names:
+        v = os.environ.get(n)
+        if v:
+            return v
+    return None
+
+
+def make_client() -> Tuple[Any, Optional[str]]:
+    """
+    (client, model). 설정은 환경변수에서 읽습니다(Streamlit secrets 의 최상위 키도 환경변수로 노출됨).
+      - Azure: AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_DEPLOYMENT[, AZURE_OPENAI_API_VERSION]
+      - OpenAI: OPENAI_API_KEY[, OPENAI_MODEL]
+    키가 없거나 openai 패키지가 없으면 (None, None) — 엔진은 '설정되지 않음' 응답을 냅니다.
+    """
+    try:
+        import openai
+    except Exception:
+        return None, None
+    try:
+        key = _env("AZURE_OPENAI_API_KEY")
+        endpoint = _env("AZURE_OPENAI_ENDPOINT")
+        if key and endpoint:
+            client = openai.AzureOpenAI(
+                api_key=key,
+                azure_endpoint=endpoint,
+                api_version=_env("AZURE_OPENAI_API_VERSION") or "2024-10-21",  # stream_options(include_usage) 지원
+                max_retries=0,  # 재시도는 safe_chat_completion 에서
+            )
+            return client, _env("AZURE_OPENAI_DEPLOYMENT", "AZURE_OPENAI_MODEL")
+        key = _env("OPENAI_API_KEY")
+        if key:
+            return openai.OpenAI(api_key=key, max_retries=0), _env("OPENAI_MODEL") or "gpt-4o-mini"
+    except Exception:
+        pass
+    return None, None
+
+
+def _status(e: Exception) -> Optional[int]:
+    return getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+
+
+def _headers(e: Exception) -> Dict[str, str]:
+    h = getattr(getattr(e, "response", None), "headers", None)
+    try:
+        return {str(k).lower(): str(v) for k, v in (h or {}).items()}
+    except Exception:
+        return {}
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNIT = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _duration(v: str) -> Optional[float]:
+    """'20ms' / '1.5s' / '6m0s' / '2' → 초."""
+    v = (v or "").strip()
+    try:
+        return float(v)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(v)
+    return sum(float(n) * _UNIT[u] for n, u in parts) if parts else None
+
+
+def retry_after_seconds(headers: Dict[str, str]) -> Optional[float]:
+    """
+    레이트 리밋 응답 헤더가 알려 주는 대기 시간(초). 우선순위:
+    retry-after-ms → retry-after(초 또는 HTTP 날짜) → x-ratelimit-reset-requests/-tokens 중 긴 쪽.
+    """
+    h = {k.lower(): v for k, v in (headers or {}).items()}
+    if h.get("retry-after-ms"):
+        try:
+            return float(h["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+    ra = h.get("retry-after")
+    if ra:
+        d = _duration(ra)
+        if d is None:
+            try:
+                d = parsedate_to_datetime(ra).timestamp() - time.time()
+            except Exception:
+                d = None
+        if d is not None:
+            return max(0.0, d)
+    resets = [_duration(h[k]) for k in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens") if h.get(k)]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+def _retryable(e: Exception) -> bool:
+    status = _status(e)
+    if status is not None:
+        return status == 429 or status >= 500
+    # 연결 끊김/타임아웃(상태 코드 없음)
+    return type(e).__name__ in ("APIConnectionError", "APITimeoutError", "Timeout", "ConnectionError")
+
+
+def safe_chat_completion(
+    client: Any,
+    *,
+    messages: List[Dict[str, Any]],
+    model: str,
+    stream: bool = False,
+    allow_retry: bool = True,
+    tools: Optional[List[Dict[str, Any]]] = None,
+    tool_choice: Optional[str] = None,
+    temperature: float = 0.2,
+    max_tokens: Optional[int] = None,
+    retries: int = 2,
+    priority: Optional[int] = None,
+    **extra: Any,
+) -> Dict[str, Any]:
+    """
+    chat.completions.create 래퍼. 예외 대신 AdviceEngine 이 기대하는 dict 를 돌려줍니다.
+      - 성공: {"resp": 응답} 또는 (stream=True) {"stream": 청크 이터레이터}
+      - 콘텐츠 필터: {"type": "blocked_by_content_filter", "message": ..., "categories": {...}}
+      - 그 밖의 실패: {"type": "error", "message": ..., "status": HTTP 상태(있으면), "headers": 응답 헤더(소문자 키),
+        "retryable": 429/5xx/연결 오류 여부}
+    allow_retry 이면 429/5xx/연결 오류를 retries 번까지 다시 시도합니다(레이트 리밋 헤더가 있으면 그만큼,
+    없으면 지수 백오프+지터). llm_scheduler 를 거칠 때는 재시도를 스케줄러가 맡으므로 allow_retry=False 로 불립니다
+    (스케줄러는 retryable 을 보고 다시 보냄). priority 는 스케줄러용 값이라 직접 호출에서는 무시합니다.
+    """
+    kwargs: Dict[str, Any] = dict(messages=messages, model=model, stream=stream, temperature=temperature, **extra)
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+    if tools:  # 빈 tools 목록은 API 가 거부
+        kwargs["tools"] = tools
+        if tool_choice:
+            kwargs["tool_choice"] = tool_choice
+    attempt = 0
+    while True:
+        try:
+            resp = client.chat.completions.create(**kwargs)
+            return {"stream": resp} if stream else {"resp": resp}
+        except Exception as e:
+            cats = is_content_filter_error(e)
+            if cats is not None:
+                return {"type": "blocked_by_content_filter", "message": MSG_FILTERED, "categories": cats}
+            headers = _headers(e)
+            if not (allow_retry and attempt < retries and _retryable(e)):
+                return {"type": "error", "message": str(e), "status": _status(e), "headers": headers,
+                        "retryable": _retryable(e)}
+            wait = retry_after_seconds(headers)
+            time.sleep(min(30.0, wait) if wait is not None else min(8.0, 0.5 * 2 ** attempt) * (0.5 + random.random()))
+            attempt += 1
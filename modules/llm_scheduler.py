@@ -0,0 +1,452 @@
+# modules/llm_scheduler.py  (프로세스 공용 LLM 호출 스케줄러: 동시성 상한 + 우선순위 큐 + 사용자별 토큰 버킷 + 429 헤더 기반 전역 백오프)
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .llm_client import retry_after_seconds
+from .telemetry import MetricsRegistry, default_registry
+from .token_budget import estimate_tokens
+
+# 숫자가 작을수록 먼저 나감
+PRIORITY_STREAM = 0        # 사용자가 기다리는 최종 답 호출(스트리밍 여부 무관)
+PRIORITY_INTERACTIVE = 1   # 같은 턴의 1차(툴 선택) 호출
+PRIORITY_BACKGROUND = 2    # 그 밖(요약·선행 작업 등)
+_PRIORITY_NAMES = {PRIORITY_STREAM: "stream", PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+MSG_QUEUE_TIMEOUT = "요청이 몰려 대기 시간이 초과되었습니다. 잠시 뒤 다시 시도해 주세요."
+
+
+def priority_of(kwargs: Dict[str, Any]) -> int:
+    """
+    호출 kwargs 로 우선순위 추정 — priority= 를 넘기지 않는 호출자용 폴백.
+    AdviceEngine 은 1차/최종 호출에 priority 를 직접 넘김(plain 모드의 tools=[] 나 비스트리밍 최종도 사용자 대기).
+    """
+    if kwargs.get("stream"):
+        return PRIORITY_STREAM
+    if kwargs.get("tools"):
+        return PRIORITY_INTERACTIVE
+    return PRIORITY_BACKGROUND
+
+
+def request_cost(kwargs: Dict[str, Any]) -> int:
+    """토큰 버킷에서 뺄 양: 프롬프트 추정 토큰 + 출력 상한(max_tokens)."""
+    n = 0
+    for m in kwargs.get("messages") or []:
+        c = m.get("content") if isinstance(m, dict) else None
+        if isinstance(c, str):
+            n += estimate_tokens(c)
+    return n + int(kwargs.get("max_tokens") or 0)
+
+
+class TokenBucket:
+    """rate(토큰/초)로 채워지고 burst 까지 쌓이는 버킷. reserve() 는 빚을 허용하고 기다릴 시간을 돌려줌."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def reserve(self, cost: float, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        self.tokens -= min(cost, self.burst)   # burst 보다 큰 요청도 언젠가는 통과
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+@dataclass(order=True)
+class _Ticket:
+    priority: int
+    seq: int
+
+
+@dataclass
+class SchedulerStats:
+    submitted: int = 0
+    dispatched: int = 0
+    completed: int = 0
+    rate_limited: int = 0      # 공급자 429 응답 수
+    throttled: int = 0         # 사용자 버킷 때문에 기다린 요청 수
+    timed_out: int = 0         # max_wait 안에 자리를 못 얻어 포기한 요청 수
+    retried: int = 0           # 5xx/연결 오류로 다시 보낸 요청 수
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    in_flight: int = 0
+    limit: float = 0.0         # 현재 동시성 상한(429 뒤 줄었다가 성공이 이어지면 회복)
+    waits: List[float] = field(default_factory=list)  # 최근 대기 시간(초)
+
+    def as_dict(self) -> Dict[str, Any]:
+        d = {k: v for k, v in self.__dict__.items() if k != "waits"}
+        w = sorted(self.waits)
+        d["wait_p50"] = w[len(w) // 2] if w else 0.0
+        d["wait_p95"] = w[min(len(w) - 1, int(len(w) * 0.95))] if w else 0.0
+        return d
+
+
+class _SlotStream:
+    """스트림을 다 읽거나 닫을 때(또는 GC) 동시성 자리를 반환하는 래퍼. 나머지 속성은 원본에 위임."""
+
+    def __init__(self, stream: Any, release: Callable[[], None]):
+        self._done = False
+        self._release = release
+        self._stream = stream
+        self._it: Any = None
+
+    def _finish(self) -> None:
+        if not self._done:
+            self._done = True
+            self._release()
+
+    def __iter__(self) -> "_SlotStream":
+        self._it = iter(self._stream)
+        return self
+
+    def __next__(self) -> Any:
+        if self._it is None:
+            self._it = iter(self._stream)
+        try:
+            return next(self._it)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self) -> Any:
+        try:
+            close = getattr(self._stream, "close", None)
+            return close() if close is not None else None
+        finally:
+            self._finish()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def __del__(self) -> None:
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class _AsyncSlotStream(_SlotStream):
+    """async 스트림용(AdviceEngine 은 __aiter__ 유무로 async 스트림을 구분)."""
+
+    def __aiter__(self) -> "_AsyncSlotStream":
+        self._it = self._stream.__aiter__()
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._it is None:
+            self._it = self._stream.__aiter__()
+        try:
+            return await self._it.__anext__()
+        except StopAsyncIteration:
+            self._finish()
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            aclose = getattr(self._stream, "aclose", None) or getattr(self._stream, "close", None)
+            if aclose is not None:
+                r = aclose()
+                if asyncio.iscoroutine(r):
+                    await r
+        finally:
+            self._finish()
+
+
+class LLMScheduler:
+    """
+    모든 세션의 safe_chat_completion 호출 앞에 두는 프로세스 공용 스케줄러.
+
+    - 동시성 상한: 진행 중 호출(스트리밍은 스트림을 다 읽거나 닫을 때까지)이 limit 을 넘지 않음
+    - 우선순위 큐: 자리가 나면 (priority, 도착 순) 으로 다음 요청을 보냄 — 스트리밍 최종 호출이 백그라운드보다 먼저
+    - 사용자별 토큰 버킷: kwargs["user"] 마다 user_rate 토큰/초, user_burst 까지. 초과분은 큐에 들어가기 전에 대기
+    - 429: 응답 헤더(retry-after-ms / retry-after / x-ratelimit-reset-*)만큼 전체 디스패치를 멈추고
+      (헤더가 없으면 연속 429 횟수에 따른 지수 백오프 + 지터), 해당 요청은 같은 우선순위로 다시 줄을 섬.
+      동시성 상한은 절반으로 줄였다가 성공 recover_after 번마다 1씩 회복(AIMD) — 사용자마다 따로 재시도하지 않음
+    - 5xx/연결 오류(결과의 retryable): 자리를 반환하고 그 요청만 retry-after 헤더 또는 retry_base 지수 백오프+지터만큼
+      쉰 뒤 다시 줄을 섬(전역 멈춤 없음). 429 와 합쳐 max_attempts 번까지
+    - 메트릭: registry 가 있으면 llm_queue_wait_seconds{priority}, llm_requests_total{priority,outcome},
+      llm_rate_limited_total, llm_queue_depth / llm_in_flight / llm_concurrency_limit 게이지
+    wrap(scc) 는 safe_chat_completion 과 같은 시그니처의 함수를 돌려주므로 AdviceEngine 에 그대로 넘기면 됩니다.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        user_rate: float = 400.0,
+        user_burst: float = 12000.0,
+        max_wait: float = 60.0,
+        max_attempts: int = 4,
+        recover_after: int = 10,
+        retry_base: float = 0.5,
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+        self.recover_after = recover_after
+        self.retry_base = retry_base
+        self.registry = registry
+        self.stats = SchedulerStats(limit=float(self.max_concurrency))
+        self._limit = float(self.max_concurrency)
+        self._cond = threading.Condition()
+        self._heap: List[_Ticket] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._streak_429 = 0
+        self._successes = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    # ---- 자리 얻기/반환 ----
+    def _gauges(self) -> None:
+        # self._cond 안에서 호출
+        self.stats.queue_depth = len(self._heap)
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, len(self._heap))
+        self.stats.in_flight = self._in_flight
+        self.stats.limit = self._limit
+        if self.registry is not None:
+            self.registry.set("llm_queue_depth", len(self._heap))
+            self.registry.set("llm_in_flight", self._in_flight)
+            self.registry.set("llm_concurrency_limit", self._limit)
+
+    def _acquire(self, priority: int, deadline: float) -> Optional[float]:
+        """자리를 얻으면 기다린 시간(초), deadline 까지 못 얻으면 None."""
+        t0 = time.monotonic()
+        with self._cond:
+            ticket = _Ticket(priority, next(self._seq))
+            heapq.heappush(self._heap, ticket)
+            self._gauges()
+            while True:
+                now = time.monotonic()
+                if (
+                    self._heap[0] is ticket
+                    and self._in_flight < int(self._limit)
+                    and now >= self._paused_until
+                ):
+                    heapq.heappop(self._heap)
+                    self._in_flight += 1
+                    self.stats.dispatched += 1
+                    self._gauges()
+                    self._cond.notify_all()   # 다음 줄이 조건을 다시 보게
+                    break
+                if now >= deadline:
+                    self._heap.remove(ticket)
+                    heapq.heapify(self._heap)
+                    self.stats.timed_out += 1
+                    self._gauges()
+                    self._cond.notify_all()
+                    return None
+                wake = deadline
+                if self._paused_until > now:
+                    wake = min(wake, self._paused_until)
+                self._cond.wait(max(0.001, wake - now))
+        waited = time.monotonic() - t0
+        with self._cond:
+            self.stats.waits.append(waited)
+            del self.stats.waits[:-1000]
+        if self.registry is not None:
+            self.registry.observe("llm_queue_wait_seconds", waited, priority=_PRIORITY_NAMES.get(priority, priority))
+        return waited
+
+    def _release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self.stats.completed += 1
+            self._gauges()
+            self._cond.notify_all()
+
+    def _on_rate_limited(self, headers: Dict[str, str]) -> None:
+        with self._cond:
+            self._streak_429 += 1
+            self._successes = 0
+            self.stats.rate_limited += 1
+            wait = retry_after_seconds(headers)
+            if wait is None:
+                wait = min(30.0, 0.5 * 2 ** (self._streak_429 - 1))
+            wait *= 1.0 + 0.2 * random.random()   # 모두 같은 순간에 다시 몰리지 않게
+            self._paused_until = max(self._paused_until, time.monotonic() + wait)
+            self._limit = max(1.0, float(int(self._limit) // 2))
+            self._gauges()
+        if self.registry is not None:
+            self.registry.inc("llm_rate_limited_total")
+
+    def _on_success(self) -> None:
+        with self._cond:
+            self._streak_429 = 0
+            self._successes += 1
+            if self._limit < self.max_concurrency and self._successes >= self.recover_after:
+                self._limit = min(float(self.max_concurrency), self._limit + 1)
+                self._successes = 0
+                self._gauges()
+                self._cond.notify_all()
+
+    def _user_wait(self, user: str, cost: int) -> float:
+        if not user or self.user_rate <= 0:
+            return 0.0
+        with self._cond:
+            b = self._buckets.get(user)
+            if b is None:
+                b = self._buckets[user] = TokenBucket(self.user_rate, self.user_burst)
+                if len(self._buckets) > 10000:   # 오래된 사용자 정리(가득 찬 버킷 = 기본값과 같음)
+                    now = time.monotonic()
+                    for k in [k for k, v in self._buckets.items() if now - v.stamp > 600]:
+                        del self._buckets[k]
+            wait = b.reserve(cost)
+            if wait > 0:
+                self.stats.throttled += 1
+            return wait
+
+    # ---- 호출 ----
+    def _prepare(self, kwargs: Dict[str, Any]) -> Tuple[int, float, str]:
+        priority = kwargs.pop("priority", None)
+        priority = priority_of(kwargs) if priority is None else int(priority)
+        kwargs["allow_retry"] = False   # 재시도는 스케줄러가(429 는 전역 백오프, 일시 오류는 요청별)
+        with self._cond:
+            self.stats.submitted += 1
+        return priority, time.monotonic() + self.max_wait, _PRIORITY_NAMES.get(priority, str(priority))
+
+    @staticmethod
+    def _is_rate_limited(res: Dict[str, Any]) -> bool:
+        return isinstance(res, dict) and res.get("status") == 429
+
+    def _retry_wait(self, res: Dict[str, Any], attempt: int, deadline: float) -> Optional[float]:
+        """일시 오류(5xx/연결)면 다시 보내기 전 쉴 시간(초). 재시도하지 않을 결과이거나 시간이 없으면 None."""
+        if not (isinstance(res, dict) and res.get("retryable")) or attempt + 1 >= self.max_attempts:
+            return None
+        wait = retry_after_seconds(res.get("headers") or {})
+        if wait is None:
+            wait = min(8.0, self.retry_base * 2 ** attempt) * (0.5 + random.random())
+        if time.monotonic() + wait >= deadline:
+            return None
+        with self._cond:
+            self.stats.retried += 1
+        if self.registry is not None:
+            self.registry.inc("llm_retries_total")
+        return wait
+
+    def _finish(self, res: Dict[str, Any], stream: bool, label: str) -> Dict[str, Any]:
+        if self.registry is not None:
+            self.registry.inc("llm_requests_total", priority=label, outcome=res.get("type", "ok"))
+        if stream and "stream" in res:
+            res = dict(res)
+            wrapper = _AsyncSlotStream if hasattr(res["stream"], "__aiter__") else _SlotStream
+            res["stream"] = wrapper(res["stream"], self._release)  # 자리는 스트림이 끝날 때 반환
+        else:
+            self._release()
+        return res
+
+    def _timeout(self, label: str) -> Dict[str, Any]:
+        if self.registry is not None:
+            self.registry.inc("llm_requests_total", priority=label, outcome="queue_timeout")
+        return {"type": "error", "message": MSG_QUEUE_TIMEOUT, "status": 429}
+
+    def call(self, scc: Callable[..., Dict[str, Any]], client: Any, **kwargs: Any) -> Dict[str, Any]:
+        priority, deadline, label = self._prepare(kwargs)
+        wait = self._user_wait(str(kwargs.get("user") or ""), request_cost(kwargs))
+        if wait > 0:
+            if time.monotonic() + wait >= deadline:
+                return self._timeout(label)
+            time.sleep(wait)
+        res: Dict[str, Any] = {}
+        for attempt in range(self.max_attempts):
+            if self._acquire(priority, deadline) is None:
+                return self._timeout(label)
+            try:
+                res = scc(client, **kwargs)
+            except BaseException:
+                self._release()
+                raise
+            if self._is_rate_limited(res):
+                self._release()
+                self._on_rate_limited(res.get("headers") or {})
+                continue
+            retry = self._retry_wait(res, attempt, deadline)
+            if retry is not None:
+                self._release()
+                time.sleep(retry)
+                continue
+            self._on_success()
+            return self._finish(res, bool(kwargs.get("stream")), label)
+        if self.registry is not None:
+            self.registry.inc("llm_requests_total", priority=label, outcome="rate_limited")
+        return res
+
+    async def acall(self, ascc: Callable[..., Awaitable[Dict[str, Any]]], client: Any, **kwargs: Any) -> Dict[str, Any]:
+        priority, deadline, label = self._prepare(kwargs)
+        wait = self._user_wait(str(kwargs.get("user") or ""), request_cost(kwargs))
+        if wait > 0:
+            if time.monotonic() + wait >= deadline:
+                return self._timeout(label)
+            await asyncio.sleep(wait)
+        res: Dict[str, Any] = {}
+        for attempt in range(self.max_attempts):
+            # 자리 대기는 스레드에서(이벤트 루프를 막지 않음)
+            if await asyncio.to_thread(self._acquire, priority, deadline) is None:
+                return self._timeout(label)
+            try:
+                res = await ascc(client, **kwargs)
+            except BaseException:
+                self._release()
+                raise
+            if self._is_rate_limited(res):
+                self._release()
+                self._on_rate_limited(res.get("headers") or {})
+                continue
+            retry = self._retry_wait(res, attempt, deadline)
+            if retry is not None:
+                self._release()
+                await asyncio.sleep(retry)
+                continue
+            self._on_success()
+            return self._finish(res, bool(kwargs.get("stream")), label)
+        if self.registry is not None:
+            self.registry.inc("llm_requests_total", priority=label, outcome="rate_limited")
+        return res
+
+    def wrap(self, scc: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+        """safe_chat_completion 과 같은 모양의 함수(AdviceEngine(safe_chat_completion=...) 용)."""
+        def scheduled(client: Any, **kwargs: Any) -> Dict[str, Any]:
+            return self.call(scc, client, **kwargs)
+        return scheduled
+
+    def wrap_async(self, ascc: Callable[..., Awaitable[Dict[str, Any]]]) -> Callable[..., Awaitable[Dict[str, Any]]]:
+        """async_safe_chat_completion 용."""
+        async def scheduled(client: Any, **kwargs: Any) -> Dict[str, Any]:
+            return await self.acall(ascc, client, **kwargs)
+        return scheduled
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def default_scheduler() -> LLMScheduler:
+    """
+    프로세스 공용 스케줄러. 환경변수로 조정:
+    LLM_MAX_CONCURRENCY(8), LLM_USER_TOKENS_PER_SEC(400), LLM_USER_BURST(12000), LLM_MAX_WAIT(60)
+    메트릭은 telemetry.default_registry() 에 기록됩니다.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            env = os.environ.get
+            _scheduler = LLMScheduler(
+                max_concurrency=int(env("LLM_MAX_CONCURRENCY") or 8),
+                user_rate=float(env("LLM_USER_TOKENS_PER_SEC") or 400),
+                user_burst=float(env("LLM_USER_BURST") or 12000),
+                max_wait=float(env("LLM_MAX_WAIT") or 60),
+                registry=default_registry(),
+            )
+        return _scheduler
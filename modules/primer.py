@@ -0,0 +1,161 @@
+# modules/primer.py  (법령 컨텍스트 프라이머 — 백그라운드 선행 조회)
+from __future__ import annotations
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+def _pct(vals: list, q: float) -> float:
+    if not vals:
+        return 0.0
+    s = sorted(vals)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+@dataclass
+class PrimerStats:
+    """
+    프라이머 적중/실패 집계 — 예산(budget) 튜닝용.
+      hit    : 예산 안에 준비됨
+      miss   : 예산 초과로 프라이머 없이 진행
+      reused : 이전 턴에 늦게 도착한 프라이머를 재사용
+      error  : 조회/요약 예외 또는 빈 결과
+    """
+    hit: int = 0
+    miss: int = 0
+    reused: int = 0
+    error: int = 0
+    fetch_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=512))
+    wait_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=512))
+
+    def as_dict(self) -> Dict[str, Any]:
+        f, w = list(self.fetch_ms), list(self.wait_ms)
+        return {
+            "hit": self.hit, "miss": self.miss, "reused": self.reused, "error": self.error,
+            "fetch_ms_p50": _pct(f, 0.5), "fetch_ms_p95": _pct(f, 0.95),
+            "wait_ms_p50": _pct(w, 0.5), "wait_ms_p95": _pct(w, 0.95),
+        }
+
+
+class _Job:
+    __slots__ = ("future", "started")
+
+    def __init__(self, started: float):
+        self.future: Optional[Future] = None
+        self.started = started
+
+
+class PrimerPrefetcher:
+    """
+    prefetch_law_context + summarize_laws_for_primer 를 백그라운드로 미리 실행.
+
+    - start(q)  : 조회 시작(같은 질문이 이미 진행/완료 중이면 재사용)
+    - take(q)   : 시작 시점부터 budget 초 안에 끝났으면 프라이머 문자열, 아니면 None
+                  늦은 작업은 버리지 않고 남겨두어 같은 질문의 다음 턴(재질문/재생성)이 가져감
+    - 보관 개수는 keep 개로 제한(오래된 것부터 폐기)
+    """
+
+    def __init__(
+        self,
+        prefetch: Callable[..., Any],
+        summarize: Callable[..., str],
+        budget: float = 1.5,
+        keep: int = 8,
+        max_workers: int = 2,
+    ):
+        self.prefetch = prefetch
+        self.summarize = summarize
+        self.budget = budget
+        self.keep = keep
+        self.stats = PrimerStats()
+        self._jobs: "OrderedDict[str, _Job]" = OrderedDict()
+        self._lock = Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="advice-primer")
+
+    @staticmethod
+    def _key(q: str) -> str:
+        return " ".join((q or "").split())
+
+    def _run(self, job: _Job, q: str) -> str:
+        try:
+            pre = self.prefetch(q, num_rows_per_law=3)
+            return self.summarize(pre, max_items=6) or ""
+        finally:
+            # 예산을 넘긴 작업도 실제 소요시간은 기록(예산 튜닝의 기준값)
+            with self._lock:
+                self.stats.fetch_ms.append((time.monotonic() - job.started) * 1000.0)
+
+    def start(self, q: str) -> None:
+        key = self._key(q)
+        with self._lock:
+            if key in self._jobs:
+                self._jobs.move_to_end(key)
+                return
+            job = _Job(time.monotonic())
+            job.future = self._pool.submit(self._run, job, q)
+            self._jobs[key] = job
+            while len(self._jobs) > self.keep:
+                _, old = self._jobs.popitem(last=False)
+                old.future.cancel()
+
+    def take(self, q: str) -> Optional[str]:
+        key = self._key(q)
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            return None
+
+        was_ready = job.future.done()
+        t0 = time.monotonic()
+        wait = max(0.0, job.started + self.budget - t0)
+        try:
+            primer = job.future.result(timeout=wait)
+        except FutureTimeout:
+            # 예산 초과: 이번 턴은 프라이머 없이 진행, 작업은 다음 턴 재사용을 위해 남겨둠
+            with self._lock:
+                self.stats.miss += 1
+                self.stats.wait_ms.append((time.monotonic() - t0) * 1000.0)
+            return None
+        except Exception:
+            primer = ""
+
+        with self._lock:
+            self._jobs.pop(key, None)
+            self.stats.wait_ms.append((time.monotonic() - t0) * 1000.0)
+            if not primer:
+                self.stats.error += 1
+            elif was_ready and time.monotonic() - job.started > self.budget:
+                self.stats.reused += 1
+            else:
+                self.stats.hit += 1
+        return primer or None
+
+
+# ================= 검색 툴 기반 프라이머 =================
+def prefetch_via_search(search_one: Callable[..., Any]) -> Callable[..., list]:
+    """search_one(query=, num_rows=) → prefetch_law_context(q, num_rows_per_law=) 형태로 감쌈(조문 항목 목록)."""
+    def prefetch(q: str, num_rows_per_law: int = 3) -> list:
+        res = search_one(query=q, num_rows=num_rows_per_law)
+        return list(res.get("items") or []) if isinstance(res, dict) else []
+    return prefetch
+
+
+def summarize_laws_for_primer(pre: Any, max_items: int = 6, max_chars: int = 160) -> str:
+    """조문 항목 → 시스템 메시지용 짧은 목록. 항목이 없으면 빈 문자열(프라이머 없이 진행)."""
+    lines = []
+    for it in list(pre or [])[:max_items]:
+        if not isinstance(it, dict) or not it.get("법령명한글"):
+            continue
+        no, sub = it.get("조문번호") or "", it.get("조문가지번호") or ""
+        label = f"제{no}조" + (f"의{sub}" if sub and str(sub) != "0" else "") if no else ""
+        title = f"({it['조문제목']})" if it.get("조문제목") else ""
+        body = " ".join(str(it.get("조문내용") or "").split())
+        if len(body) > max_chars:
+            body = body[:max_chars] + "…"
+        lines.append(f"- {it['법령명한글']} {label}{title}: {body}".rstrip(": "))
+    if not lines:
+        return ""
+    return "질문과 관련해 미리 조회한 조문입니다(참고용, 필요하면 툴로 다시 확인):\n" + "\n".join(lines)
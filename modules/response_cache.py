@@ -0,0 +1,152 @@
+# modules/response_cache.py  (AdviceEngine 답변 캐시: 메모리 LRU/TTL + 선택적 SQLite 영속 계층)
+from __future__ import annotations
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+Links = List[Dict[str, Any]]
+
+
+def normalize_question(q: str) -> str:
+    """공백/대소문자/끝 물음표 차이는 같은 질문으로 취급."""
+    q = " ".join((q or "").split()).lower()
+    return q.rstrip("?？.! ")
+
+
+def make_key(question: str, mode: str, system_prompt: str, model: str, temperature: float) -> str:
+    sys_hash = hashlib.sha256((system_prompt or "").encode("utf-8")).hexdigest()[:16]
+    raw = "\x1f".join([normalize_question(question), mode or "", sys_hash, model or "", f"{temperature:.3f}"])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def replay_events(
+    text: str, links: Links, stream: bool = True, chunk_chars: int = 48
+) -> Generator[Tuple[str, str, Links], None, None]:
+    """캐시된 답변을 generate()와 같은 이벤트 순서로 다시 흘려보냄(UI 경로 동일)."""
+    if stream:
+        for i in range(0, len(text), chunk_chars):
+            yield ("delta", text[i:i + chunk_chars], links)
+    yield ("final", text, links)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    bypass: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class ResponseCache:
+    """
+    질문 답변 캐시.
+
+    - 메모리: OrderedDict LRU(max_entries) + TTL(ttl 초)
+    - 디스크(db_path 지정 시): SQLite 테이블 하나. 재시작 후에도 유지되며 메모리 미스 때 조회 후 승격
+    - invalidate(key) / clear() 로 무효화, stats 로 적중/미스 집계
+    키는 make_key(질문, 모드, 시스템프롬프트 해시, 모델, 온도)로 만듭니다.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 6 * 3600,
+        db_path: Optional[str | Path] = None,
+        max_disk_entries: int = 20000,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.stats = CacheStats()
+        self._mem: "OrderedDict[str, Tuple[float, str, Links]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._puts = 0
+        if db_path:
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, created REAL NOT NULL, text TEXT NOT NULL, links TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def _fresh(self, created: float) -> bool:
+        return time.time() - created < self.ttl
+
+    def get(self, key: str) -> Optional[Tuple[str, Links]]:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                created, text, links = hit
+                if self._fresh(created):
+                    self._mem.move_to_end(key)
+                    self.stats.hits += 1
+                    return text, links
+                del self._mem[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, text, links FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and self._fresh(row[0]):
+                    links = json.loads(row[2])
+                    self._remember(key, row[0], row[1], links)
+                    self.stats.hits += 1
+                    self.stats.disk_hits += 1
+                    return row[1], links
+
+            self.stats.misses += 1
+            return None
+
+    def _remember(self, key: str, created: float, text: str, links: Links) -> None:
+        self._mem[key] = (created, text, links)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def put(self, key: str, text: str, links: Links) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, text, links)
+            self.stats.stores += 1
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses(key, created, text, links) VALUES (?, ?, ?, ?)",
+                (key, now, text, json.dumps(links, ensure_ascii=False, default=str)),
+            )
+            self._puts += 1
+            if self._puts % 100 == 0:
+                # 주기적으로 만료분 정리 + 개수 상한 유지
+                self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+            self._db.commit()
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._mem.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
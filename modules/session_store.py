@@ -0,0 +1,417 @@
+# modules/session_store.py  (대화 기록 영속화: 백그라운드 write-behind 큐 + 세션별 묶음/병합 + 페이지 단위 지연 로드)
+from __future__ import annotations
+import atexit
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+Message = Dict[str, Any]          # {"role": ..., "content": ...}
+Page = List[Tuple[int, Message]]  # (seq, message) — seq 오름차순
+
+
+# ================= 백엔드 =================
+class SessionBackend:
+    """
+    저장소 인터페이스. write() 는 write-behind 스레드에서만, load() 는 아무 스레드에서나 호출됩니다.
+    - write(sid, messages, meta): seq → 메시지(같은 seq 는 덮어쓰기) + 세션 메타 병합
+    - load(sid, before, limit): seq < before(None 이면 끝까지) 중 마지막 limit 개를 seq 오름차순으로
+    """
+
+    def write(self, session_id: str, messages: Dict[int, Message], meta: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def load(self, session_id: str, before: Optional[int], limit: int) -> Page:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(SessionBackend):
+    """프로세스 메모리(로컬 시험용). 재시작하면 사라집니다."""
+
+    def __init__(self) -> None:
+        self._data: Dict[str, Dict[int, Message]] = {}
+        self.meta: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.writes = 0   # write() 호출 수(묶음 효과 확인용)
+
+    def write(self, session_id: str, messages: Dict[int, Message], meta: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data.setdefault(session_id, {}).update({k: dict(v) for k, v in messages.items()})
+            self.meta.setdefault(session_id, {}).update(meta)
+            self.writes += 1
+
+    def load(self, session_id: str, before: Optional[int], limit: int) -> Page:
+        with self._lock:
+            rows = self._data.get(session_id, {})
+            seqs = sorted(s for s in rows if before is None or s < before)[-limit:] if limit > 0 else []
+            return [(s, dict(rows[s])) for s in seqs]
+
+
+class SQLiteBackend(SessionBackend):
+    """
+    SQLite(WAL) 파일. 같은 머신의 워커 프로세스들이 공유할 수 있습니다.
+    - 파일은 소유자만 읽고 쓰도록(0600) 만듦(-wal/-shm 도 SQLite 가 같은 권한으로 만듦)
+    - 세션마다 최근 max_messages 건만 남기고, ttl 초 동안 쓰이지 않은 세션은 purge_interval 마다 지움
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl: float = 30 * 86400.0,
+        max_messages: int = 500,
+        purge_interval: float = 3600.0,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.purge_interval = purge_interval
+        self._purged = 0.0
+        # 대화 내용(법률 상담)이므로 다른 로컬 사용자가 읽지 못하게: 없으면 0600 으로 만들고, 있으면 권한을 좁힘
+        os.close(os.open(str(self.path), os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600))
+        os.chmod(self.path, 0o600)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session TEXT NOT NULL, seq INTEGER NOT NULL, body TEXT NOT NULL, ts REAL NOT NULL,"
+            " PRIMARY KEY (session, seq)) WITHOUT ROWID"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (session TEXT PRIMARY KEY, meta TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def write(self, session_id: str, messages: Dict[int, Message], meta: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO messages(session, seq, body, ts) VALUES (?, ?, ?, ?)",
+                    [(session_id, seq, json.dumps(m, ensure_ascii=False), now) for seq, m in messages.items()],
+                )
+                if meta:
+                    row = self._db.execute("SELECT meta FROM sessions WHERE session = ?", (session_id,)).fetchone()
+                    merged = {**(json.loads(row[0]) if row else {}), **meta}
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO sessions(session, meta, updated) VALUES (?, ?, ?)",
+                        (session_id, json.dumps(merged, ensure_ascii=False), now),
+                    )
+                if self.max_messages > 0:
+                    self._db.execute(
+                        "DELETE FROM messages WHERE session = ? AND seq <= ("
+                        " SELECT seq FROM messages WHERE session = ? ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                        (session_id, session_id, self.max_messages),
+                    )
+                if self.ttl > 0 and now - self._purged >= self.purge_interval:
+                    self._purged = now
+                    self._db.execute("DELETE FROM messages WHERE ts < ?", (now - self.ttl,))
+                    self._db.execute("DELETE FROM sessions WHERE updated < ?", (now - self.ttl,))
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+
+    def load(self, session_id: str, before: Optional[int], limit: int) -> Page:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, body FROM messages WHERE session = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session_id, before if before is not None else 2 ** 62, limit),
+            ).fetchall()
+        return [(seq, json.loads(body)) for seq, body in reversed(rows)]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class FirestoreBackend(SessionBackend):
+    """
+    Firestore: {collection}/{sid} 문서에 메타, {collection}/{sid}/messages/{seq:08d} 에 메시지 한 건씩.
+    한 번의 write() 는 batch 커밋(최대 500건 단위) 하나로 끝납니다.
+    client 를 주지 않으면 firebase_admin 기본 앱(GOOGLE_APPLICATION_CREDENTIALS 또는
+    FIREBASE_CREDENTIALS 의 서비스 계정 JSON 경로)으로 만듭니다.
+    """
+
+    _BATCH = 500
+
+    def __init__(self, client: Any = None, collection: str = "law2_sessions"):
+        if client is None:
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+
+            if not firebase_admin._apps:
+                cred_path = os.environ.get("FIREBASE_CREDENTIALS")
+                firebase_admin.initialize_app(credentials.Certificate(cred_path) if cred_path else None)
+            client = firestore.client()
+        self._db = client
+        self.collection = collection
+
+    def _session(self, session_id: str) -> Any:
+        return self._db.collection(self.collection).document(session_id)
+
+    def write(self, session_id: str, messages: Dict[int, Message], meta: Dict[str, Any]) -> None:
+        doc = self._session(session_id)
+        items = sorted(messages.items())
+        now = time.time()
+        for i in range(0, max(len(items), 1), self._BATCH):
+            batch = self._db.batch()
+            for seq, m in items[i:i + self._BATCH]:
+                batch.set(doc.collection("messages").document(f"{seq:08d}"), {**m, "seq": seq, "ts": now})
+            if i == 0:
+                batch.set(doc, {**meta, "updated": now}, merge=True)
+            batch.commit()
+
+    def load(self, session_id: str, before: Optional[int], limit: int) -> Page:
+        from google.cloud.firestore_v1 import FieldFilter, Query
+
+        q = self._session(session_id).collection("messages")
+        if before is not None:
+            q = q.where(filter=FieldFilter("seq", "<", before))
+        snaps = q.order_by("seq", direction=Query.DESCENDING).limit(limit).stream()
+        page = []
+        for s in snaps:
+            d = s.to_dict() or {}
+            seq = int(d.pop("seq", 0))
+            d.pop("ts", None)
+            page.append((seq, d))
+        return list(reversed(page))
+
+
+# ================= write-behind =================
+@dataclass
+class WriteBehindStats:
+    queued: int = 0       # record() 로 받은 메시지 수
+    coalesced: int = 0    # 같은 seq 를 덮어써서 줄어든 쓰기
+    flushes: int = 0      # 백엔드 write() 호출 수(세션 단위 묶음)
+    written: int = 0      # 백엔드에 쓴 메시지 수
+    errors: int = 0       # 실패한 write() — 대기열로 되돌려 다음 주기에 재시도
+    dropped: int = 0      # max_retries 초과로 버린 메시지
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class WriteBehindQueue:
+    """
+    답변 경로를 막지 않는 쓰기 큐.
+
+    - record(): 메모리의 세션별 대기열에 넣고 즉시 반환(네트워크 없음)
+    - 백그라운드 스레드가 flush_interval 마다(대기 메시지가 max_batch 를 넘으면 바로) 세션별로 한 번에 씀
+    - 같은 (세션, seq) 를 여러 번 기록하면 마지막 것만 씀(스트리밍 중 부분 답변 갱신 등)
+    - 쓰기에 실패한 묶음은 대기열로 되돌려(그 사이 더 새 값이 있으면 새 값 우선) 다음 주기에 재시도,
+      max_retries 번 넘게 실패하면 버리고 stats.dropped 에 셉니다
+    - flush(): 지금까지 받은 것을 모두 쓸 때까지 대기, close(): 마지막 flush 후 스레드 종료(atexit)
+    """
+
+    def __init__(
+        self,
+        backend: SessionBackend,
+        flush_interval: float = 1.0,
+        max_batch: int = 200,
+        max_retries: int = 5,
+    ):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.stats = WriteBehindStats()
+        self._pending: Dict[str, Dict[int, Message]] = {}
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._failures: Dict[str, int] = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, session_id: str, seq: int, message: Message, **meta: Any) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehindQueue is closed")
+            msgs = self._pending.setdefault(session_id, {})
+            if seq in msgs:
+                self.stats.coalesced += 1
+            else:
+                self._size += 1
+            msgs[seq] = dict(message)
+            if meta:
+                self._meta.setdefault(session_id, {}).update(meta)
+            self.stats.queued += 1
+            if self._size >= self.max_batch:
+                self._cond.notify_all()
+
+    def pending(self, session_id: str) -> Dict[int, Message]:
+        """아직 백엔드에 쓰지 않은 메시지(읽기 시 덮어 보이기용 복사본)."""
+        with self._cond:
+            return {k: dict(v) for k, v in self._pending.get(session_id, {}).items()}
+
+    def _take(self) -> Dict[str, Tuple[Dict[int, Message], Dict[str, Any]]]:
+        # self._cond 안에서 호출
+        work = {sid: (msgs, self._meta.pop(sid, {})) for sid, msgs in self._pending.items()}
+        for sid, meta in list(self._meta.items()):
+            work.setdefault(sid, ({}, meta))
+        self._pending, self._meta, self._size = {}, {}, 0
+        self._inflight += 1
+        return work
+
+    def _requeue(self, session_id: str, msgs: Dict[int, Message], meta: Dict[str, Any]) -> None:
+        # self._cond 안에서 호출: 그 사이 새로 들어온 값이 우선
+        cur = self._pending.setdefault(session_id, {})
+        for seq, m in msgs.items():
+            if seq not in cur:
+                cur[seq] = m
+                self._size += 1
+        self._meta[session_id] = {**meta, **self._meta.get(session_id, {})}
+
+    def _write(self, work: Dict[str, Tuple[Dict[int, Message], Dict[str, Any]]]) -> None:
+        for sid, (msgs, meta) in work.items():
+            try:
+                self.backend.write(sid, msgs, meta)
+                with self._cond:
+                    self.stats.flushes += 1
+                    self.stats.written += len(msgs)
+                    self._failures.pop(sid, None)
+            except Exception:
+                with self._cond:
+                    self.stats.errors += 1
+                    n = self._failures[sid] = self._failures.get(sid, 0) + 1
+                    if n > self.max_retries:
+                        self.stats.dropped += len(msgs)
+                        self._failures.pop(sid, None)
+                    else:
+                        self._requeue(sid, msgs, meta)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and self._size < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                if not self._pending and not self._meta:
+                    if self._closed:
+                        return
+                    continue
+                work = self._take()
+            try:
+                self._write(work)
+            finally:
+                with self._cond:
+                    self._inflight -= 1
+                    self._cond.notify_all()
+            if self.stats.errors and self._failures:
+                time.sleep(min(self.flush_interval * 2, 5.0))  # 저장소 장애 시 재시도 간격을 벌림
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """대기 중인 쓰기가 모두 끝날 때까지(또는 timeout) 대기. 다 썼으면 True."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending or self._meta or self._inflight:
+                left = None if end is None else end - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(left if left is None else min(left, 0.1))
+                self._cond.notify_all()
+            return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self.backend.close()
+
+
+# ================= 파사드 =================
+class SessionStore:
+    """
+    app.py 가 쓰는 창구: record()(논블로킹) + load_recent()/load_before()(페이지 단위).
+    읽을 때는 백엔드 결과에 아직 쓰이지 않은 대기열을 덮어 보여 주므로 쓰기 지연과 무관하게 일관됩니다.
+    """
+
+    def __init__(self, backend: SessionBackend, **writer_kw: Any):
+        self.backend = backend
+        self.writer = WriteBehindQueue(backend, **writer_kw)
+
+    def record(self, session_id: str, seq: int, message: Message) -> None:
+        self.writer.record(session_id, seq, message, count=seq + 1)
+
+    def load_before(self, session_id: str, before: Optional[int], limit: int) -> Page:
+        """seq < before 인 마지막 limit 개(오름차순). before=None 이면 가장 최근 limit 개."""
+        rows = dict(self.backend.load(session_id, before, limit))
+        rows.update({s: m for s, m in self.writer.pending(session_id).items() if before is None or s < before})
+        seqs = sorted(rows)[-limit:] if limit > 0 else []
+        return [(s, rows[s]) for s in seqs]
+
+    def load_recent(self, session_id: str, limit: int) -> Page:
+        return self.load_before(session_id, None, limit)
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        return self.writer.flush(timeout)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def make_backend(kind: str) -> SessionBackend:
+    """
+    'memory' | 'sqlite' | 'firestore'. sqlite 경로는 SESSION_DB_PATH(기본: 임시 폴더의 law2_sessions.sqlite3),
+    보존 기간 SESSION_TTL_DAYS(30), 세션당 최대 메시지 수 SESSION_MAX_MESSAGES(500).
+    """
+    kind = kind.strip().lower()
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(
+            os.environ.get("SESSION_DB_PATH") or Path(tempfile.gettempdir()) / "law2_sessions.sqlite3",
+            ttl=float(os.environ.get("SESSION_TTL_DAYS") or 30) * 86400.0,
+            max_messages=int(os.environ.get("SESSION_MAX_MESSAGES") or 500),
+        )
+    if kind == "firestore":
+        return FirestoreBackend(collection=os.environ.get("SESSION_COLLECTION") or "law2_sessions")
+    raise ValueError(f"unknown session store: {kind!r}")
+
+
+_store: Optional[SessionStore] = None
+_store_failed_until = 0.0
+_store_lock = threading.Lock()
+STORE_RETRY_AFTER = 300.0   # 백엔드 생성 실패 뒤 다시 시도하기까지(초)
+
+
+def default_session_store() -> Optional[SessionStore]:
+    """
+    프로세스 공용 저장소. SESSION_STORE=firestore|sqlite|memory 로 명시했을 때만 켜짐
+    (미설정/빈 문자열/'off' 면 None — 대화는 세션 메모리에만 있고 디스크에 남지 않음).
+    백엔드를 만들 수 없으면(자격 증명 없음 등) None 이고, 실패는 STORE_RETRY_AFTER 초 동안 기억해
+    rerun 마다 초기화를 다시 시도하지 않습니다. 종료 시 atexit 로 남은 쓰기를 flush 합니다.
+    """
+    global _store, _store_failed_until
+    with _store_lock:
+        if _store is None:
+            kind = (os.environ.get("SESSION_STORE") or "").strip()
+            if not kind or kind.lower() == "off":
+                return None
+            if time.monotonic() < _store_failed_until:
+                return None
+            try:
+                _store = SessionStore(make_backend(kind))
+            except Exception:
+                traceback.print_exc()
+                _store_failed_until = time.monotonic() + STORE_RETRY_AFTER
+                return None
+            atexit.register(_store.close)
+        return _store
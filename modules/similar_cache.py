@@ -0,0 +1,240 @@
+# modules/similar_cache.py  (유사 질문 캐시 — 글자 n-gram TF-IDF 벡터 + NumPy 코사인, 인용 법령·조문·숫자 일치 조건)
+from __future__ import annotations
+import hashlib
+import math
+import re
+import threading
+import zlib
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .citations import default_matcher
+from .legal_modes import Intent, classify_intent
+
+_PUNCT = re.compile(r"[\s\W_]+", re.UNICODE)
+_NUM = re.compile(r"\d+")
+
+
+def _grams(text: str) -> Counter:
+    """공백·문장부호 제거 후 글자 2-gram + 3-gram 빈도."""
+    s = _PUNCT.sub("", (text or "").lower())
+    c: Counter = Counter()
+    for n in (2, 3):
+        for i in range(len(s) - n + 1):
+            c[s[i:i + n]] += 1
+    if not c and s:
+        c[s] += 1
+    return c
+
+
+def question_signature(text: str) -> int:
+    """
+    글자 n-gram 이 비슷해도 답이 달라지는 부분의 지문(int64): 언급된 법령명, (법령, 조문) 인용, 본문의 숫자(순서대로).
+    '제3조의3' ↔ '제6조의3', '주택임대차보호법' ↔ '상가건물 임대차보호법', '민법 제750조' ↔ '형법' 은 지문이 달라
+    점수와 상관없이 적중하지 않음.
+    """
+    m = default_matcher()
+    sig = (sorted(m.laws(text)), sorted(m.extract(text)), _NUM.findall(text or ""))
+    digest = hashlib.blake2b(repr(sig).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+@dataclass
+class SimilarStats:
+    answer_hits: int = 0
+    tool_hits: int = 0
+    misses: int = 0
+    inserts: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class _SimIndex:
+    """
+    단일 Intent 용 색인.
+      - 행렬 M (capacity × dim, uint8): n-gram 을 dim 칸으로 해싱한 TF 벡터(L2 정규화 후 0~255 양자화).
+        코사인은 배율에 무관하므로 양자화 오차만 남고, 10만 행 × 256칸이 25MB. 꽉 차면 가장 오래된 슬롯부터 덮어씀
+      - 칸별 문서빈도 bucket_df: 조회 시점의 IDF 가중치를 만들어 후보 행에만 적용
+        (삽입 시점 IDF 를 벡터에 굳히지 않으므로 오래된 항목과 새 항목의 점수가 어긋나지 않음)
+      - n-gram → 슬롯 번호 역색인(array('i')): 후보 추리기용
+      - 슬롯별 질문 지문 S(int64, question_signature): 지문이 같은 행만 후보로 남김
+    조회는 질문의 희귀한 n-gram 부터 포스팅을 모아(상한 probe_budget) 많이 겹치는 후보 max_candidates 개만 남긴 뒤,
+    그 행들만 모아 한 번에 IDF 가중 코사인을 계산합니다. 근접 중복 질문은 희귀 n-gram 을 거의 다 공유하므로
+    후보에서 빠지지 않습니다(집합 유사도의 prefix filtering 과 같은 원리).
+    """
+
+    probe_budget = 8192
+    max_candidates = 256
+
+    def __init__(self, capacity: int, dim: int):
+        self.capacity = capacity
+        self.dim = dim
+        self.M = np.zeros((min(capacity, 1024), dim), dtype=np.uint8)
+        self.S = np.zeros(self.M.shape[0], dtype=np.int64)
+        self.size = 0            # 지금까지 넣은 개수(덮어쓰기 포함 누적)
+        self.payloads: List[Any] = []
+        self.slot_grams: List[Tuple[str, ...]] = []
+        self.df: Counter = Counter()
+        self.bucket_df = np.zeros(dim, dtype=np.float32)
+        self.postings: Dict[str, array] = {}
+        self._stale = 0
+
+    @property
+    def live(self) -> int:
+        return min(self.size, self.capacity)
+
+    def _buckets(self, grams: Iterable[str]) -> np.ndarray:
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) % self.dim for g in grams), dtype=np.int64)
+
+    def tf_vector(self, grams: Counter) -> np.ndarray:
+        v = np.zeros(self.dim, dtype=np.float32)
+        np.add.at(v, self._buckets(grams), [1.0 + math.log(tf) for tf in grams.values()])
+        n = float(np.linalg.norm(v))
+        return v / n if n else v
+
+    def add(self, grams: Counter, payload: Any, sig: int = 0) -> None:
+        slot = self.size % self.capacity
+        if slot >= self.M.shape[0]:
+            grow = min(self.capacity, self.M.shape[0] * 2)
+            self.M = np.concatenate([self.M, np.zeros((grow - self.M.shape[0], self.dim), dtype=np.uint8)])
+            self.S = np.concatenate([self.S, np.zeros(grow - self.S.shape[0], dtype=np.int64)])
+
+        keys = tuple(grams)
+        if slot < len(self.payloads):
+            # 덮어쓰기: 옛 항목의 df 를 빼고, 역색인의 옛 슬롯 번호는 지연 정리
+            old = self.slot_grams[slot]
+            for g in old:
+                self.df[g] -= 1
+                if self.df[g] <= 0:
+                    del self.df[g]
+            np.subtract.at(self.bucket_df, np.unique(self._buckets(old)), 1.0)
+            self._stale += len(old)
+            self.payloads[slot] = payload
+            self.slot_grams[slot] = keys
+        else:
+            self.payloads.append(payload)
+            self.slot_grams.append(keys)
+        for g in keys:
+            self.df[g] += 1
+            self.postings.setdefault(g, array("i")).append(slot)
+        np.add.at(self.bucket_df, np.unique(self._buckets(keys)), 1.0)
+        self.M[slot] = np.rint(self.tf_vector(grams) * 255.0)
+        self.S[slot] = sig
+        self.size += 1
+        if self._stale > 4 * self.live + 1024:
+            self._compact()
+
+    def _compact(self) -> None:
+        self.postings = {}
+        for slot, keys in enumerate(self.slot_grams):
+            for g in keys:
+                self.postings.setdefault(g, array("i")).append(slot)
+        self._stale = 0
+
+    def _candidates(self, grams: Counter, min_score: float, sig: int) -> np.ndarray:
+        ranked = sorted((g for g in grams if g in self.postings), key=lambda g: self.df.get(g, 0))
+        need = int((1.0 - min_score) * len(grams)) + 1
+        lists, total = [], 0
+        for g in ranked:
+            if len(lists) >= need or (lists and total >= self.probe_budget):
+                break
+            p = np.frombuffer(self.postings[g], dtype=np.int32)
+            lists.append(p)
+            total += len(p)
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        cand, cnt = np.unique(np.concatenate(lists), return_counts=True)
+        keep = self.S[cand] == sig  # 인용·숫자가 다른 행은 점수와 상관없이 제외
+        cand, cnt = cand[keep], cnt[keep]
+        if len(cand) > self.max_candidates:
+            cand = cand[np.argpartition(-cnt, self.max_candidates)[:self.max_candidates]]
+        return cand
+
+    def search(self, grams: Counter, min_score: float, sig: int = 0) -> Tuple[float, Optional[int]]:
+        if not self.live or not grams:
+            return 0.0, None
+        cand = self._candidates(grams, min_score, sig)
+        if not len(cand):
+            return 0.0, None
+        # IDF 가중 코사인: Σ q·d·w / (‖q√w‖ ‖d√w‖),  w = idf²
+        idf = np.log((self.live + 1.0) / (self.bucket_df + 1.0)) + 1.0
+        w = idf * idf
+        q = self.tf_vector(grams)
+        D = self.M[cand].astype(np.float32)
+        num = D @ (q * w)
+        den = np.sqrt((D * D) @ w) * math.sqrt(float((q * q) @ w))
+        scores = num / np.maximum(den, 1e-12)
+        i = int(scores.argmax())
+        return float(scores[i]), int(cand[i])
+
+
+class SimilarQuestionCache:
+    """
+    네트워크 없이 동작하는 유사 질문 캐시.
+    색인은 (Intent, scope) 별로 나눔 — Intent 는 legal_modes.classify_intent, scope 는 호출부가 주는 답변 조건
+    (AdviceEngine 은 mode·시스템 프롬프트 해시·툴 허용 여부)이라 다른 모드/프롬프트의 답을 재생하지 않음.
+
+    lookup(q, scope=...) -> (등급, 점수, payload)
+      - 등급 "answer": 점수 ≥ answer_threshold → 캐시된 답변 재생
+      - 등급 "tools" : 점수 ≥ tools_threshold  → 캐시된 툴 결과 재사용(1차 호출·툴 실행 생략)
+      - 그 외 None
+    어느 등급이든 question_signature(언급 법령, 법령·조문 인용, 숫자)가 정확히 같은 질문만 적중합니다.
+    메모리는 색인당 capacity 행 × (dim + 8) 바이트로 고정 상한(scope 는 모드·프롬프트 수만큼만 생김).
+    """
+
+    def __init__(
+        self,
+        answer_threshold: float = 0.93,
+        tools_threshold: float = 0.8,
+        capacity: int = 100_000,
+        dim: int = 256,
+    ):
+        self.answer_threshold = answer_threshold
+        self.tools_threshold = min(tools_threshold, answer_threshold)
+        self.capacity = capacity
+        self.dim = dim
+        self.stats = SimilarStats()
+        self._indexes: Dict[Tuple[Intent, str], _SimIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, key: Tuple[Intent, str]) -> _SimIndex:
+        idx = self._indexes.get(key)
+        if idx is None:
+            idx = self._indexes[key] = _SimIndex(self.capacity, self.dim)
+        return idx
+
+    def lookup(
+        self, question: str, intent: Optional[Intent] = None, scope: str = ""
+    ) -> Tuple[Optional[str], float, Any]:
+        intent = intent or classify_intent(question)[0]
+        grams = _grams(question)
+        sig = question_signature(question)
+        with self._lock:
+            idx = self._indexes.get((intent, scope))
+            score, slot = idx.search(grams, self.tools_threshold, sig) if idx else (0.0, None)
+            if slot is not None and score >= self.answer_threshold:
+                self.stats.answer_hits += 1
+                return "answer", score, idx.payloads[slot]  # type: ignore[union-attr]
+            if slot is not None and score >= self.tools_threshold:
+                self.stats.tool_hits += 1
+                return "tools", score, idx.payloads[slot]  # type: ignore[union-attr]
+            self.stats.misses += 1
+            return None, score, None
+
+    def insert(self, question: str, payload: Any, intent: Optional[Intent] = None, scope: str = "") -> None:
+        intent = intent or classify_intent(question)[0]
+        grams = _grams(question)
+        if not grams:
+            return
+        sig = question_signature(question)
+        with self._lock:
+            self._index((intent, scope)).add(grams, payload, sig)
+            self.stats.inserts += 1
+
+    def __len__(self) -> int:
+        return sum(i.live for i in self._indexes.values())
@@ -0,0 +1,508 @@
+# modules/statute_index.py  (오프라인 조문 색인: 법령 덤프 → 세그먼트별 mmap 파일, search_one/search_multi 로컬 응답 + 원격 폴백)
+#   python -m modules.statute_index build <덤프_폴더> <색인_폴더>    # 바뀐 덤프 파일만 다시 빌드
+#   python -m modules.statute_index query <색인_폴더> "민법 제750조"
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .doc_index import tokenize
+from .law_catalog import get_catalog, squash
+
+MANIFEST = "manifest.json"
+DUMP_SUFFIXES = (".jsonl", ".json")
+_SEP = "\x1f"   # 레코드 안 제목/본문 구분
+
+# 조문 행: 본문 위치(articles.bin) + 법령 번호 + 조/가지 번호. 법령→조→가지 순으로 정렬해 저장
+ROW_DTYPE = np.dtype([("off", "<i8"), ("len", "<i4"), ("law", "<i4"), ("no", "<i4"), ("sub", "<i4")])
+
+_ART_RE = re.compile(r"제?\s*(\d+)\s*조(?:\s*의\s*(\d+))?")
+
+
+def parse_article(label: Any) -> Optional[Tuple[int, int]]:
+    """'제839조의2' / '839조의 2' / '750' → (839, 2) / (750, 0)."""
+    s = str(label or "").strip()
+    if s.isdigit():
+        return int(s), 0
+    m = _ART_RE.search(s)
+    if not m:
+        return None
+    return int(m.group(1)), int(m.group(2) or 0)
+
+
+def article_label(no: int, sub: int) -> str:
+    return f"제{no}조의{sub}" if sub else f"제{no}조"
+
+
+def term_hash(term: str) -> int:
+    """용어 → uint64(어휘 사전을 프로세스마다 올리지 않고 mmap 정렬 배열에서 이진 탐색)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# ================= 덤프 읽기 =================
+def _field(rec: Dict[str, Any], *names: str) -> Any:
+    for n in names:
+        v = rec.get(n)
+        if v not in (None, ""):
+            return v
+    return None
+
+
+def text_of(v: Any) -> str:
+    """조문내용/항 값(문자열, {"항내용": ...} 등 dict, 그 목록) → 본문 문자열."""
+    if isinstance(v, list):
+        return "\n".join(text_of(x) for x in v)
+    if isinstance(v, dict):
+        return text_of(_field(v, "text", "항내용", "호내용", "content"))
+    return str(v or "")
+
+
+def iter_dump_records(path: Path) -> Iterator[Tuple[str, int, int, str, str]]:
+    """
+    덤프 파일 1개 → (법령명, 조, 가지, 제목, 본문).
+    .jsonl 은 줄마다, .json 은 목록(또는 {"items": [...]}) 에서 조문 1건씩. 필드는
+    law/article/title/text 또는 law.go.kr 이름(법령명한글, 조문번호, 조문가지번호, 조문제목, 조문내용, 항)을 받음.
+    """
+    def records() -> Iterator[Dict[str, Any]]:
+        if path.suffix == ".jsonl":
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+        else:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            yield from (data.get("items", []) if isinstance(data, dict) else data)
+
+    for rec in records():
+        law = _field(rec, "law", "법령명한글", "법령명")
+        if not law:
+            continue
+        sub_raw = _field(rec, "조문가지번호")
+        art = parse_article(_field(rec, "article", "조문번호"))
+        if art is None:
+            continue
+        no, sub = art
+        if sub_raw not in (None, "") and str(sub_raw).isdigit():
+            sub = int(sub_raw)
+        body = text_of(_field(rec, "text", "조문내용"))
+        paras = _field(rec, "항")
+        if paras:
+            body = (body + "\n" + text_of(paras)).strip()
+        yield str(law).strip(), no, sub, str(_field(rec, "title", "조문제목") or ""), body
+
+
+# ================= 빌드 =================
+def _file_sha(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def build_segment(src: Path, seg_dir: Path) -> int:
+    """덤프 파일 1개 → 세그먼트 폴더(articles.bin, rows.npy, keys.npy, offsets.npy, postings.npy, laws.json)."""
+    recs = sorted(iter_dump_records(src), key=lambda r: (r[0], r[1], r[2]))
+    tmp = seg_dir.with_name(seg_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    laws: List[str] = []
+    ranges: List[List[int]] = []
+    rows = np.zeros(len(recs), dtype=ROW_DTYPE)
+    hashes: Dict[str, int] = {}
+    p_keys: List[int] = []
+    p_rows: List[int] = []
+    off = 0
+    with (tmp / "articles.bin").open("wb") as blob:
+        for i, (law, no, sub, title, body) in enumerate(recs):
+            if not laws or laws[-1] != law:
+                if ranges:
+                    ranges[-1][1] = i
+                laws.append(law)
+                ranges.append([i, len(recs)])
+            data = (title + _SEP + body).encode("utf-8")
+            blob.write(data)
+            rows[i] = (off, len(data), len(laws) - 1, no, sub)
+            off += len(data)
+            for t in set(tokenize(f"{law} {title} {body}")):
+                h = hashes.get(t)
+                if h is None:
+                    h = hashes[t] = term_hash(t)
+                p_keys.append(h)
+                p_rows.append(i)
+
+    keys = np.array(p_keys, dtype=np.uint64)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    postings = np.array(p_rows, dtype=np.int32)[order]
+    uniq, starts = np.unique(keys, return_index=True)
+    offsets = np.append(starts, len(keys)).astype(np.int64)
+
+    np.save(tmp / "rows.npy", rows)
+    np.save(tmp / "keys.npy", uniq)
+    np.save(tmp / "offsets.npy", offsets)
+    np.save(tmp / "postings.npy", postings)
+    (tmp / "laws.json").write_text(json.dumps({"laws": laws, "ranges": ranges}, ensure_ascii=False), encoding="utf-8")
+    shutil.rmtree(seg_dir, ignore_errors=True)
+    os.replace(tmp, seg_dir)
+    return len(recs)
+
+
+def build_index(dump_dir: str | Path, index_dir: str | Path, log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """
+    증분 빌드: 덤프 파일마다 세그먼트 하나. 크기·mtime 이 같으면 건너뛰고, 다르면 내용 해시를 비교해
+    실제로 바뀐 파일만 다시 빌드. 사라진 파일의 세그먼트는 삭제. manifest 는 마지막에 원자적으로 교체하므로
+    빌드 중에도 읽는 쪽은 이전 색인을 그대로 씀.
+    """
+    dump_dir, index_dir = Path(dump_dir), Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    mpath = index_dir / MANIFEST
+    old = json.loads(mpath.read_text(encoding="utf-8")).get("files", {}) if mpath.exists() else {}
+
+    files: Dict[str, Any] = {}
+    built = kept = 0
+    for src in sorted(p for p in dump_dir.rglob("*") if p.suffix in DUMP_SUFFIXES and p.is_file()):
+        rel = src.relative_to(dump_dir).as_posix()
+        st = src.stat()
+        prev = old.get(rel)
+        if prev and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns \
+                and (index_dir / prev["segment"]).is_dir():
+            files[rel] = prev
+            kept += 1
+            continue
+        sha = _file_sha(src)
+        seg = "seg-" + sha[:16]
+        if prev and prev.get("sha256") == sha and (index_dir / prev["segment"]).is_dir():
+            files[rel] = {**prev, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            kept += 1
+            continue
+        n = build_segment(src, index_dir / seg)
+        files[rel] = {"segment": seg, "sha256": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "articles": n}
+        built += 1
+        log(f"built {rel}: {n} articles → {seg}")
+
+    tmp = mpath.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"built_at": time.time(), "files": files}, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, mpath)
+
+    live = {f["segment"] for f in files.values()}
+    removed = 0
+    for d in index_dir.glob("seg-*"):
+        if d.is_dir() and d.name not in live:
+            shutil.rmtree(d, ignore_errors=True)
+            removed += 1
+    return {"built": built, "kept": kept, "removed": removed, "articles": sum(f["articles"] for f in files.values())}
+
+
+# ================= 조회 =================
+class _Segment:
+    """세그먼트 1개. 배열·본문은 mmap 이라 여러 워커 프로세스가 페이지 캐시를 공유."""
+
+    def __init__(self, path: Path):
+        meta = json.loads((path / "laws.json").read_text(encoding="utf-8"))
+        self.laws: List[str] = meta["laws"]
+        self.ranges: List[List[int]] = meta["ranges"]
+        self.by_law: Dict[str, int] = {squash(n): i for i, n in enumerate(self.laws)}
+        self.rows = np.load(path / "rows.npy", mmap_mode="r")
+        self.keys = np.load(path / "keys.npy", mmap_mode="r")
+        self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        self.postings = np.load(path / "postings.npy", mmap_mode="r")
+        self._f = (path / "articles.bin").open("rb")
+        self.blob = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path / "articles.bin") else b""
+
+    def close(self) -> None:
+        if isinstance(self.blob, mmap.mmap):
+            self.blob.close()
+        self._f.close()
+
+    def item(self, i: int) -> Dict[str, Any]:
+        r = self.rows[i]
+        title, _, body = bytes(self.blob[int(r["off"]):int(r["off"]) + int(r["len"])]).decode("utf-8").partition(_SEP)
+        law = self.laws[int(r["law"])]
+        no, sub = int(r["no"]), int(r["sub"])
+        return {
+            "법령명한글": law, "조문번호": str(no), "조문가지번호": str(sub) if sub else "",
+            "조문제목": title, "조문내용": body, "법령상세링크": f"/법령/{law}/{article_label(no, sub)}",
+        }
+
+    def article(self, law_idx: int, no: int, sub: int) -> Optional[int]:
+        s, e = self.ranges[law_idx]
+        key = no * 1000 + sub
+        lo, hi = s, e
+        while lo < hi:  # 법령 구간 안은 (조, 가지) 순
+            mid = (lo + hi) // 2
+            r = self.rows[mid]
+            if int(r["no"]) * 1000 + int(r["sub"]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < e and int(self.rows[lo]["no"]) == no and int(self.rows[lo]["sub"]) == sub:
+            return lo
+        return None
+
+    def scores(self, terms: List[str], law_idx: Optional[int]) -> Tuple[np.ndarray, int]:
+        """(후보 행들의 점수, 구간 시작). 용어 idf 합(겹치는 2-gram 이 많고 드물수록 높음)."""
+        s, e = self.ranges[law_idx] if law_idx is not None else (0, len(self.rows))
+        sc = np.zeros(e - s, dtype=np.float32)
+        n = max(1, len(self.rows))
+        for t in terms:
+            h = np.uint64(term_hash(t))
+            j = int(np.searchsorted(self.keys, h))
+            if j >= len(self.keys) or self.keys[j] != h:
+                continue
+            post = self.postings[int(self.offsets[j]):int(self.offsets[j + 1])]
+            if law_idx is not None:
+                post = post[(post >= s) & (post < e)]
+            if len(post):
+                sc[post - s] += math.log(1.0 + n / len(post))
+        return sc, s
+
+
+@dataclass
+class ParsedQuery:
+    law: Optional[str]            # find_law 가 찾은 법령명(정식)
+    article: Optional[Tuple[int, int]]
+    terms: List[str]              # 키워드 2-gram
+    keywords: str = ""            # 법령명·조문 번호를 뺀 나머지 검색어
+
+
+def parse_query(query: str, find_law: Callable[[str], Optional[str]]) -> ParsedQuery:
+    """
+    '민법 제750조 손해배상' → 법령명·(조, 가지)·키워드. 로컬 색인(StatuteIndex)과 원격(law_api.LawAPI)이 같은 규칙을 씀.
+    find_law(이름) 은 정식 법령명 또는 None — 가장 긴 연속 단어 묶음부터 시도('민사 소송법', '근기법').
+    """
+    q = (query or "").strip()
+    m = _ART_RE.search(q)
+    article = (int(m.group(1)), int(m.group(2) or 0)) if m else None
+    rest = (q[:m.start()] + " " + q[m.end():]) if m else q
+    words = rest.replace("「", " ").replace("」", " ").split()
+    law: Optional[str] = None
+    used: Tuple[int, int] = (0, 0)
+    for size in range(min(4, len(words)), 0, -1):
+        for i in range(len(words) - size + 1):
+            found = find_law(" ".join(words[i:i + size]))
+            if found:
+                law, used = found, (i, i + size)
+                break
+        if law:
+            break
+    keywords = " ".join(words[:used[0]] + words[used[1]:] if law else words)
+    return ParsedQuery(law, article, list(dict.fromkeys(tokenize(keywords))), keywords)
+
+
+class StatuteIndex:
+    """
+    build_index() 결과 폴더를 읽는 조회기.
+
+    - search(query, num_rows): '민법 제750조' → 해당 조문, '근로기준법 해고 예고' → 그 법 안 키워드 상위,
+      '전세 보증금 반환' → 전체 키워드 상위. 법령명은 law_catalog 약칭/공백 무시 정규화를 거쳐 찾음
+    - 결과는 원격 API 와 같은 모양 {"query", "items": [법령명한글, 조문번호, ...], "source": "local"}
+    - manifest 가 바뀌면(재빌드) 다음 조회 때 세그먼트를 다시 엶(reload_interval 초마다 확인)
+    """
+
+    def __init__(self, root: str | Path, reload_interval: float = 30.0):
+        self.root = Path(root)
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        self._mtime = -1.0
+        self._checked = 0.0
+        self._reload()
+
+    def _reload(self) -> None:
+        mpath = self.root / MANIFEST
+        mtime = mpath.stat().st_mtime if mpath.exists() else 0.0
+        if mtime == self._mtime:
+            return
+        files = json.loads(mpath.read_text(encoding="utf-8")).get("files", {}) if mtime else {}
+        segs = [_Segment(self.root / f["segment"]) for _, f in sorted(files.items())]
+        old, self._segments, self._mtime = self._segments, segs, mtime
+        for s in old:
+            s.close()
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked >= self.reload_interval:
+            self._checked = now
+            try:
+                self._reload()
+            except (OSError, ValueError):
+                pass  # 재빌드 중 잠깐 어긋나면 이전 세그먼트 유지
+
+    def __len__(self) -> int:
+        return sum(len(s.rows) for s in self._segments)
+
+    def _find_law(self, name: str) -> Optional[str]:
+        key = squash(name)
+        for s in self._segments:
+            if key in s.by_law:
+                return s.laws[s.by_law[key]]
+        canon = get_catalog().lookup(name)
+        if canon:
+            for s in self._segments:
+                if squash(canon) in s.by_law:
+                    return canon
+        return None
+
+    def parse(self, query: str) -> ParsedQuery:
+        return parse_query(query, self._find_law)
+
+    def search(self, query: str, num_rows: int = 5) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_reload()
+            pq = self.parse(query)
+            items: List[Dict[str, Any]] = []
+            if pq.law and pq.article:
+                for s in self._segments:
+                    li = s.by_law.get(squash(pq.law))
+                    if li is not None:
+                        i = s.article(li, *pq.article)
+                        if i is not None:
+                            items.append(s.item(i))
+                # 특정 조문을 물었는데 색인에 없으면 빈 결과(원격 폴백) — 같은 법의 다른 조문으로 대신하지 않음
+                return {"query": query, "items": items[:num_rows], "source": "local"}
+            if pq.terms or pq.law:
+                items = self._keyword(pq, num_rows)
+            return {"query": query, "items": items[:num_rows], "source": "local"}
+
+    def _keyword(self, pq: ParsedQuery, num_rows: int) -> List[Dict[str, Any]]:
+        scored: List[Tuple[float, int, int]] = []   # (점수, 세그먼트, 행)
+        for si, s in enumerate(self._segments):
+            li = s.by_law.get(squash(pq.law)) if pq.law else None
+            if pq.law and li is None:
+                continue
+            if not pq.terms:
+                # 법령명만: 앞쪽 조문부터(목적·정의 조항)
+                a, b = s.ranges[li]  # type: ignore[index]
+                scored.extend((0.0, si, i) for i in range(a, min(b, a + num_rows)))
+                continue
+            sc, base = s.scores(pq.terms, li)
+            k = min(num_rows, len(sc))
+            if not k:
+                continue
+            top = np.argpartition(-sc, k - 1)[:k] if k < len(sc) else np.arange(len(sc))
+            scored.extend((float(sc[j]), si, base + int(j)) for j in top if sc[j] > 0)
+        scored.sort(key=lambda x: (-x[0], x[1], x[2]))
+        return [self._segments[si].item(i) for _, si, i in scored[:num_rows]]
+
+
+# ================= search_one / search_multi 대체 =================
+class LocalFirstSearch:
+    """
+    AdviceEngine(tool_search_one=..., tool_search_multi=...) 에 넘길 로컬 우선 검색.
+    로컬 색인에서 찾으면 바로 반환, 못 찾은 질의만 원격 API(remote_one / remote_multi)로 보냄.
+    색인이 없으면(None) 원격만 사용.
+    """
+
+    def __init__(
+        self,
+        index: Optional[StatuteIndex],
+        remote_one: Optional[Callable[..., Any]] = None,
+        remote_multi: Optional[Callable[..., Any]] = None,
+    ):
+        self.index = index
+        self.remote_one = remote_one
+        self.remote_multi = remote_multi
+        self.local_hits = 0
+        self.remote_calls = 0
+
+    def _local(self, query: str, kw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.index is None or not query:
+            return None
+        try:
+            res = self.index.search(query, num_rows=int(kw.get("num_rows") or 5))
+        except Exception:
+            return None
+        return res if res["items"] else None
+
+    def search_one(self, query: str = "", **kw: Any) -> Any:
+        hit = self._local(query, kw)
+        if hit is not None:
+            self.local_hits += 1
+            return hit
+        if self.remote_one is None:
+            return {"query": query, "items": [], "source": "local"}
+        self.remote_calls += 1
+        return self.remote_one(query=query, **kw)
+
+    def search_multi(self, queries: Optional[List[str]] = None, **kw: Any) -> Any:
+        queries = list(queries or [])
+        out: List[Any] = [self._local(q, kw) for q in queries]
+        missing = [q for q, r in zip(queries, out) if r is None]
+        self.local_hits += len(queries) - len(missing)
+        if missing:
+            if self.remote_multi is not None:
+                self.remote_calls += 1
+                remote = self.remote_multi(queries=missing, **kw)
+                remote = remote if isinstance(remote, list) else [remote]
+            elif self.remote_one is not None:
+                self.remote_calls += len(missing)
+                remote = [self.remote_one(query=q, **kw) for q in missing]
+            else:
+                remote = [{"query": q, "items": [], "source": "local"} for q in missing]
+            it = iter(remote)
+            out = [r if r is not None else next(it, {"query": q, "items": []}) for q, r in zip(queries, out)]
+        return out
+
+
+_index: Optional[StatuteIndex] = None
+_index_lock = threading.Lock()
+
+
+def default_statute_index() -> Optional[StatuteIndex]:
+    """STATUTE_INDEX_PATH 의 색인(프로세스 공용). 설정이 없거나 아직 빌드 전이면 None."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            path = os.environ.get("STATUTE_INDEX_PATH")
+            if not path or not (Path(path) / MANIFEST).exists():
+                return None
+            _index = StatuteIndex(path)
+        return _index
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m modules.statute_index")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="덤프 폴더 → 색인 폴더(증분)")
+    b.add_argument("dump_dir")
+    b.add_argument("index_dir")
+    q = sub.add_parser("query", help="색인 조회")
+    q.add_argument("index_dir")
+    q.add_argument("query")
+    q.add_argument("-n", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        stats = build_index(args.dump_dir, args.index_dir)
+        print(json.dumps({**stats, "seconds": round(time.perf_counter() - t0, 2)}, ensure_ascii=False))
+        return 0
+    idx = StatuteIndex(args.index_dir)
+    t0 = time.perf_counter()
+    res = idx.search(args.query, num_rows=args.n)
+    ms = (time.perf_counter() - t0) * 1000
+    for it in res["items"]:
+        print(f"{it['법령명한글']} {article_label(int(it['조문번호']), int(it['조문가지번호'] or 0))} "
+              f"{it['조문제목']}: {it['조문내용'][:80]}")
+    print(f"({len(res['items'])} items, {ms:.2f} ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
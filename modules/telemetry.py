@@ -0,0 +1,363 @@
+# modules/telemetry.py  (단계별 지연 추적 + 메트릭 레지스트리 + Prometheus/JSONL 내보내기)
+from __future__ import annotations
+import json
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 초 단위 버킷(Prometheus 관례). 툴/LLM 호출이 수 초까지 걸리므로 30초까지
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+@dataclass
+class Span:
+    name: str
+    start: float            # time.monotonic()
+    end: float
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return max(0.0, self.end - self.start)
+
+
+class Trace:
+    """
+    한 턴(generate/agenerate 1회)의 추적 기록.
+
+    - span(name, **attrs)      : with 블록 구간 기록
+    - add(name, start, end)    : 이미 잰 구간 기록(툴 실행처럼 다른 스레드에서 잰 값)
+    - mark(name)               : 턴 시작부터 지금까지(예: first_delta = TTFT)
+    - usage(obj)               : OpenAI 응답의 usage(prompt/completion 토큰) 누적
+    끝나면 AdviceEngine 이 trace_hooks 에 넘깁니다.
+    """
+
+    enabled = True
+
+    def __init__(self, name: str = "advice", **attrs: Any):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs: Dict[str, Any] = dict(attrs)
+        self.wall_start = time.time()
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.spans: List[Span] = []
+        self.tokens: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+        t0 = time.monotonic()
+        try:
+            yield attrs  # 블록 안에서 attrs 에 값을 더 넣을 수 있음
+        finally:
+            self.add(name, t0, time.monotonic(), **attrs)
+
+    def add(self, name: str, start: float, end: float, **attrs: Any) -> None:
+        with self._lock:
+            self.spans.append(Span(name, start, end, attrs))
+
+    def mark(self, name: str, **attrs: Any) -> None:
+        self.add(name, self.start, time.monotonic(), **attrs)
+
+    def usage(self, usage: Any) -> None:
+        if usage is None:
+            return
+        for kind in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            v = usage.get(kind) if isinstance(usage, dict) else getattr(usage, kind, None)
+            if isinstance(v, int):
+                self.tokens[kind] = self.tokens.get(kind, 0) + v
+
+    def finish(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+        if self.end is None:
+            self.end = time.monotonic()
+
+    def as_dict(self) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.monotonic()
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "ts": self.wall_start,
+            "duration_ms": round((end - self.start) * 1000.0, 3),
+            "attrs": self.attrs,
+            "tokens": self.tokens,
+            "spans": [
+                {
+                    "name": s.name,
+                    "offset_ms": round((s.start - self.start) * 1000.0, 3),
+                    "duration_ms": round(s.duration * 1000.0, 3),
+                    **({"attrs": s.attrs} if s.attrs else {}),
+                }
+                for s in self.spans
+            ],
+        }
+
+
+class NullTrace(Trace):
+    """훅이 없을 때 쓰는 빈 추적기(기록 비용 없음)."""
+
+    enabled = False
+
+    def __init__(self) -> None:
+        self.attrs = {}
+        self.spans = []
+        self.tokens = {}
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+        yield attrs
+
+    def add(self, name: str, start: float, end: float, **attrs: Any) -> None:
+        pass
+
+    def mark(self, name: str, **attrs: Any) -> None:
+        pass
+
+    def usage(self, usage: Any) -> None:
+        pass
+
+    def finish(self, **attrs: Any) -> None:
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+TraceHook = Callable[[Trace], None]
+
+
+# ================= 메트릭 =================
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in items
+    )
+    return "{" + body + "}"
+
+
+def _fmt_num(v: float) -> str:
+    v = float(v)
+    if v == float("inf"):
+        return "+Inf"
+    return str(int(v)) if v.is_integer() else repr(v)
+
+
+class Histogram:
+    """누적 버킷 히스토그램(레이블 조합별)."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[LabelKey, List[float]] = {}   # [버킷별 개수..., +Inf 개수, 합]
+
+    def observe(self, value: float, key: LabelKey) -> None:
+        row = self.series.get(key)
+        if row is None:
+            row = self.series[key] = [0.0] * (len(self.buckets) + 2)
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, row in sorted(self.series.items()):
+            acc = 0.0
+            for i, b in enumerate(self.buckets):
+                acc += row[i]
+                out.append(f"{self.name}_bucket{_fmt_labels(key, ('le', _fmt_num(b)))} {_fmt_num(acc)}")
+            acc += row[len(self.buckets)]
+            out.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {_fmt_num(acc)}")
+            out.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_num(row[-1])}")
+            out.append(f"{self.name}_count{_fmt_labels(key)} {_fmt_num(acc)}")
+        return out
+
+    def quantile(self, q: float, **labels: Any) -> Optional[float]:
+        """버킷 상한 기준 근사 분위수(대시보드 없이 빠르게 확인할 때)."""
+        row = self.series.get(_labels(labels))
+        if not row:
+            return None
+        total = sum(row[:-1])
+        acc = 0.0
+        for i, b in enumerate(self.buckets):
+            acc += row[i]
+            if acc >= q * total:
+                return b
+        return float("inf")
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.series: Dict[LabelKey, float] = {}
+
+    def inc(self, value: float, key: LabelKey) -> None:
+        self.series[key] = self.series.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, v in sorted(self.series.items()):
+            out.append(f"{self.name}{_fmt_labels(key)} {_fmt_num(v)}")
+        return out
+
+
+class Gauge:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.series: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, key: LabelKey) -> None:
+        self.series[key] = float(value)
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, v in sorted(self.series.items()):
+            out.append(f"{self.name}{_fmt_labels(key)} {_fmt_num(v)}")
+        return out
+
+
+class MetricsRegistry:
+    """
+    프로세스 내 메트릭 저장소. as_hook() 을 AdviceEngine(trace_hooks=[...]) 에 넘기면
+    턴마다 아래 메트릭을 갱신합니다.
+      advice_stage_seconds{stage}           단계별 소요(doc_retrieval, primer, first_call, tools, final_call, first_delta, stream, link_merge)
+      advice_tool_seconds{tool,status}      툴 호출 1건별 소요
+      advice_turn_seconds{path}             턴 전체(path = llm / cache / similar_answer / similar_tools)
+      advice_tokens_total{kind}             usage 토큰 합계
+      advice_turns_total{path,outcome}      턴 수
+    그 밖의 모듈(예: llm_scheduler)은 observe()/inc()/set() 으로 자기 메트릭을 같은 레지스트리에 기록합니다.
+    render_prometheus() 는 Prometheus text format(0.0.4) 문자열을 돌려줍니다.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._hist: Dict[str, Histogram] = {}
+        self._ctr: Dict[str, Counter] = {}
+        self._gauge: Dict[str, Gauge] = {}
+        self._lock = threading.Lock()
+        self.histogram("advice_stage_seconds", "AdviceEngine stage latency")
+        self.histogram("advice_tool_seconds", "Tool call latency by tool name")
+        self.histogram("advice_turn_seconds", "Whole turn latency")
+        self.counter("advice_tokens_total", "LLM token usage reported by the API")
+        self.counter("advice_turns_total", "Completed turns")
+
+    def histogram(self, name: str, help: str, buckets: Optional[Sequence[float]] = None) -> Histogram:
+        with self._lock:
+            h = self._hist.get(name)
+            if h is None:
+                h = self._hist[name] = Histogram(name, help, buckets or self.buckets)
+            return h
+
+    def counter(self, name: str, help: str) -> Counter:
+        with self._lock:
+            c = self._ctr.get(name)
+            if c is None:
+                c = self._ctr[name] = Counter(name, help)
+            return c
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        h = self._hist.get(name) or self.histogram(name, name)
+        with self._lock:
+            h.observe(value, _labels(labels))
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        c = self._ctr.get(name) or self.counter(name, name)
+        with self._lock:
+            c.inc(value, _labels(labels))
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            g = self._gauge.get(name)
+            if g is None:
+                g = self._gauge[name] = Gauge(name, name)
+            g.set(value, _labels(labels))
+
+    def record_trace(self, trace: Trace) -> None:
+        path = str(trace.attrs.get("path", "llm"))
+        for s in trace.spans:
+            if s.name == "tool":
+                self.observe("advice_tool_seconds", s.duration,
+                             tool=s.attrs.get("tool", ""), status=s.attrs.get("status", "ok"))
+            else:
+                self.observe("advice_stage_seconds", s.duration, stage=s.name)
+        if trace.end is not None:
+            self.observe("advice_turn_seconds", trace.end - trace.start, path=path)
+        for kind, v in trace.tokens.items():
+            if kind != "total_tokens":
+                self.inc("advice_tokens_total", v, kind=kind.replace("_tokens", ""))
+        self.inc("advice_turns_total", path=path, outcome=trace.attrs.get("outcome", "ok"))
+
+    def as_hook(self) -> TraceHook:
+        return self.record_trace
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            lines: List[str] = []
+            for h in self._hist.values():
+                if h.series:
+                    lines.extend(h.render())
+            for c in self._ctr.values():
+                if c.series:
+                    lines.extend(c.render())
+            for g in self._gauge.values():
+                if g.series:
+                    lines.extend(g.render())
+        return "\n".join(lines) + "\n"
+
+    def get_histogram(self, name: str) -> Optional[Histogram]:
+        return self._hist.get(name)
+
+
+class JsonlTraceSink:
+    """추적 1건 = JSON 1줄로 파일에 덧붙임(여러 세션/스레드가 같은 파일을 써도 줄 단위 보장)."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def __call__(self, trace: Trace) -> None:
+        line = json.dumps(trace.as_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def emit(trace: Trace, hooks: Sequence[TraceHook]) -> None:
+    """훅 실패가 답변 흐름을 깨지 않도록 예외는 삼킴."""
+    for hook in hooks:
+        try:
+            hook(trace)
+        except Exception:
+            pass
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def default_registry() -> MetricsRegistry:
+    """프로세스 공용 레지스트리(모든 세션의 엔진이 같은 메트릭에 기록)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
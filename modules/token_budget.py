@@ -0,0 +1,256 @@
+# modules/token_budget.py  (최종 호출 전 툴 결과 압축 — 프롬프트 토큰 예산 관리)
+from __future__ import annotations
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+# 모델이 답변에 쓰는 필드만 남김(상세링크·ID·일련번호 등은 링크 생성용이므로 law_for_links 쪽에만 유지)
+DEFAULT_ITEM_FIELDS: Tuple[str, ...] = (
+    "법령명한글", "법령명", "법령약칭명", "법령구분명", "소관부처명", "시행일자",
+    "조문번호", "조문가지번호", "조문제목", "조문내용", "항내용",
+    "title", "name", "law", "article", "snippet", "summary", "content", "text",
+)
+# 결과 dict 최상위에서 유지할 메타 필드(items 외)
+_META_FIELDS = ("query", "law", "error", "total", "truncated")
+# 본문 길이 단계: 예산 초과 시 항목을 떨어뜨린 뒤에도 넘으면 이 순서로 더 줄임
+_TEXT_STEPS = (600, 300, 150)
+
+
+def _tiktoken_counter(model: str) -> Optional[Callable[[str], int]]:
+    try:
+        import tiktoken  # 선택 의존성: 없으면 근사치 사용
+    except Exception:
+        return None
+    try:
+        enc = tiktoken.encoding_for_model(model)
+    except Exception:
+        enc = tiktoken.get_encoding("o200k_base")
+    return lambda s: len(enc.encode(s))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 쓰는 근사치: 한글/CJK 등 비ASCII 1자 ≈ 1토큰, ASCII 4자 ≈ 1토큰.
+    (BPE 계열에서 한글은 대체로 글자당 0.7~1.2 토큰이라 예산 관리에는 약간 보수적인 쪽)
+    """
+    if not text:
+        return 0
+    ascii_n = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_n) + (ascii_n + 3) // 4
+
+
+def _dumps(obj: Any) -> str:
+    try:
+        return json.dumps(obj, ensure_ascii=False)
+    except Exception:
+        return "{}"
+
+
+def _bigrams(s: str) -> set:
+    s = "".join((s or "").split())
+    return {s[i:i + 2] for i in range(len(s) - 1)}
+
+
+@dataclass
+class BudgetReport:
+    """한 턴의 압축 결과."""
+    tokens_before: int = 0
+    tokens_after: int = 0
+    items_before: int = 0
+    items_after: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_before - self.tokens_after)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "tokens_before": self.tokens_before, "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_saved,
+            "items_before": self.items_before, "items_after": self.items_after,
+        }
+
+
+@dataclass
+class BudgetStats:
+    turns: int = 0
+    tokens_saved: int = 0
+    items_dropped: int = 0
+    over_budget: int = 0      # 최소 항목만 남겨도 예산을 넘긴 턴 수
+    recent: Deque[Dict[str, int]] = field(default_factory=lambda: deque(maxlen=64))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns, "tokens_saved": self.tokens_saved,
+            "items_dropped": self.items_dropped, "over_budget": self.over_budget,
+            "last": self.recent[-1] if self.recent else None,
+        }
+
+
+class _Item:
+    __slots__ = ("owner", "rank", "raw", "score", "keep")
+
+    def __init__(self, owner: int, rank: int, raw: Dict[str, Any], score: float):
+        self.owner = owner
+        self.rank = rank
+        self.raw = raw
+        self.score = score
+        self.keep = True
+
+
+class TokenBudget:
+    """
+    최종 호출 프롬프트의 툴 결과를 예산 안으로 압축.
+
+    fit(질문, 결과목록, base_tokens) -> (모델용 결과목록, BudgetReport)
+      1) 항목(items)마다 item_fields 에 있는 필드만 남기고 긴 문자열은 자름
+      2) (시스템+프라이머+질문 = base_tokens) + 툴 결과가 max_prompt_tokens 를 넘으면
+         질문과 겹치는 글자 바이그램이 적은 항목(동점이면 뒤쪽 순위)부터 뺌. 결과마다 min_items 개는 유지
+      3) 그래도 넘으면 본문 길이 상한을 단계적으로 더 줄임
+    뺀 항목 수는 결과 dict 에 "truncated" 로 남겨 모델이 생략 사실을 알 수 있게 함.
+    원본 결과는 건드리지 않으므로 law_for_links 는 전체 항목을 그대로 씀.
+    """
+
+    def __init__(
+        self,
+        max_prompt_tokens: int = 6000,
+        min_tool_tokens: int = 800,
+        item_fields: Sequence[str] = DEFAULT_ITEM_FIELDS,
+        min_items: int = 1,
+        model: Optional[str] = None,
+    ):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.min_tool_tokens = min_tool_tokens
+        self.item_fields = tuple(item_fields)
+        self.min_items = min_items
+        self.stats = BudgetStats()
+        self._lock = threading.Lock()   # 엔진(=이 객체)은 세션끼리 공유: stats 갱신만 잠금
+        counter = _tiktoken_counter(model) if model else None
+        self.count: Callable[[str], int] = counter or estimate_tokens
+
+    # ---- 압축 ----
+    def _compact_item(self, item: Any, text_chars: int) -> Any:
+        if not isinstance(item, dict):
+            return item
+        out: Dict[str, Any] = {}
+        for k in self.item_fields:
+            v = item.get(k)
+            if v in (None, "", [], {}):
+                continue
+            if isinstance(v, str) and len(v) > text_chars:
+                v = v[:text_chars].rstrip() + "…"
+            elif isinstance(v, (list, dict)):
+                v = _dumps(v)
+                if len(v) > text_chars:
+                    v = v[:text_chars] + "…"
+            out[k] = v
+        # 아는 필드가 하나도 없으면 문자열 필드만 잘라서 유지(스키마가 다른 툴 대비)
+        if not out:
+            out = {
+                k: (v[:text_chars] + "…" if len(v) > text_chars else v)
+                for k, v in item.items() if isinstance(v, str) and v
+            }
+        return out
+
+    @staticmethod
+    def _groups(res: Any) -> List[Dict[str, Any]]:
+        """items 를 가진 dict 들 — search_one 은 dict 하나, search_multi 는 dict 목록."""
+        if isinstance(res, dict) and isinstance(res.get("items"), list):
+            return [res]
+        if isinstance(res, list):
+            return [r for r in res if isinstance(r, dict) and isinstance(r.get("items"), list)]
+        return []
+
+    def _render_group(self, grp: Dict[str, Any], owned: List[_Item], text_chars: int) -> Dict[str, Any]:
+        kept = [self._compact_item(it.raw, text_chars) for it in owned if it.keep]
+        dropped = len(owned) - len(kept)
+        out: Dict[str, Any] = {k: grp[k] for k in _META_FIELDS if k in grp}
+        out["items"] = kept
+        if dropped:
+            out["truncated"] = int(grp.get("truncated") or 0) + dropped
+        return out
+
+    def _render(self, results: List[Any], items: Dict[int, List[_Item]], text_chars: int) -> List[Any]:
+        rendered: List[Any] = []
+        for res in results:
+            if isinstance(res, dict) and id(res) in items:
+                rendered.append(self._render_group(res, items[id(res)], text_chars))
+            elif isinstance(res, list) and any(isinstance(r, dict) and id(r) in items for r in res):
+                rendered.append([
+                    self._render_group(r, items[id(r)], text_chars) if isinstance(r, dict) and id(r) in items else r
+                    for r in res
+                ])
+            else:
+                rendered.append(res)
+        return rendered
+
+    def _tokens(self, rendered: List[Any]) -> int:
+        return sum(self.count(_dumps(r)) for r in rendered)
+
+    # ---- 예산 맞추기 ----
+    def fit(self, query: str, results: Sequence[Any], base_tokens: int = 0) -> Tuple[List[Any], BudgetReport]:
+        results = list(results)
+        qgrams = _bigrams(query)
+        items: Dict[int, List[_Item]] = {}
+        for res in results:
+            for grp in self._groups(res):
+                owned = []
+                for rank, it in enumerate(grp["items"]):
+                    text = " ".join(str(v) for v in it.values() if isinstance(v, str)) if isinstance(it, dict) else str(it)
+                    score = len(qgrams & _bigrams(text)) / (len(qgrams) or 1)
+                    owned.append(_Item(id(grp), rank, it, score))
+                items[id(grp)] = owned
+
+        report = BudgetReport(
+            tokens_before=self._tokens(results),
+            items_before=sum(len(o) for o in items.values()),
+        )
+        budget = max(self.min_tool_tokens, self.max_prompt_tokens - base_tokens)
+
+        text_chars = _TEXT_STEPS[0]
+        rendered = self._render(results, items, text_chars)
+        used = self._tokens(rendered)
+        if used > budget:
+            # 관련도 낮은 항목부터(동점이면 뒤 순위부터) 하나씩 제외
+            order = sorted((it for o in items.values() for it in o), key=lambda it: (it.score, -it.rank))
+            kept_per = {k: len(o) for k, o in items.items()}
+            for it in order:
+                if used <= budget:
+                    break
+                if kept_per[it.owner] <= self.min_items:
+                    continue
+                it.keep = False
+                kept_per[it.owner] -= 1
+                used -= self.count(_dumps(self._compact_item(it.raw, text_chars)))
+            rendered = self._render(results, items, text_chars)
+            used = self._tokens(rendered)
+            for text_chars in _TEXT_STEPS[1:]:
+                if used <= budget:
+                    break
+                rendered = self._render(results, items, text_chars)
+                used = self._tokens(rendered)
+
+        report.tokens_after = used
+        report.items_after = sum(1 for o in items.values() for it in o if it.keep)
+        with self._lock:
+            self.stats.turns += 1
+            self.stats.tokens_saved += report.tokens_saved
+            self.stats.items_dropped += report.items_before - report.items_after
+            if used > budget:
+                self.stats.over_budget += 1
+            self.stats.recent.append(report.as_dict())
+        return rendered, report
+
+    def stats_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return self.stats.as_dict()
+
+    def message_tokens(self, msgs: Sequence[Dict[str, Any]]) -> int:
+        """메시지 목록의 대략적 토큰 수(메시지당 오버헤드 4 포함)."""
+        total = 0
+        for m in msgs:
+            c = m.get("content")
+            total += 4 + (self.count(c) if isinstance(c, str) else 0)
+        return total
@@ -0,0 +1,217 @@
+# modules/tool_cache.py  (search_one/search_multi 결과 공용 캐시 + 동일 요청 합치기)
+from __future__ import annotations
+import asyncio
+import copy
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def _canon(v: Any) -> Any:
+    """인자 정규화: 문자열 공백 정리, dict 키 정렬, None 값 제거."""
+    if isinstance(v, str):
+        return " ".join(v.split())
+    if isinstance(v, dict):
+        return {str(k): _canon(x) for k, x in sorted(v.items()) if x is not None}
+    if isinstance(v, (list, tuple)):
+        return [_canon(x) for x in v]
+    return v
+
+
+def canonical_key(name: str, kwargs: Dict[str, Any]) -> str:
+    return name + ":" + json.dumps(_canon(kwargs), ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _cacheable(result: Any) -> bool:
+    # 실패 페이로드는 저장하지 않음(다음 호출이 다시 시도하도록)
+    return not (isinstance(result, dict) and result.get("error"))
+
+
+@dataclass
+class ToolCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0   # 진행 중인 동일 요청에 합류한 호출 수(업스트림 요청 없음)
+    errors: int = 0
+    timeouts: int = 0    # 합류한 호출이 timeout 안에 선행 요청 결과를 못 받은 수
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class ToolResultCache:
+    """
+    툴 결과 프로세스 공용 캐시.
+
+    - 키: 툴 이름 + 정규화된 인자(JSON)
+    - TTL + 개수 상한(LRU) 제거
+    - single-flight: 같은 키의 요청이 진행 중이면 새로 보내지 않고 그 결과를 함께 기다림
+      (스레드 호출은 concurrent Future, async 호출은 이벤트 루프별 Task로 합침)
+    - error 결과/예외는 캐시하지 않으며, 합류한 호출에도 같은 예외가 전달됨
+    - 결과는 세션마다 깊은 복사본으로 돌려줌(한 세션이 고쳐도 캐시·다른 세션 결과는 그대로)
+    - timeout(초)을 주면 합류한 호출은 그 안에서만 선행 요청을 기다리고 TimeoutError(선행 요청은 계속 진행)
+
+    wrap(name, fn, timeout) 으로 감싼 함수를 AdviceEngine 의 tool_search_one / tool_search_multi 로 넘기면 됩니다
+    (AdviceEngine 은 tool_timeout 을 timeout 으로 넘김).
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = ToolCacheStats()
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[Tuple[int, str], "asyncio.Future[Any]"] = {}
+        self._lock = threading.Lock()
+
+    # ---- 저장소 (self._lock 안에서 호출) ----
+    def _get(self, key: str) -> Tuple[bool, Any]:
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def _put(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """name 을 주면 그 툴의 항목만, 아니면 전부 삭제."""
+        with self._lock:
+            if name is None:
+                self._data.clear()
+            else:
+                for k in [k for k in self._data if k.startswith(name + ":")]:
+                    del self._data[k]
+
+    def _follow_timeout(self) -> None:
+        with self._lock:
+            self.stats.timeouts += 1
+
+    # ---- 동기 호출 ----
+    def call(self, name: str, fn: Callable[..., Any], kwargs: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        key = canonical_key(name, kwargs)
+        with self._lock:
+            found, value = self._get(key)
+            if found:
+                self.stats.hits += 1
+                return copy.deepcopy(value)
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+                self.stats.misses += 1
+            else:
+                self.stats.coalesced += 1
+
+        if not leader:
+            try:
+                return copy.deepcopy(fut.result(timeout=timeout))
+            except FutureTimeout:
+                self._follow_timeout()
+                raise
+
+        try:
+            result = fn(**kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.stats.errors += 1
+            fut.set_exception(e)
+            raise
+        shared = copy.deepcopy(result)  # 캐시·합류 호출용(선행 호출자는 원본을 가짐)
+        with self._lock:
+            self._inflight.pop(key, None)
+            if _cacheable(result):
+                self._put(key, shared)
+        fut.set_result(shared)
+        return result
+
+    # ---- async 호출 ----
+    async def acall(
+        self, name: str, fn: Callable[..., Any], kwargs: Dict[str, Any], timeout: Optional[float] = None
+    ) -> Any:
+        key = canonical_key(name, kwargs)
+        loop = asyncio.get_running_loop()
+        akey = (id(loop), key)
+        with self._lock:
+            found, value = self._get(key)
+            if found:
+                self.stats.hits += 1
+                return copy.deepcopy(value)
+            task = self._ainflight.get(akey)
+            leader = task is None
+            if leader:
+                task = loop.create_task(self._alead(akey, fn, kwargs))
+                self._ainflight[akey] = task
+                self.stats.misses += 1
+            else:
+                self.stats.coalesced += 1
+        # 기다리던 한 세션이 취소돼도 공유 작업은 계속 돌도록 shield
+        if leader:
+            return copy.deepcopy(await asyncio.shield(task))
+        try:
+            return copy.deepcopy(await asyncio.wait_for(asyncio.shield(task), timeout))
+        except asyncio.TimeoutError:
+            self._follow_timeout()
+            raise
+
+    async def _alead(self, akey: Tuple[int, str], fn: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        try:
+            if inspect.iscoroutinefunction(fn):
+                result = await fn(**kwargs)
+            else:
+                result = await asyncio.to_thread(fn, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+        except BaseException:
+            with self._lock:
+                self.stats.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._ainflight.pop(akey, None)
+        with self._lock:
+            if _cacheable(result):
+                self._put(akey[1], result)
+        return result
+
+    def wrap(self, name: str, fn: Callable[..., Any], timeout: Optional[float] = None) -> Callable[..., Any]:
+        """fn(**kwargs) 를 캐시를 거치도록 감쌈. async 함수는 async 로, 동기 함수는 동기로 유지."""
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def _awrapped(**kwargs: Any) -> Any:
+                return await self.acall(name, fn, kwargs, timeout)
+            return _awrapped
+
+        @functools.wraps(fn)
+        def _wrapped(**kwargs: Any) -> Any:
+            return self.call(name, fn, kwargs, timeout)
+        return _wrapped
+
+
+_shared: Optional[ToolResultCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_tool_cache() -> ToolResultCache:
+    """프로세스 공용 인스턴스(모든 세션의 엔진이 공유)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ToolResultCache()
+        return _shared
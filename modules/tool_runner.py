@@ -0,0 +1,253 @@
+# modules/tool_runner.py  (한 턴의 tool_calls 동시 실행기)
+from __future__ import annotations
+import asyncio
+import inspect
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeout
+from threading import Event, Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ToolFn = Callable[..., Any]
+# observe(툴이름, 시작, 끝, 상태) — time.monotonic() 기준, 상태: ok/error/timeout/deadline/failed
+ToolObserver = Callable[[str, float, float, str], None]
+
+
+def parse_tool_args(raw: Optional[str]) -> Dict[str, Any]:
+    """tool_call.function.arguments(JSON 문자열) → dict. 깨진 JSON은 빈 dict."""
+    try:
+        args = json.loads(raw or "{}")
+        return args if isinstance(args, dict) else {}
+    except Exception:
+        return {}
+
+
+def error_payload(name: str, kind: str, detail: str = "") -> Dict[str, Any]:
+    """실패/타임아웃 툴의 대체 결과. 모델이 읽을 수 있도록 error 키로 전달."""
+    msg = f"{kind}: {name}"
+    if detail:
+        msg += f" ({detail})"
+    return {"error": msg, "items": []}
+
+
+class _Queued(Exception):
+    """턴 데드라인까지 워커를 얻지 못함."""
+
+
+class _Began:
+    """워커가 호출 실행을 시작한 시각(monotonic)을 제출한 쪽에 알림."""
+    __slots__ = ("at", "_event")
+
+    def __init__(self) -> None:
+        self.at = 0.0
+        self._event = Event()
+
+    def set(self) -> float:
+        self.at = time.monotonic()
+        self._event.set()
+        return self.at
+
+    def wait(self, timeout: float) -> bool:
+        return self._event.wait(max(0.0, timeout))
+
+
+class ToolRunner:
+    """
+    모델 1턴의 tool_calls를 제한된 워커 풀에서 동시에 실행.
+
+    - max_workers   : 워커 풀 크기. 엔진 하나를 여러 세션이 공유하면(default_engine) 동시 세션 수에 맞춰 크게
+    - call_timeout  : 호출 1건당 실행 상한(초). 대기열에서 기다린 시간은 빼고, 워커가 실행을 시작한 시점부터 잼
+    - turn_deadline : 턴 전체 대기 상한(초, 제출 시점부터). 대기열에서 못 벗어난 호출도 여기서 끊김
+    - 실패/타임아웃 건은 error_payload로 대체하고 나머지 결과는 그대로 사용
+    - 반환 순서는 입력 tool_calls 순서(= tool_call_id 순서)와 동일
+
+    버려진(abandoned) 호출: 타임아웃된 호출의 스레드는 강제로 멈출 수 없으므로 끝날 때까지 돌고 그 결과는 버려집니다.
+    아직 대기열에 있던 호출은 취소되어 실행되지 않습니다. 실행 중에 버려진 호출이 워커의 절반 이상을 붙잡으면
+    풀을 새로 만들어 이후 호출이 멈춘 워커 뒤에서 굶지 않게 하고, 옛 풀의 스레드는 각자 호출이 끝나면 정리됩니다.
+    진행 중인 버려진 호출 수는 abandoned 로 볼 수 있습니다.
+    observe 를 주면 호출마다 (이름, 시작, 끝, 상태) 를 알려줍니다(추적/메트릭용).
+    """
+
+    def __init__(
+        self,
+        dispatch: Dict[str, ToolFn],
+        max_workers: int = 4,
+        call_timeout: float = 8.0,
+        turn_deadline: float = 15.0,
+    ):
+        self.dispatch = dispatch
+        self.max_workers = max(1, int(max_workers))
+        self.call_timeout = call_timeout
+        self.turn_deadline = turn_deadline
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = Lock()
+        self._stuck = 0       # 현재 풀에서 버려졌지만 아직 실행 중인 호출 수
+        self.abandoned = 0    # 모든 풀 합계(관측용)
+        self.retired_pools = 0
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="advice-tool"
+                )
+            return self._pool
+
+    def _invoke(self, name: str, args: Dict[str, Any]) -> Any:
+        fn = self.dispatch.get(name)
+        if fn is None:
+            return {"error": f"unknown tool: {name}"}
+        return fn(**args)
+
+    def _timed(self, name: str, args: Dict[str, Any], began: "_Began") -> Tuple[Any, float, float]:
+        # 워커 안에서 실제 실행 구간을 잼(대기열에서 기다린 시간 제외) — 시작 시각이 호출별 타임아웃의 기준
+        t0 = began.set()
+        result = self._invoke(name, args)
+        return result, t0, time.monotonic()
+
+    def _abandon(self, pool: ThreadPoolExecutor, fut: Future) -> None:
+        """실행 중 타임아웃된 호출을 기록하고, 멈춘 워커가 풀의 절반을 넘으면 새 풀로 교체."""
+        with self._lock:
+            self.abandoned += 1
+            current = pool is self._pool
+            if current:
+                self._stuck += 1
+                if self._stuck * 2 >= self.max_workers:
+                    # 이미 제출된 다른 턴의 호출은 옛 풀에서 그대로 실행됨(cancel_futures=False)
+                    pool.shutdown(wait=False)
+                    self._pool = None
+                    self._stuck = 0
+                    self.retired_pools += 1
+                    current = False
+        # 이미 끝난 future 면 콜백이 바로 실행되므로 잠금 밖에서 등록
+        fut.add_done_callback(lambda f: self._abandoned_done(pool if current else None))
+
+    def _abandoned_done(self, pool: Optional[ThreadPoolExecutor]) -> None:
+        with self._lock:
+            self.abandoned -= 1
+            if pool is not None and pool is self._pool:
+                self._stuck -= 1
+
+    @staticmethod
+    def _status(result: Any) -> str:
+        return "error" if isinstance(result, dict) and result.get("error") else "ok"
+
+    def run(self, tool_calls: List[Any], observe: Optional[ToolObserver] = None) -> List[Tuple[Any, Any]]:
+        """[(call, result), ...] 를 입력 순서대로 반환."""
+        if not tool_calls:
+            return []
+
+        pool = self._executor()
+        started = time.monotonic()
+        futures: List[Tuple[Any, str, _Began, Future]] = []
+        for call in tool_calls:
+            name = call.function.name
+            args = parse_tool_args(call.function.arguments)
+            began = _Began()
+            futures.append((call, name, began, pool.submit(self._timed, name, args, began)))
+
+        # 모두 동시에 제출되므로 순서대로 기다려도 대기 시간이 누적되지 않음
+        turn_end = started + self.turn_deadline
+        out: List[Tuple[Any, Any]] = []
+        for call, name, began, fut in futures:
+            t0, t1 = started, 0.0
+            try:
+                # 대기열: 턴 데드라인까지 워커를 기다림 → 실행: 시작 시점부터 call_timeout
+                if not began.wait(turn_end - time.monotonic()):
+                    raise _Queued()
+                end = min(turn_end, began.at + self.call_timeout)
+                result, t0, t1 = fut.result(timeout=max(0.0, end - time.monotonic()))
+                status = self._status(result)
+            except _Queued:
+                if fut.cancel():  # 아직 대기열에 있던 건은 실행 자체를 취소
+                    status = "deadline"
+                    result = error_payload(name, status, f"queued {self.turn_deadline:.1f}s")
+                else:  # 취소 직전에 시작됨: 남은 턴 시간이 없으므로 버림
+                    self._abandon(pool, fut)
+                    status = "deadline"
+                    result = error_payload(name, status, f"{self.turn_deadline:.1f}s")
+            except FutureTimeout:
+                t0 = began.at or started
+                status = "deadline" if turn_end <= t0 + self.call_timeout else "timeout"
+                self._abandon(pool, fut)
+                result = error_payload(name, status, f"{min(self.call_timeout, turn_end - t0):.1f}s")
+            except Exception as e:
+                status = "failed"
+                result = error_payload(name, status, f"{type(e).__name__}: {e}")
+            if observe is not None:
+                observe(name, t0, t1 or time.monotonic(), status)
+            out.append((call, result))
+        return out
+
+    async def arun(
+        self,
+        tool_calls: List[Any],
+        dispatch: Optional[Dict[str, ToolFn]] = None,
+        observe: Optional[ToolObserver] = None,
+    ) -> List[Tuple[Any, Any]]:
+        """
+        run()의 asyncio 버전. async 툴은 루프에서 직접, 동기 툴은 스레드로 넘겨 실행.
+        동시 실행 상한/호출별 타임아웃/턴 데드라인/순서 보장 규칙은 run()과 동일.
+        바깥 태스크가 취소되면 진행 중인 툴 태스크도 함께 취소됩니다.
+        """
+        if not tool_calls:
+            return []
+
+        table = dispatch if dispatch is not None else self.dispatch
+        sem = asyncio.Semaphore(self.max_workers)
+        started = time.monotonic()
+        turn_end = started + self.turn_deadline
+
+        async def _exec(fn: ToolFn, args: Dict[str, Any]) -> Any:
+            if inspect.iscoroutinefunction(fn):
+                result = await fn(**args)
+            else:
+                result = await asyncio.to_thread(fn, **args)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+        async def _guarded(call: Any) -> Tuple[Any, Any]:
+            name = call.function.name
+            args = parse_tool_args(call.function.arguments)
+            fn = table.get(name)
+            t0 = time.monotonic()
+            if fn is None:
+                if observe is not None:
+                    observe(name, t0, t0, "error")
+                return call, {"error": f"unknown tool: {name}"}
+            try:
+                # 자리 대기는 턴 데드라인까지, 실행은 자리를 얻은 시점부터 call_timeout
+                await asyncio.wait_for(sem.acquire(), timeout=max(0.0, turn_end - time.monotonic()))
+            except asyncio.TimeoutError:
+                status = "deadline"
+                result = error_payload(name, status, f"queued {self.turn_deadline:.1f}s")
+            else:
+                t0 = time.monotonic()
+                run_end = min(t0 + self.call_timeout, turn_end)
+                try:
+                    result = await asyncio.wait_for(_exec(fn, args), timeout=max(0.0, run_end - t0))
+                    status = self._status(result)
+                except asyncio.TimeoutError:
+                    # 동기 툴의 스레드는 멈출 수 없어 끝날 때까지 돌고 결과는 버려짐
+                    status = "deadline" if turn_end <= t0 + self.call_timeout else "timeout"
+                    result = error_payload(name, status, f"{run_end - t0:.1f}s")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    status = "failed"
+                    result = error_payload(name, status, f"{type(e).__name__}: {e}")
+                finally:
+                    sem.release()
+            if observe is not None:
+                observe(name, t0, time.monotonic(), status)
+            return call, result
+
+        return list(await asyncio.gather(*(_guarded(c) for c in tool_calls)))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                self._stuck = 0
@@ -1,24 +1,129 @@
-
 # stylekit.py — tiny CSS loader & scoped wrappers for Streamlit
+#   bundle(paths)      : one minified bundle per file list, keyed by content hash, rebuilt when a file's mtime/size changes
+#   inject_once(paths) : push the bundle into the page <head> once per browser session (reruns send no CSS)
+#   set_state(...)     : toggle state classes on <body> only when they change (answering ↔ idle)
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from functools import lru_cache
 import streamlit as st
 
-@lru_cache(maxsize=256)
-def _read(p:str)->str:
-    return Path(p).read_text(encoding="utf-8")
+try:
+    import streamlit.components.v1 as _components
+except Exception:
+    _components = None
+# st.iframe (newer) or components.html (older, deprecated) runs a script in a same-origin iframe
+_frame = getattr(st, "iframe", None) or getattr(_components, "html", None)
+_FRAME_HEIGHT = 1 if hasattr(st, "iframe") else 0  # st.iframe rejects height=0
 
-def load(paths:list[str])->None:
-    """Inject CSS files in order. Missing files are ignored."""
-    bundle = []
+# strings survive minification untouched; comments go
+_COMMENT_OR_STRING = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+_STRING = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_WS = re.compile(r"\s+")
+_PUNCT_WS = re.compile(r"\s*([{};,>])\s*")
+_COLON_WS = re.compile(r":\s+")
+
+def minify(css: str) -> str:
+    """Drop comments and redundant whitespace (never inside quoted strings)."""
+    css = _COMMENT_OR_STRING.sub(lambda m: m.group(1) or "", css)
+    parts = _STRING.split(css)
+    for i in range(0, len(parts), 2):  # even = outside strings
+        seg = _WS.sub(" ", parts[i])
+        seg = _PUNCT_WS.sub(r"\1", seg)
+        parts[i] = _COLON_WS.sub(":", seg).replace(";}", "}")
+    return "".join(parts).strip()
+
+@dataclass(frozen=True)
+class Bundle:
+    css: str
+    digest: str   # sha256 of the minified css (first 12 hex)
+
+_bundles: dict = {}
+_bundles_lock = threading.Lock()
+
+def _signature(paths: tuple) -> tuple:
+    sig = []
     for p in paths:
         try:
-            if Path(p).exists():
-                bundle.append(_read(p))
-        except Exception:
+            st_ = os.stat(p)
+            sig.append((st_.st_mtime_ns, st_.st_size))
+        except OSError:
+            sig.append(None)  # missing files are ignored (and picked up once they appear)
+    return tuple(sig)
+
+def bundle(paths: list[str]) -> Bundle:
+    """Concatenate + minify CSS files in order. Cached per file list; rebuilt when any file's mtime/size changes."""
+    key = tuple(str(p) for p in paths)
+    sig = _signature(key)
+    with _bundles_lock:
+        hit = _bundles.get(key)
+        if hit is not None and hit[0] == sig:
+            return hit[1]
+    texts = []
+    for p, s in zip(key, sig):
+        if s is None:
+            continue
+        try:
+            texts.append(Path(p).read_text(encoding="utf-8"))
+        except OSError:
             pass
-    if bundle:
-        st.markdown("""<style>{}</style>""".format("\n".join(bundle)), unsafe_allow_html=True)
+    css = minify("\n".join(texts))
+    b = Bundle(css, hashlib.sha256(css.encode("utf-8")).hexdigest()[:12])
+    with _bundles_lock:
+        _bundles[key] = (sig, b)
+    return b
+
+def load(paths:list[str])->None:
+    """Inject CSS files in order as a <style> block (every call). Missing files are ignored."""
+    b = bundle(paths)
+    if b.css:
+        st.markdown("""<style>{}</style>""".format(b.css), unsafe_allow_html=True)
+
+def _run_in_page(js: str) -> None:
+    # the iframe is same-origin (srcdoc), so it can reach the app document; a 0-1px frame stays out of the layout
+    _frame(f"<script>(function(){{const d=window.parent.document;{js}}})();</script>", height=_FRAME_HEIGHT)
+
+def inject_once(paths: list[str], key: str = "app") -> bool:
+    """
+    Put the bundle into <head> as <style id="stylekit-{key}"> once per browser session.
+    The style element outlives the (one-off) iframe that created it, so later reruns send nothing;
+    a new digest (edited file) replaces its text in place. Falls back to load() when iframes are unavailable.
+    Returns True when CSS was sent on this run.
+    """
+    b = bundle(paths)
+    if _frame is None:
+        load(paths)
+        return True
+    ss = st.session_state
+    flag = f"_stylekit_{key}"
+    if ss.get(flag) == b.digest:
+        return False
+    _run_in_page(
+        f'let s=d.getElementById("stylekit-{key}");'
+        f'if(!s){{s=d.createElement("style");s.id="stylekit-{key}";d.head.appendChild(s);}}'
+        f'if(s.dataset.digest!=="{b.digest}"){{s.textContent={json.dumps(b.css)};s.dataset.digest="{b.digest}";}}'
+    )
+    ss[flag] = b.digest
+    return True
+
+def set_state(on: list[str], off: list[str] | tuple = ()) -> bool:
+    """Toggle state classes on <body> (e.g. ['app', 'answering'], ['idle']); sends a script only on change."""
+    if _frame is None:
+        return False
+    ss = st.session_state
+    state = (tuple(on), tuple(off))
+    if ss.get("_stylekit_state") == state:
+        return False
+    _run_in_page(
+        f"const c=d.body.classList;{json.dumps(list(on))}.forEach(x=>c.add(x));"
+        f"{json.dumps(list(off))}.forEach(x=>c.remove(x));"
+    )
+    ss["_stylekit_state"] = state
+    return True
 
 def open_div(cls:str)->None:
     st.markdown(f'<div class="{cls}">', unsafe_allow_html=True)
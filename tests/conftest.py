@@ -0,0 +1,7 @@
+# tests/conftest.py  (저장소 루트를 import 경로에 추가 — app.py 와 같은 방식)
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,51 @@
+# tests/test_advice_engine.py  (AdviceEngine: 스트리밍 최종 호출의 usage 기록, 스케줄러 우선순위)
+from types import SimpleNamespace as NS
+
+from modules.advice_engine import AdviceEngine
+from modules.llm_scheduler import PRIORITY_INTERACTIVE, PRIORITY_STREAM, LLMScheduler
+
+
+class FakeLLM:
+    """safe_chat_completion 대역: 1차 호출은 툴 없이 답, 최종 호출은 include_usage 일 때만 usage 청크를 붙인 스트림."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, client, **kw):
+        self.calls.append(kw)
+        if not kw.get("stream"):
+            msg = NS(content="", tool_calls=None)
+            return {"resp": NS(choices=[NS(message=msg)],
+                               usage=NS(prompt_tokens=30, completion_tokens=5, total_tokens=35))}
+        chunks = [NS(choices=[NS(delta=NS(content=t), finish_reason=None)], usage=None) for t in ("민법 ", "제750조")]
+        chunks.append(NS(choices=[NS(delta=NS(content=None), finish_reason="stop")], usage=None))
+        if (kw.get("stream_options") or {}).get("include_usage"):
+            chunks.append(NS(choices=[], usage=NS(prompt_tokens=40, completion_tokens=7, total_tokens=47)))
+        return {"stream": iter(chunks)}
+
+
+def test_streaming_final_call_records_usage():
+    llm, traces = FakeLLM(), []
+    engine = AdviceEngine(object(), "m", [], llm, None, None, trace_hooks=[traces.append])
+    events = list(engine.generate("불법행위 책임", system_prompt="s", allow_tools=False, stream=True))
+
+    assert events[-1][0] == "final" and events[-1][1].startswith("민법 제750조")
+    assert llm.calls[-1]["stream_options"] == {"include_usage": True}
+    assert traces[0].tokens == {"prompt_tokens": 70, "completion_tokens": 12, "total_tokens": 82}
+
+
+def test_non_streaming_final_call_has_no_stream_options():
+    llm = FakeLLM()
+    engine = AdviceEngine(object(), "m", [], llm, None, None)
+    list(engine.generate("불법행위 책임", system_prompt="s", allow_tools=False, stream=False))
+    assert "stream_options" not in llm.calls[-1]
+
+
+def test_user_facing_calls_get_explicit_priority():
+    # plain 모드(tools=[])·비스트리밍 최종 호출도 kwargs 추정으로 background 가 되지 않게
+    sch, seen = LLMScheduler(), []
+    acquire = sch._acquire
+    sch._acquire = lambda priority, deadline: seen.append(priority) or acquire(priority, deadline)
+    engine = AdviceEngine(object(), "m", [], sch.wrap(FakeLLM()), None, None)
+    list(engine.generate("불법행위 책임", system_prompt="s", allow_tools=False, stream=False))
+    assert seen == [PRIORITY_INTERACTIVE, PRIORITY_STREAM]
@@ -0,0 +1,44 @@
+# tests/test_app.py — app.answer_events: 세션 id 가 워커 스레드의 LLM 스케줄러(사용자별 버킷)까지 전달되는지
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _script():
+    import sys
+    import threading
+    from types import SimpleNamespace as NS
+
+    import streamlit as st
+
+    sys.path.insert(0, st.session_state["root"])
+    import app
+    from modules.advice_engine import AdviceEngine
+    from modules.llm_scheduler import LLMScheduler
+
+    def fake_llm(client, **kw):
+        msg = NS(content="민법 제750조", tool_calls=None)
+        return {"resp": NS(choices=[NS(message=msg)], usage=None)}
+
+    scheduler = LLMScheduler()
+    engine = AdviceEngine(object(), "m", [], scheduler.wrap(fake_llm), None, None)
+    app.get_engine = lambda: engine
+    factory = app.answer_events("불법행위 책임")
+    events = []
+    worker = threading.Thread(target=lambda: events.extend(factory()))  # AnswerJob 처럼 스크립트 밖 스레드에서 실행
+    worker.start()
+    worker.join(10)
+    st.session_state["kinds"] = [e[0] for e in events]
+    st.session_state["users"] = sorted(scheduler._buckets)
+
+
+def test_answer_events_passes_session_user_to_scheduler():
+    at = AppTest.from_function(_script, default_timeout=30)
+    at.session_state["root"] = str(ROOT)
+    at.session_state["session_id"] = "sid-123"
+    at.run()
+    assert not at.exception
+    assert at.session_state["kinds"][-1] == "final"
+    assert at.session_state["users"] == ["sid-123"]
@@ -0,0 +1,103 @@
+# tests/test_external_content.py  (외부 페이지 가져오기: 리다이렉트 hop 마다 SSRF 확인)
+import pytest
+
+import external_content as ec
+
+
+class FakeResponse:
+    def __init__(self, url, status=200, headers=None, body="<html><title>t</title><p>본문</p></html>".encode("utf-8")):
+        self.url = url
+        self.status_code = status
+        self.headers = headers or {"Content-Type": "text/html; charset=utf-8"}
+        self._body = body
+        self.closed = False
+
+    @property
+    def is_redirect(self):
+        return "Location" in self.headers and self.status_code in (301, 302, 303, 307, 308)
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        yield self._body
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """URL → 응답 표. 실제로 요청한 URL 을 requested 에 남김."""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requested = []
+
+    def get(self, url, **kw):
+        assert kw.get("allow_redirects") is False  # requests 가 스스로 따라가면 확인 전에 요청됨
+        self.requested.append(url)
+        return self.routes[url](url)
+
+
+DNS = {"news.example.com": ["93.184.216.34"], "evil.example.com": ["93.184.216.35"],
+       "internal.example.com": ["10.0.0.5"]}
+
+
+@pytest.fixture
+def http(monkeypatch):
+    def install(routes):
+        sess = FakeSession(routes)
+        monkeypatch.setattr(ec, "_http", lambda: sess)
+        return sess
+    monkeypatch.setattr(ec, "_resolve", lambda host, port: DNS.get(host) or [host])
+    return install
+
+
+@pytest.mark.parametrize("target", [
+    "http://169.254.169.254/latest/meta-data/",
+    "http://127.0.0.1:8080/admin",
+    "http://[::1]/",
+    "http://internal.example.com/",   # 공개 이름이지만 사설 주소로 풀림
+])
+def test_redirect_to_private_address_is_never_requested(http, target):
+    sess = http({
+        "https://evil.example.com/a": lambda u: FakeResponse(u, 302, {"Location": target}),
+        target: lambda u: pytest.fail("private redirect target was requested"),
+    })
+    with pytest.raises(ec.BlockedTarget):
+        ec._fetch("https://evil.example.com/a", timeout=5, max_bytes=1000)
+    assert sess.requested == ["https://evil.example.com/a"]
+
+
+def test_fetch_article_text_reports_blocked_redirect(http):
+    http({"https://evil.example.com/a": lambda u: FakeResponse(u, 302, {"Location": "http://127.0.0.1/"})})
+    title, msg = ec.fetch_article_text("https://evil.example.com/a", use_cache=False)
+    assert title == "[에러: 비허용 대상]" and "리다이렉트" in msg
+
+
+def test_public_redirect_is_followed(http):
+    sess = http({
+        "https://news.example.com/a": lambda u: FakeResponse(u, 301, {"Location": "/b"}),
+        "https://news.example.com/b": lambda u: FakeResponse(u),
+    })
+    res = ec._fetch("https://news.example.com/a", timeout=5, max_bytes=1000)
+    assert res.final_url == "https://news.example.com/b"
+    assert sess.requested == ["https://news.example.com/a", "https://news.example.com/b"]
+
+
+def test_redirect_hops_are_limited(http):
+    http({"https://news.example.com/loop": lambda u: FakeResponse(u, 302, {"Location": u})})
+    with pytest.raises(ec.FetchError, match="리다이렉트"):
+        ec._fetch("https://news.example.com/loop", timeout=5, max_bytes=1000)
+
+
+def test_host_slots_are_bounded(monkeypatch):
+    monkeypatch.setattr(ec, "_host_sems", ec.OrderedDict())
+    monkeypatch.setattr(ec, "_MAX_HOST_SLOTS", 8)
+    with ec._host_slot("busy.example.com", 2) as busy:
+        for i in range(50):
+            with ec._host_slot(f"h{i}.example.com", 2):
+                pass
+        assert len(ec._host_sems) <= 9
+        assert ec._host_sems[("busy.example.com", 2)].sem is busy  # 쓰는 중인 슬롯은 남음
+    assert len(ec._host_sems) <= 8
@@ -0,0 +1,70 @@
+# tests/test_ingest.py — 첨부 문서를 워커 스레드에서 나눠 색인(IngestJob) + DocIndex 증분 추가
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.doc_index import DocIndex
+from modules.ingest import Chunk, DocumentIngestor, IngestJob
+
+
+def _chunks(doc_id, n):
+    return [Chunk(doc_id, "a.txt", None, i, f"임대인은 보증금 {i} 을 돌려준다") for i in range(n)]
+
+
+def test_doc_index_accepts_same_doc_in_batches():
+    index = DocIndex()
+    chunks = _chunks("d1", 5)
+    assert index.add(chunks[:2]) == 2
+    assert index.add(chunks[2:]) == 3      # 같은 문서의 다음 묶음도 색인
+    assert index.add(chunks) == 0          # 같은 파일을 다시 넣으면 추가 없음
+    assert len(index) == 5 and index.doc_ids == {"d1"}
+
+
+class _GatedIngestor:
+    """첫 묶음을 내보낸 뒤 gate 가 열릴 때까지 멈추는 수집기(긴 문서 흉내)."""
+
+    def __init__(self, gate):
+        self.gate = gate
+        self.inner = DocumentIngestor()
+
+    def iter_chunks(self, name, data, progress=None, done=None):
+        for i, ch in enumerate(self.inner.iter_chunks(name, data, progress, done)):
+            if i == 2:
+                self.gate.wait(5)
+            yield ch
+
+
+def test_ingest_job_indexes_while_reading():
+    gate = threading.Event()
+    index = DocIndex()
+    data = ("임대인은 보증금을 돌려주어야 한다. " * 80 + "\n\n") * 20
+    ingestor = _GatedIngestor(gate)
+    ingestor.inner.chunk_chars = 200
+    with ThreadPoolExecutor(1) as pool:
+        job = IngestJob(ingestor, index, [("a.txt", data.encode("utf-8"))], batch=2).start(pool)
+        assert job.wait_first(5)
+        assert not job.done and len(index) == 2   # 읽는 도중에도 앞부분은 검색 가능
+        assert index.search("보증금", 1)
+        gate.set()
+        job.future.result(5)
+    assert job.done and len(index) > 2 and not job.notes
+
+
+def test_ingest_job_reports_errors():
+    index = DocIndex()
+    with ThreadPoolExecutor(1) as pool:
+        job = IngestJob(DocumentIngestor(), index, [("a.hwp", b"\x00\x01binary")]).start(pool)
+        job.future.result(5)
+    assert job.wait_first(0) and len(index) == 0
+    assert job.notes and job.notes[0].startswith("a.hwp: ")
+
+
+def test_truncation_comes_from_the_stream_not_a_second_parse(monkeypatch):
+    ingestor = DocumentIngestor(max_pages=2)
+    monkeypatch.setattr(ingestor, "ingest", lambda *a, **k: (_ for _ in ()).throw(AssertionError("re-ingest")))
+    data = ("임대인은 보증금을 돌려주어야 한다.\n" * 600).encode("utf-8")   # 가상 쪽(3,000자) 3개 이상
+    index = DocIndex()
+    with ThreadPoolExecutor(1) as pool:
+        job = IngestJob(ingestor, index, [("a.txt", data)]).start(pool)
+        job.future.result(5)
+    assert job.notes == ["a.txt: 앞 2쪽까지만 반영했습니다."]
+    assert len(index) > 0
@@ -0,0 +1,62 @@
+# tests/test_llm_scheduler.py — 스케줄러 재시도: 5xx 는 요청별 백오프로, 429 는 헤더만큼 전역 멈춤 뒤 다시 보냄
+import time
+from types import SimpleNamespace as NS
+
+from modules.llm_client import safe_chat_completion
+from modules.llm_scheduler import LLMScheduler
+
+
+class APIError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"{status} error")
+        self.status_code = status
+        self.response = NS(status_code=status, headers=headers or {})
+
+
+class FlakyProvider:
+    """client.chat.completions.create 대역: 앞의 failures 번은 error 를 던지고 그 뒤로는 성공."""
+
+    def __init__(self, error, failures):
+        self.error = error
+        self.failures = failures
+        self.calls = 0
+        self.chat = NS(completions=self)
+
+    def create(self, **kw):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return NS(choices=[])
+
+
+def _ask(scc, provider):
+    return scc(provider, messages=[{"role": "user", "content": "보증금"}], model="m", max_tokens=10)
+
+
+def test_503_is_retried_through_scheduler():
+    sch = LLMScheduler(max_attempts=3, retry_base=0.01)
+    provider = FlakyProvider(APIError(503), failures=10)
+    res = _ask(sch.wrap(safe_chat_completion), provider)
+    assert res["status"] == 503 and res["retryable"]
+    assert provider.calls == 3                       # 직접 호출(retries=2)과 같은 횟수
+    assert sch.stats.retried == 2 and sch.stats.rate_limited == 0
+
+    provider = FlakyProvider(APIError(503), failures=1)
+    assert "resp" in _ask(sch.wrap(safe_chat_completion), provider) and provider.calls == 2
+
+
+def test_non_retryable_error_is_not_retried():
+    sch = LLMScheduler(max_attempts=3, retry_base=0.01)
+    provider = FlakyProvider(APIError(400), failures=10)
+    res = _ask(sch.wrap(safe_chat_completion), provider)
+    assert res["status"] == 400 and not res["retryable"] and provider.calls == 1
+
+
+def test_429_waits_for_retry_after_then_retries():
+    sch = LLMScheduler(max_attempts=3)
+    provider = FlakyProvider(APIError(429, {"retry-after": "0.2"}), failures=1)
+    t0 = time.monotonic()
+    res = _ask(sch.wrap(safe_chat_completion), provider)
+    assert "resp" in res and provider.calls == 2
+    assert time.monotonic() - t0 >= 0.2              # 헤더만큼 전체 디스패치를 멈춤
+    assert sch.stats.rate_limited == 1 and sch.stats.retried == 0
@@ -0,0 +1,60 @@
+# tests/test_session_store.py — 대화 기록 저장소: 명시해야 켜짐, 0600 파일, 세션당 상한/보존 기간, 실패 기억
+import stat
+
+import pytest
+
+from modules import session_store
+from modules.session_store import SQLiteBackend
+
+
+@pytest.fixture
+def fresh_default(monkeypatch):
+    monkeypatch.setattr(session_store, "_store", None)
+    monkeypatch.setattr(session_store, "_store_failed_until", 0.0)
+    yield
+    if session_store._store is not None:
+        session_store._store.close()
+
+
+def test_store_is_off_unless_configured(monkeypatch, fresh_default):
+    monkeypatch.delenv("SESSION_STORE", raising=False)
+    assert session_store.default_session_store() is None
+    monkeypatch.setenv("SESSION_STORE", "off")
+    assert session_store.default_session_store() is None
+
+
+def test_backend_failure_is_remembered(monkeypatch, fresh_default):
+    calls = []
+
+    def broken(kind):
+        calls.append(kind)
+        raise RuntimeError("no credentials")
+
+    monkeypatch.setenv("SESSION_STORE", "firestore")
+    monkeypatch.setattr(session_store, "make_backend", broken)
+    assert session_store.default_session_store() is None
+    assert session_store.default_session_store() is None
+    assert calls == ["firestore"]               # rerun 마다 다시 초기화하지 않음
+
+
+def test_sqlite_file_is_private(tmp_path):
+    path = tmp_path / "s.sqlite3"
+    db = SQLiteBackend(path)
+    db.write("sid", {0: {"role": "user", "content": "전세 보증금"}}, {"count": 1})
+    db.close()
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+
+def test_sqlite_keeps_recent_messages_and_expires_old_sessions(tmp_path, monkeypatch):
+    db = SQLiteBackend(tmp_path / "s.sqlite3", ttl=100.0, max_messages=3, purge_interval=0.0)
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "time", lambda: now[0])
+    db.write("old", {0: {"role": "user", "content": "a"}}, {"count": 1})
+    db.write("sid", {i: {"role": "user", "content": str(i)} for i in range(5)}, {"count": 5})
+    assert [seq for seq, _ in db.load("sid", None, 10)] == [2, 3, 4]
+
+    now[0] += 150.0
+    db.write("sid", {5: {"role": "user", "content": "5"}}, {"count": 6})
+    assert db.load("old", None, 10) == []
+    assert [seq for seq, _ in db.load("sid", None, 10)] == [5]
+    db.close()
@@ -0,0 +1,48 @@
+# tests/test_similar_cache.py  (유사 질문 캐시: 다른 법령·조문·숫자의 답을 재생하지 않는지)
+import pytest
+
+from modules.legal_modes import Intent
+from modules.similar_cache import SimilarQuestionCache, question_signature
+
+_LEASE = (" 임차인이 보증금을 돌려받지 못한 상태에서 이사를 가야 하는데 대항력과 우선변제권을 유지하려면"
+          " 어떤 절차를 밟아야 하는지 자세히 알려주세요")
+_TORT = (" 상대방 운전자의 과실로 차량이 파손되고 병원 치료를 받았는데 위자료와 치료비를 함께 청구할 수 있는지"
+         " 자세히 알려주세요")
+
+# (캐시된 질문, 다른 법령/조문을 묻는 질문) — 글자 n-gram 점수만으로는 0.93 이상(답변 재생)이 나오는 쌍
+FALSE_HIT_PAIRS = [
+    ("주택임대차보호법 제3조의3" + _LEASE, "주택임대차보호법 제6조의3" + _LEASE),
+    ("주택임대차보호법" + _LEASE, "상가건물 임대차보호법" + _LEASE),
+    ("민법 제750조" + _TORT, "민법 제751조" + _TORT),
+    ("민법 제750조" + _TORT, "형법" + _TORT),
+]
+
+
+@pytest.mark.parametrize("cached, asked", FALSE_HIT_PAIRS)
+def test_different_statute_never_hits(cached, asked):
+    cache = SimilarQuestionCache()
+    cache.insert(cached, {"text": "cached"}, intent=Intent.MEMO)
+    grade, _score, payload = cache.lookup(asked, intent=Intent.MEMO)
+    assert grade is None and payload is None
+
+
+@pytest.mark.parametrize("cached, asked", FALSE_HIT_PAIRS)
+def test_signatures_differ(cached, asked):
+    assert question_signature(cached) != question_signature(asked)
+
+
+def test_rephrased_same_statute_still_hits():
+    cache = SimilarQuestionCache()
+    cache.insert("민법 제750조" + _TORT, {"text": "cached"}, intent=Intent.MEMO)
+    grade, _score, payload = cache.lookup("민법 제750조에 관해" + _TORT.replace("알려주세요", "알려 주세요"),
+                                          intent=Intent.MEMO)
+    assert grade == "answer" and payload == {"text": "cached"}
+
+
+def test_scope_separates_mode_and_prompt():
+    cache = SimilarQuestionCache()
+    q = "전세보증금 반환 절차가 궁금합니다"
+    cache.insert(q, {"text": "memo"}, intent=Intent.MEMO, scope="memo|aaa|tools")
+    assert cache.lookup(q, intent=Intent.MEMO, scope="memo|bbb|tools")[0] is None
+    assert cache.lookup(q, intent=Intent.MEMO, scope="memo|aaa|plain")[0] is None
+    assert cache.lookup(q, intent=Intent.MEMO, scope="memo|aaa|tools")[0] == "answer"
@@ -0,0 +1,90 @@
+# tests/test_statute_index.py — 로컬 조문 색인: 없는 조문은 원격으로, law.go.kr DRF 응답 → 같은 항목 모양
+import json
+
+from modules.law_api import LawAPI
+from modules.statute_index import LocalFirstSearch, StatuteIndex, build_index, parse_query
+
+_ARTICLES = [
+    {"law": "민법", "article": "제1조", "title": "법원", "text": "민사에 관하여 법률에 규정이 없으면 관습법에 의하고"},
+    {"law": "민법", "article": "제2조", "title": "신의성실", "text": "권리의 행사와 의무의 이행은 신의에 좇아 성실히 하여야 한다."},
+    {"law": "민법", "article": "제750조", "title": "불법행위의 내용", "text": "고의 또는 과실로 인한 위법행위로 타인에게 손해를 가한 자는"},
+]
+
+
+def _index(tmp_path):
+    dump = tmp_path / "dump"
+    dump.mkdir()
+    (dump / "civil.jsonl").write_text("\n".join(json.dumps(a, ensure_ascii=False) for a in _ARTICLES), encoding="utf-8")
+    build_index(dump, tmp_path / "index", log=lambda _m: None)
+    return StatuteIndex(tmp_path / "index")
+
+
+def test_missing_article_goes_remote(tmp_path):
+    index = _index(tmp_path)
+    assert index.search("민법 제3조")["items"] == []     # 같은 법의 앞쪽 조문으로 대신하지 않음
+
+    calls = []
+
+    def remote_one(query, **kw):
+        calls.append(query)
+        return {"query": query, "items": [{"법령명한글": "민법", "조문번호": "3"}], "source": "remote"}
+
+    search = LocalFirstSearch(index, remote_one=remote_one)
+    assert search.search_one(query="민법 제750조")["items"][0]["조문번호"] == "750"
+    assert calls == []
+    res = search.search_one(query="민법 제3조")
+    assert res["source"] == "remote" and calls == ["민법 제3조"]
+    assert search.local_hits == 1 and search.remote_calls == 1
+
+
+def test_law_only_query_still_local(tmp_path):
+    items = _index(tmp_path).search("민법", num_rows=2)["items"]
+    assert [it["조문번호"] for it in items] == ["1", "2"]
+
+
+class _Resp:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class _Session:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url.rsplit("/", 1)[-1], dict(params)))
+        if url.endswith("lawSearch.do"):
+            return _Resp({"LawSearch": {"law": [
+                {"법령일련번호": "9", "법령명한글": "민법 시행령"}, {"법령일련번호": "1", "법령명한글": "민법"}]}})
+        return _Resp({"법령": {"조문": {"조문단위": {
+            "조문번호": "3", "조문여부": "조문", "조문제목": "권리능력의 존속기간",
+            "조문내용": "제3조(권리능력의 존속기간)", "항": {"항내용": "사람은 생존한 동안 권리와 의무의 주체가 된다."}}}}})
+
+
+def test_law_api_fetches_one_article():
+    session = _Session()
+    res = LawAPI("test", session=session).search_one(query="민법 제3조")
+    (search, sp), (service, vp) = session.calls
+    assert search == "lawSearch.do" and sp["query"] == "민법" and sp["OC"] == "test"
+    assert service == "lawService.do" and vp["MST"] == "1" and vp["JO"] == "000300"
+    item, = res["items"]
+    assert item["법령명한글"] == "민법" and item["조문번호"] == "3" and "생존한 동안" in item["조문내용"]
+    assert item["법령상세링크"] == "/법령/민법/제3조"
+
+
+def test_parse_query_is_shared_by_local_and_remote(tmp_path, monkeypatch):
+    pq = parse_query("「민사 소송법」 제163조의2 기일 지정", lambda n: "민사소송법" if n == "민사 소송법" else None)
+    assert (pq.law, pq.article, pq.keywords) == ("민사소송법", (163, 2), "기일 지정")
+    assert pq.terms == ["기일", "지정"]
+
+    seen = []
+    monkeypatch.setattr("modules.law_api.parse_query", lambda q, find: seen.append(q) or parse_query(q, find))
+    LawAPI("test", session=_Session()).search_one(query="민법 제3조")
+    assert _index(tmp_path).parse("민법 제750조").article == (750, 0)
+    assert seen == ["민법 제3조"]
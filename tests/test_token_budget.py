@@ -0,0 +1,43 @@
+# tests/test_token_budget.py — 툴 결과 압축: 공용 엔진에 연결, 세션 동시 사용 시 집계
+import threading
+
+from modules import advice_engine
+from modules.token_budget import TokenBudget
+
+
+def _result(n):
+    return {"query": "보증금", "items": [
+        {"법령명한글": "주택임대차보호법", "조문번호": str(i), "조문내용": "보증금 반환 " * 200, "법령상세링크": "/x"}
+        for i in range(n)
+    ]}
+
+
+def test_default_engine_compacts_tool_results(monkeypatch):
+    monkeypatch.setattr(advice_engine, "_engine", None)
+    monkeypatch.setenv("MAX_PROMPT_TOKENS", "1500")
+    try:
+        engine = advice_engine.default_engine()
+        assert isinstance(engine.token_budget, TokenBudget)
+        assert engine.token_budget.max_prompt_tokens == 1500
+    finally:
+        advice_engine._engine = None
+
+
+def test_stats_are_exact_under_concurrent_turns():
+    budget = TokenBudget(max_prompt_tokens=1000, min_tool_tokens=200)
+    per_turn = budget.fit("보증금", [_result(8)])[1]
+    budget = TokenBudget(max_prompt_tokens=1000, min_tool_tokens=200)
+
+    def turns():
+        for _ in range(50):
+            budget.fit("보증금", [_result(8)])
+
+    threads = [threading.Thread(target=turns) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    s = budget.stats_dict()
+    assert s["turns"] == 400
+    assert s["tokens_saved"] == 400 * per_turn.tokens_saved
+    assert s["items_dropped"] == 400 * (per_turn.items_before - per_turn.items_after)
@@ -0,0 +1,107 @@
+# tests/test_tool_runner.py — 한 턴의 tool_calls 동시 실행: 순서 보장, 호출별 타임아웃, 턴 데드라인, 멈춘 호출 격리
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace as NS
+
+import pytest
+
+from modules.tool_runner import ToolRunner
+
+
+def _call(i, name, **args):
+    return NS(id=f"call_{i}", function=NS(name=name, arguments=json.dumps(args)))
+
+
+@pytest.fixture
+def tools():
+    """sleep(secs, tag) 은 잠깐 자고 tag 를 돌려줌, hang(tag) 은 release 가 열릴 때까지 멈춤."""
+    release = threading.Event()
+    ran, finished = [], []
+
+    def sleep(secs, tag):
+        ran.append(tag)
+        time.sleep(secs)
+        finished.append(tag)
+        return {"tag": tag, "items": []}
+
+    def hang(tag):
+        ran.append(tag)
+        release.wait(10)
+        return {"tag": tag, "items": []}
+
+    yield NS(dispatch={"sleep": sleep, "hang": hang}, ran=ran, finished=finished, release=release)
+    release.set()
+
+
+def test_results_follow_tool_call_order(tools):
+    runner = ToolRunner(tools.dispatch, max_workers=3)
+    calls = [_call(0, "sleep", secs=0.15, tag="a"), _call(1, "sleep", secs=0.05, tag="b"), _call(2, "sleep", secs=0, tag="c")]
+    out = runner.run(calls)
+    assert [c.id for c, _ in out] == ["call_0", "call_1", "call_2"]
+    assert [r["tag"] for _, r in out] == ["a", "b", "c"]
+    assert tools.finished == ["c", "b", "a"]     # 끝난 순서와 무관하게 입력 순서로
+
+
+def test_timed_out_call_is_replaced_and_others_return(tools):
+    seen = []
+    runner = ToolRunner(tools.dispatch, max_workers=3, call_timeout=0.1, turn_deadline=5)
+    t0 = time.monotonic()
+    out = runner.run(
+        [_call(0, "sleep", secs=0, tag="a"), _call(1, "hang", tag="h"), _call(2, "sleep", secs=0.02, tag="c")],
+        observe=lambda name, s, e, status: seen.append(status),
+    )
+    assert time.monotonic() - t0 < 1.0
+    (_, a), (_, h), (_, c) = out
+    assert a["tag"] == "a" and c["tag"] == "c"
+    assert h["error"].startswith("timeout: hang") and h["items"] == []
+    assert seen == ["ok", "timeout", "ok"]
+    assert runner.abandoned == 1
+
+
+def test_turn_deadline_cuts_off_remaining_calls(tools):
+    # 워커 1개: a 가 끝난 뒤 b 가 시작하지만 턴 데드라인에서 끊기고, c 는 대기열에서 취소되어 실행되지 않음
+    runner = ToolRunner(tools.dispatch, max_workers=1, call_timeout=5, turn_deadline=0.25)
+    t0 = time.monotonic()
+    out = runner.run([_call(i, "sleep", secs=0.15, tag=t) for i, t in enumerate("abc")])
+    assert time.monotonic() - t0 < 0.6
+    (_, a), (_, b), (_, c) = out
+    assert a["tag"] == "a"
+    assert b["error"].startswith("deadline: sleep")
+    assert c["error"].startswith("deadline: sleep (queued")
+    time.sleep(0.2)
+    assert tools.ran == ["a", "b"]
+
+
+def test_hung_calls_do_not_block_the_next_turn(tools):
+    runner = ToolRunner(tools.dispatch, max_workers=2, call_timeout=0.1, turn_deadline=5)
+    first = runner.run([_call(0, "hang", tag="h1"), _call(1, "hang", tag="h2")])
+    assert all(r["error"].startswith("timeout") for _, r in first)
+    assert runner.retired_pools == 1            # 멈춘 호출이 워커를 다 붙잡아 새 풀로 교체
+
+    t0 = time.monotonic()
+    (_, r), = runner.run([_call(0, "sleep", secs=0, tag="next")])
+    assert r["tag"] == "next" and time.monotonic() - t0 < 0.5
+
+    tools.release.set()
+    for _ in range(100):
+        if runner.abandoned == 0:
+            break
+        time.sleep(0.01)
+    assert runner.abandoned == 0                # 버려진 호출도 끝나면 정리
+    runner.shutdown()
+
+
+def test_arun_keeps_order_and_times_out(tools):
+    async def slow_async(tag):
+        await asyncio.sleep(5)
+        return {"tag": tag}
+
+    runner = ToolRunner({**tools.dispatch, "slow": slow_async}, max_workers=3, call_timeout=0.1, turn_deadline=5)
+    out = asyncio.run(runner.arun([
+        _call(0, "sleep", secs=0.05, tag="a"), _call(1, "slow", tag="s"), _call(2, "sleep", secs=0, tag="c"),
+    ]))
+    assert [c.id for c, _ in out] == ["call_0", "call_1", "call_2"]
+    assert out[0][1]["tag"] == "a" and out[2][1]["tag"] == "c"
+    assert out[1][1]["error"].startswith("timeout: slow")